@@ -41,11 +41,21 @@ def create_app():
     # This integrates the API layer with the application.
     api.init_app(app)
 
+    # Bind the review moderation components (toxicity model, etc.) to the app.
+    # The toxicity model starts warming up in a background thread here, so the
+    # worker can serve requests before the model has finished loading.
+    from app.moderation import init_app as init_moderation
+    init_moderation(app)
+
     # Import the route registration function locally to avoid circular dependencies.
     from app.routes import register_routes
     
     # Call the function to register all the defined API routes/namespaces with the Api instance.
     register_routes(api)
 
+    # Register the `flask moderation ...` maintenance commands.
+    from app.cli import register_commands
+    register_commands(app)
+
     # Return the fully configured application instance.
     return app
\ No newline at end of file
@@ -0,0 +1,609 @@
+import json
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+# Command group for moderation maintenance tasks, available as `flask moderation <command>`.
+moderation_cli = AppGroup('moderation', help='Review moderation maintenance commands.')
+
+# A few representative reviews used when no input file is given.
+SAMPLE_REVIEWS = [
+    "Great teacher, explains every topic clearly and patiently.",
+    "The lectures were well organised and the assignments were fair.",
+    "She always answers questions after class.",
+    "Boring classes and he never returns our homework on time.",
+    "You are a worthless idiot and everyone hates you.",
+    "Shut up, nobody cares about your stupid opinion.",
+    "I will find you after class and make you regret it.",
+    "Terrible teacher, what a disgusting pig.",
+]
+
+
+def _read_texts(path):
+    # One text per line; blank lines are skipped.
+    if not path:
+        return list(SAMPLE_REVIEWS)
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+@moderation_cli.command('parity')
+@click.option('--backend', help='Candidate backend (defaults to TOXICITY_BACKEND).')
+@click.option('--reference', default='pipeline', show_default=True, help='Reference backend.')
+@click.option('--texts', 'texts_path', type=click.Path(exists=True, dir_okay=False),
+              help='File with one review text per line.')
+@click.option('--tolerance', default=0.05, show_default=True, help='Maximum absolute score difference.')
+def parity_command(backend, reference, texts_path, tolerance):
+    """Check that a toxicity backend agrees with the reference pipeline."""
+    from app.moderation.backends import compare_backends, create_backend
+    from app.moderation.model_manager import backend_options
+
+    config = current_app.config
+    options = backend_options(config)
+    backends = []
+    for name in (reference, backend or config['TOXICITY_BACKEND']):
+        instance = create_backend(name, config['TOXICITY_MODEL_NAME'], **options)
+        instance.load()
+        backends.append(instance)
+
+    report = compare_backends(*backends, _read_texts(texts_path), tolerance=tolerance)
+    click.echo(json.dumps(report, indent=2))
+    if report['mismatches']:
+        raise click.ClickException(
+            f"{len(report['mismatches'])} of {report['texts']} texts disagree with '{reference}'"
+        )
+
+
+@moderation_cli.command('build-vocabulary')
+@click.option('--output', type=click.Path(dir_okay=False),
+              help='Index file to write (defaults to VOCABULARY_INDEX_PATH).')
+@click.option('--slang', 'slang_path', type=click.Path(exists=True, dir_okay=False),
+              help='Curated slang list (defaults to VOCABULARY_SLANG_PATH).')
+def build_vocabulary_command(output, slang_path):
+    """Precompute the word-validity index from WordNet and the slang list."""
+    import time
+    import nltk
+    from app.moderation.vocabulary import VocabularyIndex, read_word_list, wordnet_vocabulary
+
+    config = current_app.config
+    output = output or config['VOCABULARY_INDEX_PATH']
+    slang_path = slang_path or config['VOCABULARY_SLANG_PATH']
+
+    started = time.perf_counter()
+    try:
+        nltk.data.find('corpora/wordnet')  # e.g. from the NLTK bundle
+    except LookupError:
+        nltk.download('wordnet', quiet=True)
+    words = wordnet_vocabulary()
+    click.echo(f'WordNet lemmas and inflected forms: {len(words)}')
+    if slang_path:
+        slang = read_word_list(slang_path)
+        click.echo(f'Slang entries from {slang_path}: {len(slang)}')
+        words |= slang
+    count = VocabularyIndex.build(words, output)
+
+    loaded = time.perf_counter()
+    VocabularyIndex(output)
+    click.echo(
+        f'Wrote {count} words to {output} in {loaded - started:.1f}s '
+        f'(loads in {(time.perf_counter() - loaded) * 1000:.2f} ms)'
+    )
+
+
+@moderation_cli.command('bench-lexicon')
+@click.option('--sizes', default='10,100,1000,10000,100000', show_default=True,
+              help='Comma-separated lexicon sizes to benchmark.')
+@click.option('--texts', 'texts_path', type=click.Path(exists=True, dir_okay=False),
+              help='File with one review text per line.')
+@click.option('--repeat', default=200, show_default=True, help='Passes over the texts per size.')
+def bench_lexicon_command(sizes, texts_path, repeat):
+    """Benchmark the abuse phrase matcher against a naive per-phrase scan."""
+    import random
+    import time
+    from app.moderation.lexicon import DEFAULT_ABUSE_WORDS, PhraseMatcher, lexicon_tokens
+
+    texts = _read_texts(texts_path)
+    token_lists = [lexicon_tokens(t) for t in texts]
+    rng = random.Random(42)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+
+    click.echo(f"{'entries':>8} {'compile ms':>11} {'nodes':>8} {'us/review':>10} {'naive us/review':>16}")
+    for size in (int(s) for s in sizes.split(',')):
+        # Synthetic lexicon: the real words plus random words and two-word phrases.
+        phrases = set(DEFAULT_ABUSE_WORDS)
+        while len(phrases) < size:
+            words = [''.join(rng.choices(letters, k=rng.randint(4, 9))) for _ in range(rng.randint(1, 2))]
+            phrases.add(' '.join(words))
+
+        started = time.perf_counter()
+        matcher = PhraseMatcher(phrases)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for tokens in token_lists:
+                matcher.find_tokens(tokens)
+        per_review = (time.perf_counter() - started) / (repeat * len(texts)) * 1e6
+
+        # Baseline: test every phrase against the padded, normalized text.
+        padded = [f" {' '.join(tokens)} " for tokens in token_lists]
+        naive_repeat = max(1, repeat * 100 // size)
+        started = time.perf_counter()
+        for _ in range(naive_repeat):
+            for text in padded:
+                [p for p in phrases if f' {p} ' in text]
+        naive = (time.perf_counter() - started) / (naive_repeat * len(texts)) * 1e6
+
+        click.echo(f'{size:>8} {compile_ms:>11.1f} {matcher.node_count:>8} {per_review:>10.1f} {naive:>16.1f}')
+
+
+@moderation_cli.command('serve-inference')
+@click.option('--backend', help='Backend that runs the model (defaults to TOXICITY_INFERENCE_BACKEND).')
+def serve_inference_command(backend):
+    """Run the shared toxicity inference server on TOXICITY_INFERENCE_SOCKET."""
+    from app.moderation.governor import inference_governor
+    from app.moderation.inference_server import inference_authkey, run_inference_server
+    from app.moderation.model_manager import backend_options
+
+    config = current_app.config
+    # The server is the only process running the model, so it gets every core.
+    inference_governor.configure(config['TOXICITY_TORCH_THREADS'], 1, config['TOXICITY_MAX_CONCURRENT_INFERENCES'])
+    options = backend_options(config)
+    address = options.pop('socket_path')
+    authkey = inference_authkey(options.pop('authkey'), options.pop('authkey_path'), create=True)
+    click.echo(f'Serving {config["TOXICITY_MODEL_NAME"]} on {address} (Ctrl+C or SIGTERM to stop)')
+    run_inference_server(
+        address, authkey,
+        backend or config['TOXICITY_INFERENCE_BACKEND'],
+        config['TOXICITY_MODEL_NAME'],
+        window_ms=config['TOXICITY_BATCH_WINDOW_MS'],
+        max_batch_size=config['TOXICITY_BATCH_MAX_SIZE'],
+        **options,
+    )
+
+
+@moderation_cli.command('bench-inference-pool')
+@click.option('--workers', default=4, show_default=True, help='Number of simulated web workers.')
+@click.option('--requests', default=50, show_default=True, help='Texts classified by each worker.')
+@click.option('--texts', 'texts_path', type=click.Path(exists=True, dir_okay=False),
+              help='File with one review text per line.')
+def bench_inference_pool_command(workers, requests, texts_path):
+    """Compare memory and throughput of per-worker models with the shared inference server."""
+    import os
+    import secrets
+    import tempfile
+    from app.moderation.inference_server import benchmark_inference_pool
+    from app.moderation.model_manager import backend_options
+
+    config = current_app.config
+    options = backend_options(config)
+    for key in ('socket_path', 'authkey', 'authkey_path'):
+        options.pop(key)
+    # A throwaway server on a private socket, with its own one-off key.
+    authkey = secrets.token_bytes(32)
+    socket_path = os.path.join(tempfile.mkdtemp(), 'inference.sock')
+    report = benchmark_inference_pool(
+        workers, requests, _read_texts(texts_path), config['TOXICITY_MODEL_NAME'],
+        config['TOXICITY_INFERENCE_BACKEND'], options, socket_path, authkey,
+    )
+    click.echo(json.dumps(report, indent=2))
+
+
+@moderation_cli.command('remoderate')
+@click.option('--name', default='remoderate', show_default=True, help='Job name used for the checkpoint.')
+@click.option('--chunk-size', default=500, show_default=True, help='Reviews read and written per round trip.')
+@click.option('--processes', type=int, help='Worker processes for CPU-bound stages (default: CPU count, 0 = inline).')
+@click.option('--threads', default=32, show_default=True, help='Reviews moderated concurrently in the other stages.')
+@click.option('--restart', is_flag=True, help='Ignore the saved checkpoint and start from the first review.')
+@click.option('--dry-run', is_flag=True, help='Report what would change without writing anything.')
+@click.option('--stale-model', is_flag=True, help='Only reviews scored by a different toxicity model.')
+def remoderate_command(name, chunk_size, processes, threads, restart, dry_run, stale_model):
+    """Re-run moderation over stored reviews from an older moderation version (resumable)."""
+    from app.moderation.remoderation import RemoderationJob
+
+    def progress(checkpoint):
+        click.echo(
+            f"{checkpoint['processed']:>10} reviews  {checkpoint['reviewsPerSecond']:>8.1f}/s  "
+            f"rejected {checkpoint['rejected']}  changed {checkpoint['changed']}"
+        )
+
+    job = RemoderationJob(name, chunk_size, processes, threads, dry_run, stale_model)
+    result = job.run(restart=restart, progress=progress)
+    click.echo(
+        f"Done: {result['processed']} reviews re-moderated in {result['seconds']:.1f}s, "
+        f"{result['changed']} changed status" + (' (dry run, nothing written)' if dry_run else '')
+    )
+
+
+@moderation_cli.command('model-versions')
+def model_versions_command():
+    """Count stored reviews per toxicity model and lexicon version."""
+    from app.moderation.pipeline import model_version
+    from app.moderation.records import version_breakdown
+
+    current = model_version()
+    for row in version_breakdown():
+        marker = '*' if row['modelVersion'] == current else ' '
+        click.echo(
+            f"{marker} {row['modelVersion'] or '(no record)'}  lexicon {row['lexiconVersion'] or '-'}  "
+            f"{row['reviews']:>8} reviews  {row['rejected']:>6} rejected"
+        )
+
+
+@moderation_cli.command('train-cascade')
+@click.argument('data_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--label-with-model', is_flag=True,
+              help='DATA_PATH holds one text per line; label them with the toxicity model.')
+@click.option('--output', type=click.Path(dir_okay=False),
+              help='Model file to write (defaults to TOXICITY_CASCADE_PATH).')
+@click.option('--features', default=2 ** 18, show_default=True, help='Number of hash buckets.')
+@click.option('--epochs', default=5, show_default=True, help='Passes over the training data.')
+@click.option('--holdout', default=0.2, show_default=True, help='Fraction of texts held out for evaluation.')
+@click.option('--calibration', default=0.2, show_default=True,
+              help='Fraction of texts set aside for calibrating the thresholds.')
+@click.option('--target-agreement', default=0.99, show_default=True,
+              help='Required agreement of settled verdicts with the labels.')
+def train_cascade_command(data_path, label_with_model, output, features, epochs, holdout, calibration,
+                          target_agreement):
+    """
+    Train the toxicity pre-classifier.
+
+    DATA_PATH is a JSON-lines file of {"text": ..., "toxic": true/false} records,
+    or a plain text file with --label-with-model.
+    """
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+    from app.moderation.cascade import LinearCascade
+    from app.moderation.model_manager import toxicity_model
+
+    if label_with_model:
+        texts = _read_texts(data_path)
+        click.echo(f'Labeling {len(texts)} texts with {toxicity_model.model_name}...')
+        toxicity_model.get(timeout=600)
+        with ThreadPoolExecutor(32) as pool:  # concurrent calls share batches
+            predictions = list(pool.map(toxicity_model.predict, texts))
+        # The cascade learns the whole TOXICITY_THRESHOLDS policy, not just the 'toxic' label.
+        labels = [bool(toxicity_model.violations(p['scores'])) for p in predictions]
+    else:
+        with open(data_path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        texts = [r['text'] for r in records]
+        labels = [bool(r['toxic']) for r in records]
+
+    # Three disjoint parts: the weights are fitted on the training texts, the thresholds
+    # on the calibration texts (scores on texts the model was fitted on are overconfident)
+    # and the reported numbers come from texts used for neither.
+    order = list(range(len(texts)))
+    random.Random(13).shuffle(order)
+    test_cut = int(len(order) * (1 - holdout))
+    calibration_cut = int(len(order) * (1 - holdout - calibration))
+    if not 0 < calibration_cut < test_cut < len(order):
+        raise click.UsageError('Too few texts for training, calibration and held-out parts.')
+    train, calibrate, test = order[:calibration_cut], order[calibration_cut:test_cut], order[test_cut:]
+
+    model = LinearCascade.train([texts[i] for i in train], [labels[i] for i in train],
+                                n_features=features, epochs=epochs)
+    model.calibrate([texts[i] for i in calibrate], [labels[i] for i in calibrate], target_agreement)
+    model.metrics = model.evaluate([texts[i] for i in test], [labels[i] for i in test])
+    output = output or current_app.config['TOXICITY_CASCADE_PATH']
+    model.save(output)
+    click.echo(json.dumps({'output': output, 'train': len(train), 'calibration': len(calibrate),
+                           'low': model.low, 'high': model.high, 'heldOut': model.metrics}, indent=2))
+
+
+def _udhr_split(languages):
+    # Lines of each udhr text: every fifth line is held out for evaluation.
+    import nltk
+    from app.moderation.language import udhr_samples
+
+    nltk.download('udhr', quiet=True)
+    train, held_out = {}, {}
+    for code, text in udhr_samples(languages).items():
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        train[code] = '\n'.join(line for i, line in enumerate(lines) if i % 5)
+        held_out[code] = [line for i, line in enumerate(lines) if not i % 5]
+    return train, held_out
+
+
+@moderation_cli.command('train-language')
+@click.option('--languages', help='Comma-separated language codes (default: all in UDHR_LANGUAGES).')
+@click.option('--output', type=click.Path(dir_okay=False),
+              help='Model file to write (defaults to LANGUAGE_MODEL_PATH).')
+@click.option('--top', default=3000, show_default=True, help='Character n-grams kept per language.')
+def train_language_command(languages, output, top):
+    """Train the language identifier from the NLTK udhr corpus."""
+    from app.moderation.language import LanguageModel
+
+    train, _ = _udhr_split(languages.split(',') if languages else None)
+    model = LanguageModel.train(train, top=top)
+    output = output or current_app.config['LANGUAGE_MODEL_PATH']
+    model.save(output)
+    click.echo(f"Wrote {len(model.grams)} n-grams for {', '.join(model.languages)} to {output}")
+
+
+@moderation_cli.command('bench-language')
+@click.option('--model', 'model_path', type=click.Path(exists=True, dir_okay=False),
+              help='Model file (defaults to LANGUAGE_MODEL_PATH).')
+@click.option('--lengths', default='20,50,100,200', show_default=True,
+              help='Comma-separated snippet lengths (characters) to evaluate.')
+def bench_language_command(model_path, lengths):
+    """Measure language identification accuracy and latency on held-out udhr text."""
+    import time
+    from app.moderation.language import ENGLISH, LanguageModel
+
+    config = current_app.config
+    model = LanguageModel.load(model_path or config['LANGUAGE_MODEL_PATH'])
+    _, held_out = _udhr_split(model.languages)
+    reject, trust = config['LANGUAGE_REJECT_CONFIDENCE'], config['LANGUAGE_TRUST_CONFIDENCE']
+
+    click.echo(f"{'chars':>6} {'texts':>6} {'accuracy':>9} {'foreign rejected':>17} "
+               f"{'english rejected':>17} {'english trusted':>16} {'us/text':>8}")
+    for length in (int(n) for n in lengths.split(',')):
+        # Mixed-language sample: snippets of every held-out line, cut at a word boundary.
+        sample = [(code, line[:length].rsplit(' ', 1)[0] if len(line) > length else line)
+                  for code, lines in held_out.items() for line in lines if len(line) >= length // 2]
+        started = time.perf_counter()
+        predictions = [model.identify(text) for _, text in sample]
+        per_text = (time.perf_counter() - started) / len(sample) * 1e6
+
+        correct = sum(code == language for (code, _), (language, _) in zip(sample, predictions))
+        english = [p for (code, _), p in zip(sample, predictions) if code == ENGLISH]
+        foreign = [p for (code, _), p in zip(sample, predictions) if code != ENGLISH]
+        foreign_rejected = sum(l != ENGLISH and c >= reject for l, c in foreign) / max(1, len(foreign))
+        english_rejected = sum(l != ENGLISH and c >= reject for l, c in english) / max(1, len(english))
+        english_trusted = sum(l == ENGLISH and c >= trust for l, c in english) / max(1, len(english))
+        click.echo(f'{length:>6} {len(sample):>6} {correct / len(sample):>9.3f} {foreign_rejected:>17.3f} '
+                   f'{english_rejected:>17.3f} {english_trusted:>16.3f} {per_text:>8.1f}')
+
+
+@moderation_cli.command('build-nltk-data')
+@click.option('--output', type=click.Path(file_okay=False),
+              help='Bundle directory to write (defaults to NLTK_DATA_PATH).')
+def build_nltk_data_command(output):
+    """Download the NLTK resources the app needs into a versioned local bundle."""
+    from app.moderation.nltk_data import build_bundle
+
+    output = output or current_app.config['NLTK_DATA_PATH']
+    manifest = build_bundle(output)
+    size = sum(f['bytes'] for f in manifest['files'].values())
+    click.echo(
+        f"Wrote NLTK bundle {manifest['version']} ({', '.join(manifest['packages'])}; "
+        f"{size / 1e6:.1f} MB) to {output}"
+    )
+
+
+# Run in a fresh interpreter per measurement: create the app, then analyze one text
+# (which loads the tokenizer and stopwords). LEGACY repeats the old import-time downloads.
+_STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+if sys.argv[1] == 'legacy':
+    import nltk
+    for package in ('punkt', 'wordnet', 'stopwords'):
+        nltk.download(package, quiet=True)
+from app import create_app
+app = create_app()
+created = time.perf_counter()
+from app.moderation.analysis import TextAnalysis
+TextAnalysis('Warm up the tokenizer and the stopword list.')
+print(json.dumps({'createApp': created - started, 'firstAnalysis': time.perf_counter() - started}))
+"""
+
+
+@moderation_cli.command('bench-startup')
+@click.option('--runs', default=5, show_default=True, help='Fresh interpreters per mode.')
+def bench_startup_command(runs):
+    """Compare cold start with the NLTK bundle against the old import-time downloads."""
+    import os
+    import statistics
+    import subprocess
+    import sys
+
+    root = os.path.dirname(current_app.root_path)
+    env = dict(os.environ, TOXICITY_MODEL_PRELOAD='false')
+    click.echo(f"{'mode':>8} {'create_app ms':>14} {'first analysis ms':>18}")
+    for mode in ('legacy', 'bundle'):
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT, mode], cwd=root, env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+        create = statistics.median(s['createApp'] for s in samples) * 1000
+        first = statistics.median(s['firstAnalysis'] for s in samples) * 1000
+        click.echo(f'{mode:>8} {create:>14.0f} {first:>18.0f}')
+
+
+@moderation_cli.command('build-model-artifact')
+@click.option('--output', type=click.Path(file_okay=False),
+              help='Artifact directory to write (defaults to TOXICITY_ARTIFACT_PATH).')
+def build_model_artifact_command(output):
+    """Trace the toxicity model to TorchScript and serialize its fast tokenizer."""
+    from app.moderation.model_artifact import build_artifact
+
+    output = output or current_app.config['TOXICITY_ARTIFACT_PATH']
+    model_name = current_app.config['TOXICITY_MODEL_NAME']
+    click.echo(f'Building {model_name} artifact in {output}...')
+    manifest = build_artifact(model_name, output)
+    click.echo(f"Wrote {len(manifest['labels'])}-label TorchScript model (torch {manifest['torchVersion']}) to {output}")
+
+
+# Run in a fresh interpreter per measurement: load one backend, optionally warm it
+# up, then time the first and second classification of a real review.
+_FIRST_INFERENCE_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from app.moderation.backends import create_backend
+backend_name, model_name, warm_up, options = sys.argv[1], sys.argv[2], sys.argv[3] == '1', json.loads(sys.argv[4])
+if options['authkey']:
+    options['authkey'] = options['authkey'].encode('utf-8')
+backend = create_backend(backend_name, model_name, **options)
+backend.load()
+loaded = time.perf_counter()
+if warm_up:
+    backend.warm_up()
+ready = time.perf_counter()
+backend(['Great teacher, explains every topic clearly and patiently.'])
+first = time.perf_counter()
+backend(['The lectures were well organised and the assignments were fair.'])
+second = time.perf_counter()
+print(json.dumps({'load': loaded - started, 'warmUp': ready - loaded, 'firstInference': first - ready,
+                  'secondInference': second - first, 'timeToFirstInference': first - started}))
+"""
+
+
+@moderation_cli.command('bench-first-inference')
+@click.option('--backends', 'backend_names', default='pipeline,torchscript', show_default=True,
+              help='Comma-separated backends to compare.')
+@click.option('--runs', default=3, show_default=True, help='Fresh interpreters per backend and mode.')
+def bench_first_inference_command(backend_names, runs):
+    """Measure time to first inference per backend, with and without the warm-up."""
+    import os
+    import statistics
+    import subprocess
+    import sys
+    from app.moderation.model_manager import backend_options
+
+    config = current_app.config
+    options = backend_options(config)
+    if options['authkey']:
+        options['authkey'] = options['authkey'].decode('utf-8')
+    root = os.path.dirname(current_app.root_path)
+    click.echo(f"{'backend':>12} {'warm-up':>8} {'load ms':>9} {'warm-up ms':>11} "
+               f"{'1st ms':>8} {'2nd ms':>8} {'to 1st ms':>10}")
+    for backend in backend_names.split(','):
+        for warm_up in (False, True):
+            samples = []
+            for _ in range(runs):
+                out = subprocess.run(
+                    [sys.executable, '-c', _FIRST_INFERENCE_SCRIPT, backend, config['TOXICITY_MODEL_NAME'],
+                     '1' if warm_up else '0', json.dumps(options)],
+                    cwd=root, capture_output=True, text=True, check=True,
+                ).stdout
+                samples.append(json.loads(out.strip().splitlines()[-1]))
+
+            def median_ms(key):
+                return statistics.median(s[key] for s in samples) * 1000
+
+            click.echo(
+                f"{backend:>12} {'yes' if warm_up else 'no':>8} {median_ms('load'):>9.0f} "
+                f"{median_ms('warmUp'):>11.0f} {median_ms('firstInference'):>8.1f} "
+                f"{median_ms('secondInference'):>8.1f} {median_ms('timeToFirstInference'):>10.0f}"
+            )
+
+
+@moderation_cli.command('bench-tokenizer')
+@click.option('--texts', 'texts_path', type=click.Path(exists=True, dir_okay=False),
+              help='File with one review text per line (defaults to the stored reviews).')
+@click.option('--limit', default=5000, show_default=True, help='Stored reviews to read.')
+@click.option('--repeat', default=3, show_default=True, help='Passes over the texts when timing.')
+def bench_tokenizer_command(texts_path, limit, repeat):
+    """Compare the regex tokenizer with nltk.word_tokenize on speed and agreement."""
+    import time
+    from collections import Counter
+    from app import mongo
+    from app.moderation.analysis import TOKENIZERS, stop_words
+    from app.moderation.lexicon import lexicon_tokens
+
+    if texts_path:
+        texts = _read_texts(texts_path)
+    else:
+        texts = [r['text'] for r in mongo.db.reviews.find({}, {'text': 1}).limit(limit) if r.get('text')]
+        texts = texts or list(SAMPLE_REVIEWS)
+    lowered = [t.lower() for t in texts]
+
+    tokens = {}
+    click.echo(f'{len(texts)} texts')
+    click.echo(f"{'tokenizer':>10} {'texts/s':>10} {'tokens/s':>11}")
+    for name, tokenize in TOKENIZERS.items():
+        tokens[name] = [tokenize(t) for t in lowered]  # also warms up lazy loading
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for text in lowered:
+                tokenize(text)
+        seconds = (time.perf_counter() - started) / repeat
+        count = sum(len(t) for t in tokens[name])
+        click.echo(f'{name:>10} {len(texts) / seconds:>10.0f} {count / seconds:>11.0f}')
+
+    # Agreement on what the stages see: all tokens, and the content words the dictionary checks.
+    stop = stop_words()
+    identical = sum(a == b for a, b in zip(tokens['regex'], tokens['nltk']))
+    same_content = sum(
+        Counter(w for w in a if w not in stop) == Counter(w for w in b if w not in stop)
+        for a, b in zip(tokens['regex'], tokens['nltk'])
+    )
+    differences = Counter()
+    for a, b in zip(tokens['regex'], tokens['nltk']):
+        ca, cb = Counter(a), Counter(b)
+        differences.update({f'regex only: {w}': n for w, n in (ca - cb).items()})
+        differences.update({f'nltk only: {w}': n for w, n in (cb - ca).items()})
+    click.echo(f'Identical token lists: {identical / len(texts):.3%}')
+    click.echo(f'Identical content words: {same_content / len(texts):.3%}')
+    for difference, count in differences.most_common(10):
+        click.echo(f'  {count:>6}  {difference}')
+
+    # The abuse stage always matches on lexicon tokens, whichever tokenizer is selected;
+    # this shows how far the other stages' view of a review is from the matcher's.
+    lexicon = [lexicon_tokens(t) for t in texts]
+    for name in TOKENIZERS:
+        same = sum(a == b for a, b in zip(tokens[name], lexicon))
+        click.echo(f'{name} tokens identical to the abuse lexicon tokens: {same / len(texts):.3%}')
+
+
+@moderation_cli.command('bench-moderation')
+@click.option('--corpus', 'corpus_path', type=click.Path(exists=True, dir_okay=False),
+              help='Labeled JSON-lines corpus (defaults to app/moderation/data/bench_reviews.jsonl).')
+@click.option('--stages', help='Comma-separated stages to measure (defaults to MODERATION_STAGES).')
+@click.option('--concurrency', default='1,4,16', show_default=True, help='Comma-separated numbers of concurrent callers.')
+@click.option('--repeat', default=1, show_default=True, help='Passes over the corpus per concurrency level.')
+@click.option('--offline/--online', default=True, show_default=True,
+              help='Use local stand-ins for Urban Dictionary and the toxicity model.')
+@click.option('--dictionary-latency', default=0.05, show_default=True, help='Stand-in Urban Dictionary latency (s).')
+@click.option('--model-latency', default=0.02, show_default=True, help='Stand-in model latency per batch (s).')
+@click.option('--json', 'as_json', is_flag=True, help='Print the full report as JSON.')
+def bench_moderation_command(corpus_path, stages, concurrency, repeat, offline, dictionary_latency,
+                             model_latency, as_json):
+    """Measure latency, throughput and precision/recall of each stage and the whole chain."""
+    from contextlib import nullcontext
+    from app.moderation.benchmark import load_corpus, offline_standins, run_benchmark
+    from app.moderation.urban_dictionary import word_cache
+
+    samples, known = load_corpus(corpus_path)
+    stage_names = stages.split(',') if stages else current_app.config['MODERATION_STAGES']
+    levels = [int(c) for c in concurrency.split(',')]
+    standins = (
+        offline_standins(current_app, known, dictionary_latency, model_latency) if offline else nullcontext()
+    )
+    with standins:
+        # Every pass starts with an empty in-process word cache, so lookups are measured too.
+        report = run_benchmark(samples, stage_names, levels, repeat, before_pass=word_cache.clear)
+
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+    click.echo(f"{len(samples)} labeled texts x {repeat}, {'offline stand-ins' if offline else 'live services'}")
+    click.echo(f"{'target':>10} {'callers':>8} {'texts/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, result in report.items():
+        for level, row in result['concurrency'].items():
+            click.echo(
+                f"{name:>10} {level:>8} {row['textsPerSecond']:>9.1f} "
+                f"{row['p50Ms']:>8.2f} {row['p95Ms']:>8.2f} {row['p99Ms']:>8.2f}"
+            )
+    click.echo(f"{'target':>10} {'precision':>10} {'recall':>8} {'fp':>4} {'fn':>4}")
+    for name, result in report.items():
+        accuracy = result['accuracy']
+        precision = '-' if accuracy['precision'] is None else f"{accuracy['precision']:.3f}"
+        recall = '-' if accuracy['recall'] is None else f"{accuracy['recall']:.3f}"
+        click.echo(
+            f"{name:>10} {precision:>10} {recall:>8} "
+            f"{accuracy['falsePositives']:>4} {accuracy['falseNegatives']:>4}"
+        )
+
+
+def register_commands(app):
+    """
+    Registers all custom CLI command groups with the Flask application.
+
+    :param app: The Flask application instance.
+    """
+    app.cli.add_command(moderation_cli)
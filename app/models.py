@@ -18,11 +18,28 @@ staff_model = api.model('Staff', {
     'schoolId': fields.String(required=True, description='The ID of the school the staff belongs to')
 })
 
+# Moderation states of a review. Reviews stored before moderation states existed
+# have no 'status' field and are treated as approved.
+REVIEW_PENDING = 'pending'
+REVIEW_APPROVED = 'approved'
+REVIEW_REJECTED = 'rejected'
+
+# MongoDB filter that selects the reviews listing endpoints are allowed to show.
+APPROVED_REVIEWS_QUERY = {'status': {'$nin': [REVIEW_PENDING, REVIEW_REJECTED]}}
+
 # Defines the data model for a 'Review'. 
 review_model = api.model('Review', {
     '_id': fields.String(readonly=True, description='The unique identifier from the database'),
     'text': fields.String(required=True, description='The content of the review'),
     'rating': fields.Integer(required=True, min=1, max=5, description='The rating given, from 1 to 5'),
     'date': fields.DateTime(required=True, description='The date the review was submitted'),
-    'staffId': fields.String(required=True, description='The ID of the staff member being reviewed')
+    'staffId': fields.String(required=True, description='The ID of the staff member being reviewed'),
+    'status': fields.String(readonly=True, description='Moderation status: pending, approved or rejected')
+})
+
+# Defines the response model for a review's moderation status.
+review_status_model = api.model('ReviewStatus', {
+    'review_id': fields.String(description='The unique identifier from the database'),
+    'status': fields.String(description='Moderation status: pending, approved or rejected'),
+    'reason': fields.String(description='Why the review was rejected, if it was')
 })
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Review moderation services. 🛡️
+
+The objects in this package are process-wide singletons (model manager, caches,
+schedulers). They are bound to the Flask application by :func:`init_app`, which
+``create_app`` calls in the same way it initializes PyMongo and Flask-RESTX.
+"""
+
+
+def init_app(app):
+    """
+    Bind all moderation components to the given Flask application.
+
+    :param app: The Flask application instance.
+    """
+    from app.moderation.analysis import set_tokenizer
+    from app.moderation.async_worker import async_moderator
+    from app.moderation.cascade import toxicity_cascade
+    from app.moderation.governor import inference_governor
+    from app.moderation.language import language_identifier
+    from app.moderation.lexicon import abuse_lexicon
+    from app.moderation.model_manager import toxicity_model
+    from app.moderation.near_duplicates import near_duplicates
+    from app.moderation.nltk_data import nltk_data
+    from app.moderation.pipeline import moderation_pipeline
+    from app.moderation.urban_dictionary import urban_dictionary, word_cache
+    from app.moderation.verdict_cache import verdict_cache
+    from app.moderation.vocabulary import vocabulary
+
+    # Put the bundled NLTK resources on NLTK's search path (nothing is downloaded).
+    nltk_data.init_app(app)
+
+    # Select the tokenizer every review is split with (shared by all stages).
+    set_tokenizer(app.config['MODERATION_TOKENIZER'])
+
+    # Compile the abuse lexicon (reloaded automatically when its source changes).
+    abuse_lexicon.init_app(app)
+
+    # Memory-map the prebuilt vocabulary index (milliseconds; shared by forked workers).
+    vocabulary.init_app(app)
+
+    # Character n-gram language identifier used by the language and dictionary stages.
+    language_identifier.init_app(app)
+
+    # Thread budget and concurrency limit for model inference (set before the model loads).
+    inference_governor.init_app(app)
+
+    # Start warming up the toxicity model in the background.
+    toxicity_model.init_app(app)
+
+    # Hashed n-gram pre-classifier that settles clear-cut reviews before the model.
+    toxicity_cascade.init_app(app)
+
+    # In-memory MinHash index of recently accepted reviews (spam floods).
+    near_duplicates.init_app(app)
+
+    # Cache of verdicts for repeated review texts.
+    verdict_cache.init_app(app)
+
+    # Persistent cache of Urban Dictionary word lookups.
+    word_cache.init_app(app)
+
+    # Pooled, deadline-bounded Urban Dictionary client.
+    urban_dictionary.init_app(app)
+
+    # The ordered list of moderation stages run on each review.
+    moderation_pipeline.init_app(app)
+
+    # Background moderation of pending reviews (MODERATION_ASYNC).
+    async_moderator.init_app(app)
@@ -0,0 +1,141 @@
+import hashlib
+import re
+import threading
+
+from app.moderation.lexicon import lexicon_tokens
+
+_stop_words = None
+_stop_words_lock = threading.Lock()
+
+# Registry of tokenizers, keyed by the name used in MODERATION_TOKENIZER.
+TOKENIZERS = {}
+
+
+def register_tokenizer(name):
+    """Decorator that makes a tokenizer function selectable through MODERATION_TOKENIZER."""
+    def decorator(func):
+        TOKENIZERS[name] = func
+        return func
+    return decorator
+
+
+# One pass over the text that reproduces what word_tokenize yields for review text once
+# punctuation-only tokens are dropped: contractions split Treebank-style ("don't" ->
+# "do", "n't"; "she's" -> "she", "'s"), while hyphenated words, inner apostrophes,
+# decimals and slashes stay inside a token. Punctuation is never matched at all.
+_TOKEN = re.compile(r"""
+    [^\W_]+(?=n't\b)
+  | n't\b
+  | '(?:s|m|d|ll|re|ve)\b
+  | [^\W_]+(?:(?:[-./]|'(?!(?:s|m|d|ll|re|ve|t)\b))[^\W_]+)*
+""", re.VERBOSE)
+
+
+@register_tokenizer('regex')
+def regex_tokenize(text):
+    """Split lowercased text into word tokens with a single precompiled regex."""
+    return _TOKEN.findall(text)
+
+
+@register_tokenizer('nltk')
+def nltk_tokenize(text):
+    """Split lowercased text with ``nltk.word_tokenize`` (Punkt + Treebank), dropping punctuation."""
+    from nltk.tokenize import word_tokenize
+    return [t for t in word_tokenize(text) if any(c.isalnum() for c in t)]
+
+
+_tokenize = regex_tokenize
+_tokenizer_name = 'regex'
+
+
+def set_tokenizer(name):
+    """
+    Select the tokenizer used by TextAnalysis.
+
+    Raises:
+        ValueError: If no tokenizer with that name is registered.
+    """
+    global _tokenize, _tokenizer_name
+    if name not in TOKENIZERS:
+        raise ValueError(f"Unknown tokenizer '{name}'. Available: {', '.join(sorted(TOKENIZERS))}")
+    _tokenize, _tokenizer_name = TOKENIZERS[name], name
+
+
+def tokenizer_name():
+    """Name of the tokenizer TextAnalysis currently uses."""
+    return _tokenizer_name
+
+
+def stop_words():
+    """
+    The English stopword set, loaded once per process from the NLTK bundle's compact
+    list if there is one, else from the NLTK stopwords corpus.
+    """
+    global _stop_words
+    if _stop_words is None:
+        with _stop_words_lock:
+            if _stop_words is None:
+                from app.moderation.nltk_data import nltk_data
+                path = nltk_data.compact_stopwords_path()
+                if path:
+                    with open(path, encoding='utf-8') as f:
+                        _stop_words = frozenset(line.strip() for line in f if line.strip())
+                else:
+                    from nltk.corpus import stopwords
+                    _stop_words = frozenset(stopwords.words('english'))
+    return _stop_words
+
+
+def text_hash(normalized):
+    """Stable content hash of an already normalized text."""
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class TextAnalysis:
+    """
+    Everything the moderation stages need to know about one review text. 🧾
+
+    Built once per review and handed to every stage, so the text is lowercased and
+    tokenized exactly once on the request path.
+
+    Attributes:
+        raw (str): The text as submitted (the toxicity model sees this).
+        tokens (list): Lowercased word tokens (from the MODERATION_TOKENIZER tokenizer)
+            with punctuation-only tokens removed. The abuse stage does not use them;
+            it matches on ``lexicon_tokens``.
+        content_tokens (list): ``tokens`` without English stopwords.
+        normalized (str): The tokens joined by single spaces ("Great teacher!" -> "great teacher").
+        hash (str): SHA-256 of ``normalized``; identifies trivially different texts.
+        lexicon_tokens (list): The text split like the abuse lexicon entries, by
+            :func:`app.moderation.lexicon.lexicon_tokens`; computed on first use.
+        language (tuple): ``(code, probability)`` from the language identifier,
+            computed on first use; ``(None, None)`` if it cannot tell.
+    """
+
+    __slots__ = ('raw', 'tokens', 'content_tokens', 'normalized', 'hash', '_lexicon_tokens', '_language')
+
+    def __init__(self, text):
+        self.raw = text
+        self.tokens = _tokenize(text.lower())
+        stop = stop_words()
+        self.content_tokens = [t for t in self.tokens if t not in stop]
+        self.normalized = ' '.join(self.tokens)
+        self.hash = text_hash(self.normalized)
+        self._lexicon_tokens = None
+        self._language = None
+
+    @property
+    def lexicon_tokens(self):
+        # The abuse matcher must see the text split exactly like its phrases were, or
+        # "idiot/moron" and "half-wit" slip through as single tokens.
+        if self._lexicon_tokens is None:
+            self._lexicon_tokens = lexicon_tokens(self.raw)
+        return self._lexicon_tokens
+
+    @property
+    def language(self):
+        # Shared by the language and dictionary stages; computing it twice is harmless.
+        if self._language is None:
+            from app.moderation.language import language_identifier
+            self._language = language_identifier.identify(self.raw)
+        return self._language
@@ -0,0 +1,253 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+from app.models import REVIEW_PENDING
+from app.moderation.model_manager import ModelNotReady
+from app.moderation.near_duplicates import near_duplicates
+from app.moderation.pipeline import moderate_text
+from app.moderation.records import review_fields
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncModerator:
+    """
+    Moderates stored reviews in the background. ⏳
+
+    In asynchronous mode ``POST /reviews`` stores the review with ``status: pending``
+    and hands its id to this worker pool, which runs the moderation pipeline and
+    flips the status to ``approved`` or ``rejected``.
+
+    Every pending review carries a ``moderationLease`` (owner and expiry), so across
+    all web worker processes each review is moderated by one process at a time: the
+    route leases a review when it inserts it, and a periodic sweep in every process
+    claims pending reviews whose lease has expired (their process died or gave up)
+    with an atomic ``find_one_and_update``. A failed attempt is recorded on the review
+    (``moderationAttempts``, ``moderationError``) and retried after a backoff; after
+    MODERATION_ASYNC_MAX_ATTEMPTS failures the review stays pending with its error
+    and is no longer claimed.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.workers = 4
+        self.retry_delay = 5.0
+        self.model_attempts = 5
+        self.lease_seconds = 300
+        self.sweep_interval = 30
+        self.max_attempts = 5
+        self._token = uuid.uuid4().hex[:8]
+        self._sweeper = None
+        self._submitted = 0
+        self._approved = 0
+        self._rejected = 0
+        self._failed = 0
+        self._reclaimed = 0
+        self._superseded = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # A forked worker inherits neither the pool threads nor the sweeper; drop the
+        # inherited pool so the next submit creates one, and sweep in this process too.
+        self._lock = threading.Lock()
+        self._executor = None
+        if self._sweeper is not None:
+            self._start_sweeper()
+
+    def _start_sweeper(self):
+        # Runs in the background so an unreachable database does not block startup.
+        self._sweeper = threading.Thread(target=self._sweep_forever, name='moderation-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def init_app(self, app):
+        """
+        Read the async settings from the app config and start sweeping for pending reviews.
+
+        :param app: The Flask application instance.
+        """
+        self.enabled = app.config['MODERATION_ASYNC']
+        self.workers = app.config['MODERATION_ASYNC_WORKERS']
+        self.lease_seconds = app.config['MODERATION_ASYNC_LEASE_SECONDS']
+        self.sweep_interval = app.config['MODERATION_ASYNC_SWEEP_INTERVAL']
+        self.max_attempts = app.config['MODERATION_ASYNC_MAX_ATTEMPTS']
+        if self.enabled and self._sweeper is None:
+            self._start_sweeper()
+
+    @property
+    def owner(self):
+        # Includes the pid, so workers forked from one preloaded app hold distinct leases.
+        return f'{socket.gethostname()}:{os.getpid()}:{self._token}'
+
+    def lease(self, seconds=None):
+        """A ``moderationLease`` value held by this process for ``seconds`` (default: the lease length)."""
+        expires = datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds if seconds is None else seconds)
+        return {'owner': self.owner, 'expiresAt': expires}
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='async-moderation'
+                )
+            return self._executor
+
+    def submit(self, review_id, text, staff_id=None):
+        """Queue a stored, pending review whose lease this process holds."""
+        with self._lock:
+            self._submitted += 1
+        self._pool().submit(self._moderate, review_id, text, staff_id)
+
+    def _run_pipeline(self, review_id, text):
+        # Returns (record, error, counts): a cold model is waited for a few times, and
+        # still being cold afterwards does not count as a failed attempt.
+        for attempt in range(1, self.model_attempts + 1):
+            try:
+                return moderate_text(text), None, False
+            except ModelNotReady as e:
+                logger.info('Review %s waiting for the model (attempt %d): %s', review_id, attempt, e)
+                error = str(e)
+                time.sleep(self.retry_delay)
+            except Exception as e:
+                logger.exception('Moderation of review %s failed', review_id)
+                return None, f'{type(e).__name__}: {e}', True
+        return None, error, False
+
+    def _moderate(self, review_id, text, staff_id):
+        from app import mongo
+
+        mine = {'_id': review_id, 'status': REVIEW_PENDING, 'moderationLease.owner': self.owner}
+        record, error, counts = self._run_pipeline(review_id, text)
+        if record is None:
+            self._fail(review_id, mine, error, counts)
+            return
+
+        verdict = record['rejection']
+        try:
+            # Only applies while this process still holds the lease.
+            stored = mongo.db.reviews.update_one(
+                mine, {'$set': review_fields(record), '$unset': {'moderationLease': '', 'moderationError': ''}},
+            ).modified_count
+        except Exception as e:
+            logger.exception('Could not store the verdict for review %s', review_id)
+            self._fail(review_id, mine, f'{type(e).__name__}: {e}')
+            return
+        if not stored:
+            logger.info('Review %s is no longer leased to this worker; verdict dropped', review_id)
+            with self._lock:
+                self._superseded += 1
+            return
+        if verdict:
+            # A corrected resubmission must not be turned away as a copy of this one.
+            near_duplicates.mark_rejected(text, staff_id)
+        with self._lock:
+            if verdict:
+                self._rejected += 1
+            else:
+                self._approved += 1
+
+    def _fail(self, review_id, mine, error, counts=True):
+        # Keeps the lease until the backoff has passed; then any process's sweep retries it.
+        from app import mongo
+
+        with self._lock:
+            self._failed += 1
+        try:
+            review = mongo.db.reviews.find_one_and_update(
+                mine,
+                {'$set': {'moderationError': error}, '$inc': {'moderationAttempts': 1 if counts else 0}},
+                projection={'moderationAttempts': 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if review is None:
+                return
+            attempts = review['moderationAttempts']
+            if counts and attempts >= self.max_attempts:
+                logger.error('Giving up on review %s after %d attempts: %s', review_id, attempts, error)
+            backoff = min(self.retry_delay * 2 ** attempts, self.lease_seconds)
+            mongo.db.reviews.update_one(mine, {'$set': {'moderationLease': self.lease(backoff)}})
+        except Exception:
+            logger.exception('Could not record the failed moderation of review %s', review_id)
+
+    def _claim(self):
+        # Atomically takes over one pending review that nobody holds a live lease on.
+        from app import mongo
+        now = datetime.now(timezone.utc)
+        return mongo.db.reviews.find_one_and_update(
+            {
+                'status': REVIEW_PENDING,
+                'moderationAttempts': {'$not': {'$gte': self.max_attempts}},
+                '$or': [{'moderationLease': None}, {'moderationLease.expiresAt': {'$lte': now}}],
+            },
+            {'$set': {'moderationLease': self.lease()}},
+            projection={'text': 1, 'staffId': 1},
+        )
+
+    def recover_pending(self, limit=None):
+        """
+        Claim and queue pending reviews without a live lease, e.g. after a restart.
+
+        Args:
+            limit (int): Most reviews to claim; defaults to the number of worker threads,
+                so claimed reviews do not sit in the queue until their lease expires.
+
+        Returns:
+            int: The number of reviews claimed.
+        """
+        count = 0
+        try:
+            while count < (limit or self.workers):
+                review = self._claim()
+                if review is None:
+                    break
+                self.submit(review['_id'], review.get('text', ''), review.get('staffId'))
+                count += 1
+        except Exception:
+            logger.exception('Could not recover pending reviews')
+        if count:
+            with self._lock:
+                self._reclaimed += count
+            logger.info('Claimed %d pending reviews for moderation', count)
+        return count
+
+    def _sweep_forever(self):
+        from app import mongo
+        try:
+            mongo.db.reviews.create_index([('status', 1), ('moderationLease.expiresAt', 1)])
+        except Exception:
+            logger.exception('Could not create the pending review index')
+        while True:
+            self.recover_pending()
+            time.sleep(self.sweep_interval)
+
+    def stats(self):
+        """Counters for the moderation status endpoint."""
+        with self._lock:
+            finished = self._approved + self._rejected + self._failed + self._superseded
+            return {
+                'enabled': self.enabled,
+                'workers': self.workers,
+                'submitted': self._submitted,
+                'approved': self._approved,
+                'rejected': self._rejected,
+                'failed': self._failed,
+                'reclaimed': self._reclaimed,
+                'superseded': self._superseded,
+                'inProgress': self._submitted - finished,
+                'leaseSeconds': self.lease_seconds,
+                'maxAttempts': self.max_attempts,
+            }
+
+
+# The process-wide async moderator, bound to the app by app.moderation.init_app.
+async_moderator = AsyncModerator()
@@ -0,0 +1,266 @@
+import logging
+import math
+import os
+import re
+
+from app.moderation.governor import inference_governor
+
+logger = logging.getLogger(__name__)
+
+# Registry of toxicity inference backends, keyed by the name used in TOXICITY_BACKEND.
+BACKENDS = {}
+
+_WORD = re.compile(r'\S+')
+
+
+def register_backend(name):
+    """
+    Class decorator that makes a backend selectable through TOXICITY_BACKEND.
+
+    :param name: The configuration name of the backend.
+    """
+    def decorator(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def label_scores(scores):
+    """Build a backend result from the score of every label: the top label first, then all scores."""
+    label = max(scores, key=scores.get)
+    return {'label': label, 'score': scores[label], 'scores': scores}
+
+
+def uses_sigmoid(config):
+    """Whether a model's logits become scores by sigmoid (else softmax), as in the transformers pipeline."""
+    return config.problem_type == 'multi_label_classification' or config.num_labels == 1
+
+
+def logits_to_results(logits, labels, use_sigmoid):
+    """
+    Turn a batch of raw logits into backend results.
+
+    Args:
+        logits (list): One row of logits per text.
+        labels (list): The label of each logit position.
+        use_sigmoid (bool): Score each logit on its own (multi-label models) instead
+            of a softmax over the row; see :func:`uses_sigmoid`.
+
+    Returns:
+        list: One :func:`label_scores` result per row.
+    """
+    results = []
+    for row in logits:
+        if use_sigmoid:
+            scores = [1.0 / (1.0 + math.exp(-x)) for x in row]
+        else:
+            peak = max(row)
+            exps = [math.exp(x - peak) for x in row]
+            total = sum(exps)
+            scores = [e / total for e in exps]
+        results.append(label_scores(dict(zip(labels, scores))))
+    return results
+
+
+def create_backend(name, model_name, **options):
+    """
+    Instantiate the backend registered under ``name``.
+
+    Raises:
+        ValueError: If no backend with that name is registered.
+    """
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown toxicity backend '{name}'. Available: {', '.join(sorted(BACKENDS))}"
+        )
+    return backend_cls(model_name, **options)
+
+
+class ToxicityBackend:
+    """
+    Base class for toxicity inference backends.
+
+    A backend is constructed cheaply, does all heavy work in :meth:`load` (which the
+    model manager runs on its background thread) and is then called with a list of
+    texts. It returns one ``{'label': ..., 'score': ..., 'scores': {...}}`` dict per
+    text: the top label and its score, as the transformers text-classification
+    pipeline reports them, plus the score of every label from the same pass.
+
+    Backends that set ``tokenizer`` (a fast Hugging Face tokenizer) report exact
+    token positions, which long texts are split on; the others approximate tokens
+    by whitespace-separated words.
+    """
+
+    name = None
+    tokenizer = None
+
+    def __init__(self, model_name, **options):
+        self.model_name = model_name
+        self.options = options
+
+    def load(self):
+        raise NotImplementedError
+
+    def __call__(self, texts):
+        raise NotImplementedError
+
+    def token_spans(self, text):
+        """Character ``(start, end)`` spans of the model tokens in ``text``, without special tokens."""
+        if self.tokenizer is None:
+            return [m.span() for m in _WORD.finditer(text)]
+        encoded = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        return [tuple(span) for span in encoded['offset_mapping']]
+
+    def warm_up(self, max_tokens=512):
+        """
+        Classify synthetic reviews of a few lengths, one at a time and as a batch.
+
+        The first forward passes pay for lazy setup (graph optimization, memory
+        pools, tokenizer caches); doing them here keeps that off the first review.
+        """
+        longest = max(1, max_tokens - self.special_tokens)
+        texts = [
+            'Great teacher.',
+            ' '.join(['The lectures were clear and well organised.'] * 8),
+            ' '.join(['teacher'] * longest),
+        ]
+        for text in texts:
+            self([text])
+        self(texts)
+
+    @property
+    def special_tokens(self):
+        """Number of special tokens ([CLS], [SEP], ...) the model adds to every input."""
+        if self.tokenizer is None:
+            return 2
+        return self.tokenizer.num_special_tokens_to_add()
+
+
+@register_backend('pipeline')
+class PipelineBackend(ToxicityBackend):
+    """The full-precision transformers pipeline; the reference implementation."""
+
+    def load(self):
+        from transformers import pipeline
+        inference_governor.apply_torch_threads()
+        self.pipeline = pipeline("text-classification", model=self.model_name)
+        self.tokenizer = self.pipeline.tokenizer
+
+    def __call__(self, texts):
+        # Texts are already cut to the token budget; truncation only guards the model limit.
+        # top_k=None returns every label (sigmoid scores for multi-label models like toxic-bert).
+        rows = self.pipeline(texts, batch_size=len(texts), truncation=True, top_k=None)
+        return [label_scores({item['label']: item['score'] for item in row}) for row in rows]
+
+
+@register_backend('onnx-int8')
+class OnnxInt8Backend(ToxicityBackend):
+    """
+    ONNX Runtime on CPU with int8 dynamically quantized weights.
+
+    On first use the Hugging Face model is exported to ONNX and quantized into
+    ``cache_dir``; later loads reuse the quantized file and only need the tokenizer
+    and onnxruntime, not torch.
+    """
+
+    def __init__(self, model_name, cache_dir='model_cache', **options):
+        super().__init__(model_name, **options)
+        self.cache_dir = cache_dir
+
+    @property
+    def model_dir(self):
+        return os.path.join(self.cache_dir, self.model_name.replace('/', '--'))
+
+    def load(self):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        config = AutoConfig.from_pretrained(self.model_name)
+        self.labels = [config.id2label[i] for i in range(config.num_labels)]
+        self.use_sigmoid = uses_sigmoid(config)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Same thread budget as torch; concurrent passes are capped by the governor.
+        options.intra_op_num_threads = inference_governor.threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            self._quantized_model(), options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _quantized_model(self):
+        quantized_path = os.path.join(self.model_dir, 'model.int8.onnx')
+        if os.path.exists(quantized_path):
+            return quantized_path
+
+        import torch
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from transformers import AutoModelForSequenceClassification
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        export_path = os.path.join(self.model_dir, 'model.onnx')
+        logger.info("Exporting '%s' to ONNX in %s", self.model_name, self.model_dir)
+
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        model.eval()
+        sample = self.tokenizer(['export sample'], return_tensors='pt')
+        input_names = [n for n in ('input_ids', 'attention_mask', 'token_type_ids') if n in sample]
+        dynamic_axes = {n: {0: 'batch', 1: 'sequence'} for n in input_names}
+        dynamic_axes['logits'] = {0: 'batch'}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[n] for n in input_names),
+                export_path,
+                input_names=input_names,
+                output_names=['logits'],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        quantize_dynamic(export_path, quantized_path, weight_type=QuantType.QInt8)
+        return quantized_path
+
+    def __call__(self, texts):
+        encoded = self.tokenizer(
+            list(texts), padding=True, truncation=True, return_tensors='np'
+        )
+        feed = {name: encoded[name].astype('int64') for name in self.input_names}
+        logits = self.session.run(['logits'], feed)[0]
+        return logits_to_results(logits.tolist(), self.labels, self.use_sigmoid)
+
+
+def compare_backends(reference, candidate, texts, tolerance=0.05):
+    """
+    Check that two loaded backends agree on the top label and on every label score for each text.
+
+    Args:
+        reference (ToxicityBackend): The backend treated as ground truth.
+        candidate (ToxicityBackend): The backend under test.
+        texts (list): Texts to classify with both.
+        tolerance (float): Maximum allowed absolute score difference.
+
+    Returns:
+        dict: Counts, the largest score difference and the texts that disagree.
+    """
+    expected = reference(texts)
+    actual = candidate(texts)
+    mismatches = []
+    max_delta = 0.0
+    for text, ref, got in zip(texts, expected, actual):
+        ref_scores = ref.get('scores') or {ref['label']: ref['score']}
+        got_scores = got.get('scores') or {got['label']: got['score']}
+        delta = max(abs(score - got_scores.get(label, 0.0)) for label, score in ref_scores.items())
+        max_delta = max(max_delta, delta)
+        if ref['label'] != got['label'] or delta > tolerance:
+            mismatches.append({'text': text, 'reference': ref, 'candidate': got})
+    return {
+        'texts': len(texts),
+        'maxScoreDelta': max_delta,
+        'tolerance': tolerance,
+        'mismatches': mismatches,
+    }
@@ -0,0 +1,131 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent inference requests into small batches. 📦
+
+    Callers hand in single items with :meth:`submit` and get a Future back. A
+    background thread takes the first pending item, keeps collecting for
+    up to ``window_ms`` milliseconds or until ``max_batch_size`` items are queued,
+    and then runs ``infer`` once on the whole batch. Each Future receives the
+    result at its own position, so requests never see each other's output.
+
+    Args:
+        infer (callable): Takes a list of items and returns a list of results of the same length.
+        window_ms (float): How long to wait for more items after the first one arrives.
+        max_batch_size (int): Upper bound on the number of items per inference call.
+        name (str): Name of the worker thread, used in logs.
+        governor (InferenceGovernor): If given, every batch waits for one of its
+            forward-pass slots, which also records how long each item queued, and
+            one collecting thread is started per slot so batches can overlap.
+    """
+
+    def __init__(self, infer, window_ms=5, max_batch_size=16, name='micro-batcher', governor=None):
+        self.infer = infer
+        self.governor = governor
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+        self._size_counts = {}
+
+    def configure(self, window_ms, max_batch_size):
+        """Update the batching window and maximum batch size."""
+        self.window_ms = window_ms
+        self.max_batch_size = max(1, int(max_batch_size))
+
+    def submit(self, item):
+        """
+        Queue one item for the next batch.
+
+        Returns:
+            concurrent.futures.Future resolving to the item's own result.
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.monotonic()))
+        return future
+
+    def submit_many(self, items):
+        """Queue several items at once; they are eligible for the same batch."""
+        return [self.submit(item) for item in items]
+
+    def _ensure_worker(self):
+        wanted = self.governor.max_concurrent if self.governor else 1
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < wanted:
+                thread = threading.Thread(target=self._run, name=f'{self.name}-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _collect(self):
+        # Block until the first item arrives, then fill the batch until the window closes.
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _, _ in batch]
+            futures = [future for _, future, _ in batch]
+            slot = self.governor.slot([t for _, _, t in batch]) if self.governor else nullcontext()
+            try:
+                with slot:
+                    results = self.infer(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f'{self.name}: expected {len(items)} results, got {len(results)}'
+                    )
+            except Exception as e:
+                logger.exception('%s: batch of %d failed', self.name, len(items))
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            self._record(len(items))
+
+    def _record(self, size):
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._max_seen = max(self._max_seen, size)
+            self._size_counts[size] = self._size_counts.get(size, 0) + 1
+
+    def stats(self):
+        """Batch-size statistics since startup."""
+        with self._lock:
+            return {
+                'windowMs': self.window_ms,
+                'maxBatchSize': self.max_batch_size,
+                'batches': self._batches,
+                'items': self._items,
+                'meanBatchSize': round(self._items / self._batches, 2) if self._batches else 0.0,
+                'largestBatch': self._max_seen,
+                'batchSizeCounts': {str(size): count for size, count in sorted(self._size_counts.items())},
+                'pending': self._queue.qsize(),
+            }
@@ -0,0 +1,172 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from app.moderation.analysis import TextAnalysis
+from app.moderation.pipeline import STAGES, ModerationPipeline
+
+# The labeled corpus used when no other is given.
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'bench_reviews.jsonl')
+
+CHAIN = 'chain'
+
+
+def load_corpus(path=None):
+    """
+    Read a labeled review corpus.
+
+    Each line is a JSON object ``{"text": ..., "reject": [stage, ...]}`` listing the
+    stages that should reject the text (empty for acceptable reviews), optionally
+    with ``"known": [word, ...]``, slang the stand-in Urban Dictionary should know.
+
+    Returns:
+        tuple: (list of (text, set of stage names), set of known words)
+    """
+    samples, known = [], set()
+    with open(path or DEFAULT_CORPUS, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            samples.append((record['text'], set(record.get('reject', ()))))
+            known.update(record.get('known', ()))
+    return samples, known
+
+
+def latency_percentiles(seconds):
+    """p50/p95/p99 and mean of latency samples, in milliseconds."""
+    samples = sorted(seconds)
+    if not samples:
+        return {'p50Ms': None, 'p95Ms': None, 'p99Ms': None, 'meanMs': None}
+
+    def percentile(p):
+        return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+    return {
+        'p50Ms': percentile(0.50),
+        'p95Ms': percentile(0.95),
+        'p99Ms': percentile(0.99),
+        'meanMs': round(sum(samples) / len(samples) * 1000, 3),
+    }
+
+
+def precision_recall(predicted, expected):
+    """Precision and recall of rejections, with the confusion counts."""
+    tp = sum(p and e for p, e in zip(predicted, expected))
+    fp = sum(p and not e for p, e in zip(predicted, expected))
+    fn = sum(e and not p for p, e in zip(predicted, expected))
+    return {
+        'precision': round(tp / (tp + fp), 4) if tp + fp else None,
+        'recall': round(tp / (tp + fn), 4) if tp + fn else None,
+        'truePositives': tp,
+        'falsePositives': fp,
+        'falseNegatives': fn,
+    }
+
+
+def _timed_pass(check, texts, concurrency):
+    # Runs check() over every text with `concurrency` callers; returns (rejections, latencies, seconds).
+    latencies = [0.0] * len(texts)
+    rejected = [False] * len(texts)
+
+    def one(i):
+        started = time.perf_counter()
+        rejected[i] = bool(check(texts[i]))
+        latencies[i] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(len(texts)):
+            one(i)
+    else:
+        with ThreadPoolExecutor(concurrency, thread_name_prefix='moderation-bench') as pool:
+            list(pool.map(one, range(len(texts))))
+    return rejected, latencies, time.perf_counter() - started
+
+
+def run_benchmark(samples, stage_names, concurrency_levels=(1, 4, 16), repeat=1, before_pass=None):
+    """
+    Measure every stage on its own and the whole chain over a labeled corpus.
+
+    Every check starts from the raw text (tokenizing included), and the verdict
+    cache is bypassed, so repeated texts are moderated every time. Precision and
+    recall come from the first single-caller pass: a stage is right to reject a
+    text labeled with that stage, the chain to reject a text with any label.
+
+    Args:
+        samples (list): (text, set of stage names) pairs from :func:`load_corpus`.
+        stage_names (list): Stages to measure, and to chain in that order by cost.
+        concurrency_levels (iterable): Numbers of concurrent callers to measure.
+        repeat (int): Passes over the corpus per concurrency level.
+        before_pass (callable): Called before each pass, e.g. to empty caches.
+
+    Returns:
+        dict: Per target (each stage and ``'chain'``): latency percentiles and
+        throughput per concurrency level, and precision/recall.
+    """
+    chain = ModerationPipeline()
+    chain.configure(stage_names)
+    targets = {name: STAGES[name]() for name in stage_names}
+
+    def stage_check(stage):
+        return lambda text: stage.run(TextAnalysis(text)).rejection
+
+    checks = {name: stage_check(stage) for name, stage in targets.items()}
+    checks[CHAIN] = lambda text: chain.run(TextAnalysis(text)).rejection
+
+    texts = [text for text, _ in samples] * repeat
+    report = {}
+    for name, check in checks.items():
+        check(texts[0])  # warm-up: lazy corpora, model loading, connection pools
+        result = {'concurrency': {}}
+        for concurrency in concurrency_levels:
+            if before_pass:
+                before_pass()
+            rejected, latencies, seconds = _timed_pass(check, texts, concurrency)
+            if 'accuracy' not in result:
+                expected = [
+                    bool(labels) if name == CHAIN else name in labels for _, labels in samples
+                ] * repeat
+                result['accuracy'] = precision_recall(rejected, expected)
+            result['concurrency'][concurrency] = {
+                'textsPerSecond': round(len(texts) / seconds, 1),
+                **latency_percentiles(latencies),
+            }
+        report[name] = result
+    return report
+
+
+@contextmanager
+def offline_standins(app, known_words=(), dictionary_latency=0.05, model_latency=0.02, model_per_text=0.002):
+    """
+    Replace Urban Dictionary and the toxicity model with deterministic local stand-ins.
+
+    Urban Dictionary becomes a :class:`StandInUrbanDictionary` that knows
+    ``known_words`` and answers after ``dictionary_latency`` seconds; the word cache
+    stops using MongoDB. The toxicity model becomes the ``standin`` backend. The
+    previous configuration is restored on exit.
+    """
+    from app.moderation.model_manager import toxicity_model
+    from app.moderation.standins import StandInUrbanDictionary
+    from app.moderation.urban_dictionary import urban_dictionary, word_cache
+
+    keys = ('URBAN_DICTIONARY_URL', 'WORD_CACHE_COLLECTION')
+    saved_config = {key: app.config[key] for key in keys}
+    saved_backend = toxicity_model.backend_name, dict(toxicity_model.backend_options)
+    with StandInUrbanDictionary(known_words, latency=dictionary_latency) as server:
+        app.config['URBAN_DICTIONARY_URL'] = server.url
+        app.config['WORD_CACHE_COLLECTION'] = ''
+        urban_dictionary.init_app(app)
+        word_cache.init_app(app)
+        toxicity_model.use_backend('standin', {
+            **saved_backend[1], 'latency': model_latency, 'per_text': model_per_text,
+        })
+        try:
+            yield server
+        finally:
+            app.config.update(saved_config)
+            urban_dictionary.init_app(app)
+            word_cache.init_app(app)
+            toxicity_model.use_backend(*saved_backend)
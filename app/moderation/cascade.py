@@ -0,0 +1,264 @@
+import json
+import logging
+import math
+import os
+import random
+import struct
+import threading
+import zlib
+from array import array
+
+from app.moderation.lexicon import lexicon_tokens
+
+logger = logging.getLogger(__name__)
+
+# File layout: magic, header length, JSON header, then float32 weights.
+_MAGIC = b'SFCASC1\n'
+_LENGTH = struct.Struct('<I')
+
+CLEAN = 'clean'
+TOXIC = 'toxic'
+
+
+def hashed_features(text, n_features):
+    """
+    Hash the word unigrams and bigrams of ``text`` into ``n_features`` buckets.
+
+    Returns:
+        dict: Bucket index -> weight, L2-normalized so long and short texts score alike.
+    """
+    tokens = lexicon_tokens(text)
+    grams = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+    features = {}
+    for gram in grams:
+        # crc32 is stable across processes, unlike hash()
+        index = zlib.crc32(gram.encode('utf-8')) % n_features
+        features[index] = features.get(index, 0.0) + 1.0
+    if features:
+        norm = math.sqrt(sum(v * v for v in features.values()))
+        for index in features:
+            features[index] /= norm
+    return features
+
+
+def _sigmoid(x):
+    if x < -30:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-x))
+
+
+class LinearCascade:
+    """
+    A logistic-regression model over hashed word n-grams. ⚡
+
+    Scoring a review is one dictionary of a few dozen features and a dot product,
+    so it takes microseconds. Reviews scoring at or below ``low`` are settled as
+    clean and at or above ``high`` as toxic; everything in between is uncertain
+    and goes to the transformer model.
+
+    Attributes:
+        weights (array): One float weight per hash bucket.
+        bias (float): The intercept.
+        low (float): Probability at or below which a review is settled as clean.
+        high (float): Probability at or above which a review is settled as toxic.
+        metrics (dict): Held-out evaluation recorded at training time.
+    """
+
+    def __init__(self, weights, bias=0.0, low=0.0, high=1.0, metrics=None):
+        self.weights = weights
+        self.bias = bias
+        self.low = low
+        self.high = high
+        self.metrics = metrics or {}
+
+    @property
+    def n_features(self):
+        return len(self.weights)
+
+    @property
+    def version(self):
+        """Short fingerprint of the weights and thresholds."""
+        digest = zlib.crc32(self.weights.tobytes())
+        return f'{digest:08x}-{self.low:.4f}-{self.high:.4f}'
+
+    def probability(self, text):
+        """Estimated probability that ``text`` is toxic."""
+        weights = self.weights
+        features = hashed_features(text, len(weights))
+        return _sigmoid(self.bias + sum(weights[i] * v for i, v in features.items()))
+
+    def decide(self, probability):
+        """Return CLEAN, TOXIC, or None if the probability falls in the uncertain band."""
+        if probability <= self.low:
+            return CLEAN
+        if probability >= self.high:
+            return TOXIC
+        return None
+
+    @classmethod
+    def train(cls, texts, labels, n_features=2 ** 18, epochs=5, learning_rate=1.0, l2=1e-6, seed=13):
+        """
+        Fit the weights with stochastic gradient descent on the logistic loss.
+
+        Thresholds are left fully open (nothing settled); see :meth:`calibrate`.
+        """
+        rng = random.Random(seed)
+        weights = array('f', bytes(4 * n_features))
+        bias = 0.0
+        samples = [(hashed_features(t, n_features), 1.0 if y else 0.0) for t, y in zip(texts, labels)]
+        for epoch in range(epochs):
+            rng.shuffle(samples)
+            rate = learning_rate / (1 + epoch)
+            for features, target in samples:
+                error = _sigmoid(bias + sum(weights[i] * v for i, v in features.items())) - target
+                bias -= rate * error
+                for i, v in features.items():
+                    weights[i] -= rate * (error * v + l2 * weights[i])
+        return cls(weights, bias)
+
+    def calibrate(self, texts, labels, target_agreement=0.99):
+        """
+        Pick the widest ``low``/``high`` thresholds whose settled texts still agree
+        with ``labels`` at least ``target_agreement`` of the time.
+
+        The texts must not be ones the weights were trained on; the model is
+        overconfident on those, so the thresholds would come out too wide.
+        """
+        scored = sorted(zip((self.probability(t) for t in texts), labels))
+        ranked = scored[::-1]
+        # Clean side: walk up from the lowest scores, at most to 0.5, keeping the
+        # highest threshold at which the settled texts are still clean often enough.
+        # Texts with equal scores are settled together, so a threshold is only
+        # considered after the last of them.
+        self.low, agree = -1.0, 0
+        for count, (probability, label) in enumerate(scored, 1):
+            if probability >= 0.5:
+                break
+            agree += not label
+            tied = count < len(scored) and scored[count][0] == probability
+            if not tied and agree / count >= target_agreement:
+                self.low = probability
+        # Toxic side: the same, walking down from the highest scores.
+        self.high, agree = 2.0, 0
+        for count, (probability, label) in enumerate(ranked, 1):
+            if probability <= 0.5:
+                break
+            agree += bool(label)
+            tied = count < len(ranked) and ranked[count][0] == probability
+            if not tied and agree / count >= target_agreement:
+                self.high = probability
+
+    def evaluate(self, texts, labels):
+        """
+        Measure the cascade on labeled texts.
+
+        Returns:
+            dict: The fraction of texts settled without the transformer model and how
+            often the settled verdicts agree with the labels.
+        """
+        settled = agreed = 0
+        for text, label in zip(texts, labels):
+            decision = self.decide(self.probability(text))
+            if decision is not None:
+                settled += 1
+                agreed += (decision == TOXIC) == bool(label)
+        return {
+            'texts': len(texts),
+            'settledFraction': round(settled / len(texts), 4) if texts else None,
+            'agreement': round(agreed / settled, 4) if settled else None,
+        }
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        header = json.dumps({
+            'features': self.n_features, 'bias': self.bias,
+            'low': self.low, 'high': self.high, 'metrics': self.metrics,
+        }).encode('utf-8')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_MAGIC + _LENGTH.pack(len(header)) + header)
+            self.weights.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f'{path} is not a cascade model')
+            (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+            header = json.loads(f.read(length))
+            weights = array('f')
+            weights.fromfile(f, header['features'])
+        return cls(weights, header['bias'], header['low'], header['high'], header['metrics'])
+
+
+class ToxicityCascade:
+    """
+    The pre-classifier consulted by the toxicity stage before the transformer model.
+
+    Loaded from TOXICITY_CASCADE_PATH (built with ``flask moderation train-cascade``);
+    without that file every review goes to the transformer model.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.path = None
+        self._lock = threading.Lock()
+        self._counts = {CLEAN: 0, TOXIC: 0, None: 0}
+
+    def init_app(self, app):
+        """
+        Load the cascade model if one has been trained.
+
+        :param app: The Flask application instance.
+        """
+        self.path = app.config['TOXICITY_CASCADE_PATH']
+        self.model = None
+        if self.path and os.path.exists(self.path):
+            self.model = LinearCascade.load(self.path)
+            logger.info('Loaded toxicity cascade from %s (low=%.3f, high=%.3f)',
+                        self.path, self.model.low, self.model.high)
+
+    @property
+    def version(self):
+        return self.model.version if self.model is not None else None
+
+    def classify(self, text):
+        """
+        Try to settle ``text`` without the transformer model.
+
+        Returns:
+            tuple: (CLEAN, TOXIC or None, probability); (None, None) when no model is loaded.
+        """
+        if self.model is None:
+            return None, None
+        probability = self.model.probability(text)
+        decision = self.model.decide(probability)
+        with self._lock:
+            self._counts[decision] += 1
+        return decision, probability
+
+    def stats(self):
+        """Settled and deferred counts for the moderation status endpoint."""
+        if self.model is None:
+            return {'enabled': False}
+        with self._lock:
+            clean, toxic, deferred = self._counts[CLEAN], self._counts[TOXIC], self._counts[None]
+        total = clean + toxic + deferred
+        return {
+            'enabled': True,
+            'path': self.path,
+            'low': self.model.low,
+            'high': self.model.high,
+            'settledClean': clean,
+            'settledToxic': toxic,
+            'deferred': deferred,
+            'settledFraction': round((clean + toxic) / total, 4) if total else None,
+            'heldOut': self.model.metrics,
+        }
+
+
+# The process-wide cascade, bound to the app by app.moderation.init_app.
+toxicity_cascade = ToxicityCascade()
@@ -0,0 +1,39 @@
+def split_windows(text, spans, window, stride, max_chunks):
+    """
+    Cut a long text into overlapping windows of at most ``window`` tokens.
+
+    Consecutive windows share ``stride`` tokens so content on a boundary is seen
+    whole by at least one window. If more than ``max_chunks`` windows would be
+    needed, ``max_chunks`` of them are picked evenly from start to end (always
+    including the first and the last), which caps the inference cost per review.
+
+    Args:
+        text (str): The review text.
+        spans (list): Character ``(start, end)`` span of every token in ``text``.
+        window (int): Tokens per window, excluding special tokens.
+        stride (int): Tokens shared by consecutive windows.
+        max_chunks (int): Upper bound on the number of windows.
+
+    Returns:
+        tuple: The window texts and the fraction of tokens they cover (1.0 unless capped).
+    """
+    count = len(spans)
+    if count <= window:
+        return [text], 1.0
+    step = max(1, window - stride)
+    starts = list(range(0, count - window, step)) + [count - window]
+    if len(starts) > max_chunks:
+        if max_chunks == 1:
+            starts = [0]
+        else:
+            last = len(starts) - 1
+            starts = sorted({starts[round(i * last / (max_chunks - 1))] for i in range(max_chunks)})
+
+    covered = 0
+    end_of_previous = 0
+    for start in starts:
+        end = start + window
+        covered += end - max(start, end_of_previous)
+        end_of_previous = end
+    chunks = [text[spans[start][0]:spans[start + window - 1][1]] for start in starts]
+    return chunks, covered / count
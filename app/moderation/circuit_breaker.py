@@ -0,0 +1,97 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing remote service for a while. ⚡
+
+    States:
+        closed    - calls go through; ``failure_threshold`` failures in a row open
+                    the circuit. A call slower than ``slow_call_seconds`` counts as
+                    a failure, so a service that answers but very slowly trips it too.
+        open      - calls are refused for ``open_seconds``.
+        half_open - up to ``probes`` calls go through as probes; a successful
+                    probe closes the circuit, a failed one opens it again.
+
+    Callers ask :meth:`allow` before each call and report the outcome with
+    :meth:`record_success` or :meth:`record_failure`.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, slow_call_seconds=1.0, open_seconds=30.0, probes=1):
+        self._lock = threading.Lock()
+        self.configure(failure_threshold, slow_call_seconds, open_seconds, probes)
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self._trips = 0
+        self._refused = 0
+
+    def configure(self, failure_threshold, slow_call_seconds, open_seconds, probes=1):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.probes = probes
+
+    def allow(self):
+        """
+        Whether a call may go through now.
+
+        Returns:
+            bool: False while the circuit is open (or its probe slots are taken).
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self._refused += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probes_in_flight = 0
+            if self.state == self.HALF_OPEN:
+                if self._probes_in_flight >= self.probes:
+                    self._refused += 1
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def record_success(self, seconds=0.0):
+        """Report a call that returned after ``seconds``; slow calls count as failures."""
+        if self.slow_call_seconds and seconds > self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self._failures = 0
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self._probes_in_flight = 0
+
+    def record_failure(self):
+        """Report a call that failed."""
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probes_in_flight = 0
+                self._trips += 1
+
+    def stats(self):
+        """State and counters for the moderation status endpoint."""
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+            return {
+                'state': self.state,
+                'consecutiveFailures': self._failures,
+                'trips': self._trips,
+                'refused': self._refused,
+                'retryInSeconds': retry_in,
+            }
@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores():
+    """CPU cores this process may run on (respects CPU affinity and container limits)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class InferenceGovernor:
+    """
+    Keeps concurrent model inference from oversubscribing the CPU. 🎛️
+
+    Two limits apply in every process that runs the model:
+
+    - Thread budget: each forward pass may use ``threads`` intra-op threads, by
+      default the available cores divided by TOXICITY_WORKER_PROCESSES, so the web
+      workers on one machine together use each core once.
+    - Concurrency: at most ``max_concurrent`` forward passes run at once. Further
+      batches wait in line for a :meth:`slot`, and the time each text waited
+      (from submission to the start of its forward pass) is recorded.
+    """
+
+    def __init__(self, sample_size=1024):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=sample_size)
+        self.configure()
+        self._active = 0
+        self._waiting = 0
+        self._passes = 0
+        self._applied = None
+
+    def init_app(self, app):
+        """
+        Read the thread budget and concurrency limit from the app config.
+
+        :param app: The Flask application instance.
+        """
+        self.configure(
+            app.config['TOXICITY_TORCH_THREADS'],
+            app.config['TOXICITY_WORKER_PROCESSES'],
+            app.config['TOXICITY_MAX_CONCURRENT_INFERENCES'],
+        )
+
+    def configure(self, threads=0, worker_processes=1, max_concurrent=1):
+        """
+        Set the limits; ``threads=0`` divides the available cores among ``worker_processes``.
+
+        The concurrency limit only takes effect for slots requested afterwards.
+        """
+        self.threads = threads or max(1, available_cores() // max(1, worker_processes))
+        self.max_concurrent = max(1, max_concurrent)
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrent)
+
+    def apply_torch_threads(self):
+        """Limit torch to the thread budget; call once torch has been imported."""
+        import torch
+        if self._applied != self.threads:
+            torch.set_num_threads(self.threads)
+            self._applied = self.threads
+            logger.info('torch limited to %d intra-op thread(s)', self.threads)
+
+    @contextmanager
+    def slot(self, enqueued=()):
+        """
+        Wait for a free forward-pass slot and hold it for the ``with`` block.
+
+        Args:
+            enqueued (iterable): ``time.monotonic()`` submission times of the texts in
+                the batch, to record how long each waited; defaults to now.
+        """
+        arrived = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        semaphore = self._semaphore
+        semaphore.acquire()
+        started = time.monotonic()
+        with self._lock:
+            self._waiting -= 1
+            self._active += 1
+            self._passes += 1
+            self._waits.extend(started - t for t in (enqueued or (arrived,)))
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+            semaphore.release()
+
+    def stats(self):
+        """Limits, load and queue-wait percentiles for the moderation status endpoint."""
+        with self._lock:
+            waits = sorted(self._waits)
+            active, waiting, passes = self._active, self._waiting, self._passes
+
+        def percentile(p):
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 3)
+
+        return {
+            'threads': self.threads,
+            'maxConcurrent': self.max_concurrent,
+            'active': active,
+            'waiting': waiting,
+            'forwardPasses': passes,
+            'queueWaitP50Ms': percentile(0.50),
+            'queueWaitP95Ms': percentile(0.95),
+            'queueWaitP99Ms': percentile(0.99),
+        }
+
+
+# The process-wide inference governor, bound to the app by app.moderation.init_app.
+inference_governor = InferenceGovernor()
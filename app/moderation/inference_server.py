@@ -0,0 +1,333 @@
+import logging
+import os
+import queue
+import secrets
+import signal
+import stat
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+from app.moderation.backends import ToxicityBackend, create_backend, register_backend
+from app.moderation.batching import MicroBatcher
+from app.moderation.governor import inference_governor
+
+logger = logging.getLogger(__name__)
+
+
+def inference_authkey(configured, path, create=False):
+    """
+    The shared secret for inference server connections.
+
+    Connections exchange pickles, so the key is what keeps other local users from
+    running code in the server; there is no default. TOXICITY_INFERENCE_AUTHKEY is
+    used if set, otherwise the key file at ``path``. With ``create`` (the server)
+    a missing key file is generated, readable by its owner only.
+
+    Args:
+        configured (bytes): The configured key, or None.
+        path (str): The key file (TOXICITY_INFERENCE_AUTHKEY_PATH).
+        create (bool): Generate the key file if it does not exist.
+
+    Raises:
+        RuntimeError: If there is no key, or the key file is readable by other users.
+    """
+    if configured:
+        return configured
+    if create:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, 'w') as f:
+                f.write(secrets.token_hex(32))
+            logger.info('Generated the inference server auth key in %s', path)
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        raise RuntimeError(
+            f'No inference server auth key: set TOXICITY_INFERENCE_AUTHKEY or start '
+            f'`flask moderation serve-inference`, which creates {path}'
+        ) from None
+    if mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise RuntimeError(f'The inference server auth key {path} must only be accessible by its owner (chmod 600)')
+    with open(path, encoding='utf-8') as f:
+        return f.read().strip().encode('utf-8')
+
+
+class InferenceServer:
+    """
+    A local process that holds the toxicity model once for every web worker. 🧠
+
+    Web workers connect over a Unix socket (``multiprocessing.connection`` with an
+    auth key, see :func:`inference_authkey`; the socket is created owner-only) and
+    send lists of texts; each connection is served by its own thread
+    and all texts go through one MicroBatcher, so requests from different workers
+    are merged into shared forward passes.
+
+    On SIGTERM or SIGINT the server stops accepting connections, finishes the
+    requests it has already received and exits. Clients reconnect automatically,
+    so a new server can be started on the same socket without failing reviews.
+    """
+
+    def __init__(self, address, authkey, backend, window_ms=5, max_batch_size=32):
+        self.address = address
+        self.authkey = authkey
+        self.backend = backend
+        self.batcher = MicroBatcher(
+            backend, window_ms, max_batch_size, name='inference-server-batcher', governor=inference_governor,
+        )
+        self._stopping = threading.Event()
+        self._active = set()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def serve_forever(self):
+        """Load the model, then accept and serve connections until stopped."""
+        started = time.perf_counter()
+        self.backend.load()
+        self.backend.warm_up()
+        logger.info('Inference server loaded %s in %.1fs', self.backend.model_name, time.perf_counter() - started)
+
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # left behind by a previous server
+        # The socket gets its permissions when it is bound; there is no window with broader ones.
+        umask = os.umask(0o177)
+        try:
+            self._listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        finally:
+            os.umask(umask)
+        logger.info('Inference server listening on %s', self.address)
+        while not self._stopping.is_set():
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                break  # listener closed by stop()
+            except Exception:
+                logger.exception('Rejected inference client')
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+        self._drain()
+
+    def stop(self, *_signal_args):
+        """Stop accepting connections; usable as a signal handler."""
+        self._stopping.set()
+        if self._listener is not None:
+            self._listener.close()
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def _drain(self, timeout=30):
+        # Give in-flight requests a chance to finish before the process exits.
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._active:
+                    break
+            time.sleep(0.05)
+        logger.info('Inference server stopped')
+
+    def _serve(self, conn):
+        with conn:
+            while not self._stopping.is_set():
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                with self._lock:
+                    self._active.add(conn)
+                try:
+                    conn.send(self._handle(request))
+                except (EOFError, OSError):
+                    return
+                finally:
+                    with self._lock:
+                        self._active.discard(conn)
+
+    def _handle(self, request):
+        command = request[0]
+        if command == 'classify':
+            futures = self.batcher.submit_many(request[1])
+            try:
+                return ('ok', [future.result() for future in futures])
+            except Exception as e:
+                return ('error', f'{type(e).__name__}: {e}')
+        if command == 'spans':
+            return ('ok', self.backend.token_spans(request[1]))
+        if command == 'ping':
+            return ('ok', {
+                'model': self.backend.model_name,
+                'backend': self.backend.name,
+                'specialTokens': self.backend.special_tokens,
+                'pid': os.getpid(),
+                'batching': self.batcher.stats(),
+                'governor': inference_governor.stats(),
+            })
+        return ('error', f'Unknown command {command!r}')
+
+
+def run_inference_server(address, authkey, backend_name, model_name, window_ms=5,
+                         max_batch_size=32, **backend_options):
+    """Create an InferenceServer for the given backend and serve until a stop signal arrives."""
+    backend = create_backend(backend_name, model_name, **backend_options)
+    server = InferenceServer(address, authkey, backend, window_ms, max_batch_size)
+    server.install_signal_handlers()
+    server.serve_forever()
+
+
+@register_backend('remote')
+class RemoteBackend(ToxicityBackend):
+    """
+    Sends texts to a shared InferenceServer instead of loading the model in this process.
+
+    Connections are pooled so concurrent callers do not share one socket. If the
+    server is restarting, calls keep reconnecting until ``connect_timeout`` expires.
+    The auth key is the configured one or the server's key file at ``authkey_path``.
+    """
+
+    def __init__(self, model_name, socket_path=None, authkey=None, authkey_path=None, connect_timeout=30.0,
+                 **options):
+        super().__init__(model_name, **options)
+        self.socket_path = socket_path
+        self.authkey = authkey
+        self.authkey_path = authkey_path
+        self.connect_timeout = connect_timeout
+        self._special_tokens = 2
+        self._idle = queue.LifoQueue()
+
+    def _connect(self):
+        deadline = time.monotonic() + self.connect_timeout
+        delay = 0.05
+        while True:
+            try:
+                # The server may create its key file on first start, so a missing one is retried too.
+                self.authkey = inference_authkey(self.authkey, self.authkey_path)
+                return Client(self.socket_path, family='AF_UNIX', authkey=self.authkey)
+            except (FileNotFoundError, ConnectionRefusedError, ConnectionResetError, EOFError, RuntimeError) as e:
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(f'Inference server at {self.socket_path} unavailable: {e}')
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+
+    def _request(self, *request):
+        for attempt in range(2):
+            try:
+                # A pooled connection may be stale after a server restart; the retry never is.
+                conn = self._idle.get_nowait() if attempt == 0 else self._connect()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                conn.send(request)
+                status, payload = conn.recv()
+            except (EOFError, OSError):
+                # The server went away (e.g. restart); retry once on a fresh connection.
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            self._idle.put(conn)
+            if status != 'ok':
+                raise RuntimeError(f'Inference server error: {payload}')
+            return payload
+
+    def load(self):
+        info = self._request('ping')
+        if info['model'] != self.model_name:
+            raise RuntimeError(
+                f"Inference server serves '{info['model']}', expected '{self.model_name}'"
+            )
+        self._special_tokens = info['specialTokens']
+
+    def __call__(self, texts):
+        return self._request('classify', list(texts))
+
+    def token_spans(self, text):
+        # The server holds the tokenizer, so token positions come from there too.
+        return self._request('spans', text)
+
+    @property
+    def special_tokens(self):
+        return self._special_tokens
+
+
+def rss_mb(pid='self'):
+    """Resident set size of a process in MB (Linux only; None elsewhere)."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def _bench_worker(results, backend_name, model_name, backend_options, texts, requests):
+    # Runs in a child process: load a backend, classify one text at a time, report RSS.
+    backend = create_backend(backend_name, model_name, **backend_options)
+    backend.load()
+    started = time.perf_counter()
+    for i in range(requests):
+        backend([texts[i % len(texts)]])
+    results.put({'seconds': time.perf_counter() - started, 'requests': requests, 'rssMb': rss_mb()})
+
+
+def benchmark_inference_pool(workers, requests, texts, model_name, backend_name, backend_options,
+                             socket_path, authkey):
+    """
+    Compare per-worker models with one shared inference server.
+
+    Starts ``workers`` processes that each classify ``requests`` texts, first with
+    their own copy of the model and then through a shared server, and reports
+    total memory and throughput for both layouts.
+
+    Returns:
+        dict: One entry per layout with total RSS (MB), texts per second and wall time.
+    """
+    import multiprocessing
+    context = multiprocessing.get_context('spawn')
+    report = {}
+
+    def run(label, worker_backend, worker_options):
+        results = context.Queue()
+        procs = [
+            context.Process(target=_bench_worker, args=(
+                results, worker_backend, model_name, worker_options, texts, requests))
+            for _ in range(workers)
+        ]
+        started = time.perf_counter()
+        for p in procs:
+            p.start()
+        outcomes = [results.get() for _ in procs]
+        wall = time.perf_counter() - started
+        for p in procs:
+            p.join()
+        rss = [o['rssMb'] for o in outcomes if o['rssMb'] is not None]
+        report[label] = {
+            'workers': workers,
+            'totalRssMb': round(sum(rss), 1) if rss else None,
+            'textsPerSecond': round(workers * requests / max(o['seconds'] for o in outcomes), 1),
+            'wallSeconds': round(wall, 1),
+        }
+
+    run('perWorkerModel', backend_name, backend_options)
+
+    server = context.Process(target=run_inference_server, kwargs=dict(
+        address=socket_path, authkey=authkey, backend_name=backend_name,
+        model_name=model_name, **backend_options))
+    server.start()
+    try:
+        remote_options = {'socket_path': socket_path, 'authkey': authkey, 'connect_timeout': 600}
+        RemoteBackend(model_name, **remote_options).load()  # wait until the server is ready
+        run('sharedServer', 'remote', remote_options)
+        server_rss = rss_mb(server.pid)
+        if server_rss is not None and report['sharedServer']['totalRssMb'] is not None:
+            report['sharedServer']['totalRssMb'] = round(report['sharedServer']['totalRssMb'] + server_rss, 1)
+            report['sharedServer']['serverRssMb'] = round(server_rss, 1)
+    finally:
+        server.terminate()
+        server.join()
+    return report
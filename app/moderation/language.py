@@ -0,0 +1,232 @@
+import json
+import logging
+import math
+import os
+import re
+import zlib
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+ENGLISH = 'en'
+
+# NLTK udhr (Universal Declaration of Human Rights) file per language used for training.
+UDHR_LANGUAGES = {
+    'en': 'English-Latin1',
+    'fr': 'French_Francais-Latin1',
+    'de': 'German_Deutsch-Latin1',
+    'es': 'Spanish-Latin1',
+    'it': 'Italian-Latin1',
+    'pt': 'Portuguese_Portugues-Latin1',
+    'nl': 'Dutch_Nederlands-Latin1',
+    'sv': 'Swedish_Svenska-Latin1',
+    'id': 'Indonesian-Latin1',
+    'tl': 'Tagalog-Latin1',
+    'ru': 'Russian-UTF8',
+    'hi': 'Hindi-UTF8',
+}
+
+_NON_LETTERS = re.compile(r"[\W\d_]+")
+
+
+def char_ngrams(text, orders=(1, 2, 3), max_chars=300):
+    """
+    Character n-grams of ``text`` with words padded by spaces (" th", "he ").
+
+    Only the first ``max_chars`` characters are used, which bounds the cost per review.
+    """
+    cleaned = ' ' + _NON_LETTERS.sub(' ', text[:max_chars].lower()).strip() + ' '
+    grams = []
+    for n in orders:
+        grams.extend(cleaned[i:i + n] for i in range(len(cleaned) - n + 1) if cleaned[i:i + n] != ' ' * n)
+    return grams
+
+
+class LanguageModel:
+    """
+    A naive Bayes language identifier over character 1- to 3-grams. 🌍
+
+    Each language keeps the log-probabilities of its most frequent n-grams; any
+    other n-gram gets that language's smoothed "unseen" probability. Rows are
+    stored as differences from the unseen value, so scoring a text only touches
+    the n-grams some language has seen.
+
+    Attributes:
+        languages (list): Language codes, e.g. ``['en', 'fr', ...]``.
+        unseen (list): Log-probability of an unseen n-gram, per language.
+        grams (dict): n-gram -> per-language log-probability minus ``unseen``.
+    """
+
+    def __init__(self, languages, unseen, grams, orders=(1, 2, 3), max_chars=300, digest=None):
+        self.languages = languages
+        self.unseen = unseen
+        self.grams = grams
+        self.orders = tuple(orders)
+        self.max_chars = max_chars
+        # crc32 of the saved file; None for a model that has not been loaded from disk.
+        self.digest = digest
+
+    @classmethod
+    def train(cls, samples, top=3000, orders=(1, 2, 3), max_chars=300):
+        """
+        Build a model from training text.
+
+        Args:
+            samples (dict): Language code -> training text.
+            top (int): n-grams kept per language.
+        """
+        languages = sorted(samples)
+        unseen = []
+        tables = []
+        for language in languages:
+            counts = Counter()
+            for line in samples[language].splitlines():
+                counts.update(char_ngrams(line, orders, max_chars=len(line)))
+            total = sum(counts.values())
+            vocabulary = len(counts) + 1
+            kept = dict(counts.most_common(top))
+            # Laplace smoothing over everything the language has seen.
+            unseen.append(math.log(1 / (total + vocabulary)))
+            tables.append({g: math.log((c + 1) / (total + vocabulary)) for g, c in kept.items()})
+
+        grams = {}
+        for gram in set().union(*tables):
+            grams[gram] = [round(table.get(gram, base) - base, 4) for table, base in zip(tables, unseen)]
+        return cls(languages, unseen, grams, orders, max_chars)
+
+    def scores(self, text):
+        """Posterior probability of each language for ``text``, as a dict."""
+        grams = char_ngrams(text, self.orders, self.max_chars)
+        totals = [len(grams) * base for base in self.unseen]
+        table = self.grams
+        for gram in grams:
+            row = table.get(gram)
+            if row is not None:
+                totals = [t + r for t, r in zip(totals, row)]
+        peak = max(totals)
+        exps = [math.exp(t - peak) for t in totals]
+        norm = sum(exps)
+        return {language: e / norm for language, e in zip(self.languages, exps)}
+
+    def identify(self, text):
+        """Return the most likely language and its probability."""
+        scores = self.scores(text)
+        language = max(scores, key=scores.get)
+        return language, scores[language]
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'languages': self.languages, 'unseen': self.unseen, 'grams': self.grams,
+                'orders': list(self.orders), 'maxChars': self.max_chars,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        return cls(data['languages'], data['unseen'], data['grams'], data['orders'], data['maxChars'],
+                   digest=f'{zlib.crc32(raw):08x}')
+
+
+def udhr_samples(languages=None):
+    """Training text per language from the NLTK udhr corpus."""
+    from nltk.corpus import udhr
+    codes = languages or list(UDHR_LANGUAGES)
+    return {code: udhr.raw(UDHR_LANGUAGES[code]) for code in codes}
+
+
+class LanguageIdentifier:
+    """
+    Identifies the language of review texts for the moderation stages.
+
+    Loaded from LANGUAGE_MODEL_PATH (built with ``flask moderation train-language``);
+    without that file no language is reported and nothing is skipped or rejected.
+    Texts shorter than LANGUAGE_MIN_CHARS letters are not judged.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.path = None
+        self.min_chars = 20
+        self.reject_confidence = 0.95
+        self.trust_confidence = 0.99
+
+    def init_app(self, app):
+        """
+        Load the language model if one has been trained.
+
+        :param app: The Flask application instance.
+        """
+        self.configure(
+            app.config['LANGUAGE_MODEL_PATH'],
+            app.config['LANGUAGE_MIN_CHARS'],
+            app.config['LANGUAGE_REJECT_CONFIDENCE'],
+            app.config['LANGUAGE_TRUST_CONFIDENCE'],
+        )
+
+    @property
+    def settings(self):
+        """The arguments of :meth:`configure`, e.g. to set up a worker process alike."""
+        return self.path, self.min_chars, self.reject_confidence, self.trust_confidence
+
+    def configure(self, path, min_chars=20, reject_confidence=0.95, trust_confidence=0.99):
+        """Load the model at ``path`` (if it exists) and set the confidence thresholds."""
+        self.path = path
+        self.min_chars = min_chars
+        self.reject_confidence = reject_confidence
+        self.trust_confidence = trust_confidence
+        self.model = None
+        if self.path and os.path.exists(self.path):
+            self.model = LanguageModel.load(self.path)
+            logger.info('Loaded language model for %s from %s', ', '.join(self.model.languages), self.path)
+
+    @property
+    def version(self):
+        """Fingerprint of the model contents and every setting that changes verdicts."""
+        if self.model is None:
+            return None
+        return (
+            f"{self.model.digest}/{','.join(self.model.languages)}/"
+            f"{self.min_chars}/{self.reject_confidence}/{self.trust_confidence}"
+        )
+
+    def identify(self, text):
+        """
+        Returns:
+            tuple: (language code, probability), or (None, None) if the text is too
+            short or no model is loaded.
+        """
+        if self.model is None or len(_NON_LETTERS.sub('', text)) < self.min_chars:
+            return None, None
+        return self.model.identify(text)
+
+    def is_clearly_english(self, language, confidence):
+        return language == ENGLISH and confidence >= self.trust_confidence
+
+    def is_clearly_foreign(self, language, confidence):
+        return language not in (None, ENGLISH) and confidence >= self.reject_confidence
+
+    def stats(self):
+        """Model details for the moderation status endpoint."""
+        if self.model is None:
+            return {'enabled': False}
+        return {
+            'enabled': True,
+            'path': self.path,
+            'languages': self.model.languages,
+            'version': self.model.digest,
+            'ngrams': len(self.model.grams),
+            'rejectConfidence': self.reject_confidence,
+            'trustConfidence': self.trust_confidence,
+        }
+
+
+# The process-wide language identifier, bound to the app by app.moderation.init_app.
+language_identifier = LanguageIdentifier()
@@ -0,0 +1,232 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from app.moderation.vocabulary import read_word_list
+
+logger = logging.getLogger(__name__)
+
+# The built-in abuse lexicon, used when no ABUSE_LEXICON_PATH or collection is configured.
+DEFAULT_ABUSE_WORDS = {
+    "idiot", "stupid", "useless", "fool", "dumb", "nonsense",
+    "lazy", "moron", "hate", "trash", "worst"
+}
+
+# Words are runs of letters/digits, optionally joined by apostrophes ("don't").
+# Everything else (punctuation, symbols, whitespace) separates tokens.
+_TOKEN = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+
+
+def lexicon_tokens(text):
+    """Lowercase ``text`` and split it into word tokens, dropping punctuation."""
+    return _TOKEN.findall(text.lower())
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over word tokens. 🔎
+
+    Each lexicon entry is a word or multi-word phrase. Matching walks the review's
+    tokens once, following failure links on a mismatch, so the cost is linear in
+    the review length (plus the number of matches) no matter how many phrases the
+    lexicon contains. Overlapping matches are all reported.
+
+    Args:
+        phrases (iterable): Lexicon entries; they are normalized like review text.
+    """
+
+    def __init__(self, phrases):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self.phrases = set()
+        for phrase in phrases:
+            tokens = lexicon_tokens(phrase)
+            if tokens:
+                self._add(tokens)
+        self._link()
+
+    def _add(self, tokens):
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = nxt
+        phrase = ' '.join(tokens)
+        self._output[state] = (phrase,)
+        self.phrases.add(phrase)
+
+    def _link(self):
+        # Breadth-first so that every failure target is finished before it is used.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    @property
+    def node_count(self):
+        return len(self._goto)
+
+    def find_tokens(self, tokens):
+        """Return every lexicon phrase occurring in the token list, in order of their end position."""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = []
+        state = 0
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if output[state]:
+                found.extend(output[state])
+        return found
+
+    def find(self, text):
+        """Return every lexicon phrase occurring in ``text``."""
+        return self.find_tokens(lexicon_tokens(text))
+
+
+def lexicon_version(phrases):
+    """Short fingerprint of a lexicon's contents."""
+    return hashlib.sha1('\n'.join(sorted(phrases)).encode('utf-8')).hexdigest()[:12]
+
+
+class AbuseLexicon:
+    """
+    The abuse lexicon used by the moderation checks, hot-reloadable at runtime.
+
+    Entries come from ABUSE_LEXICON_PATH (one phrase per line), from the
+    ABUSE_LEXICON_COLLECTION MongoDB collection (documents with a ``phrase`` field),
+    or from the built-in list. Every ABUSE_LEXICON_RELOAD_INTERVAL seconds one request
+    re-reads the source; if the contents changed, a new automaton is compiled and
+    swapped in atomically while other requests keep using the old one.
+    """
+
+    def __init__(self):
+        self._reload_lock = threading.Lock()
+        self.path = None
+        self.collection_name = None
+        self.reload_interval = 30
+        self._file_mtime = None
+        self._next_check = 0.0
+        self._reloads = 0
+        self._swap(DEFAULT_ABUSE_WORDS, 'built-in')
+
+    def init_app(self, app):
+        """
+        Read the lexicon source settings from the app config and load the lexicon.
+
+        :param app: The Flask application instance.
+        """
+        self.path = app.config['ABUSE_LEXICON_PATH'] or None
+        self.collection_name = app.config['ABUSE_LEXICON_COLLECTION'] or None
+        self.reload_interval = app.config['ABUSE_LEXICON_RELOAD_INTERVAL']
+        self._file_mtime = None
+        if self.path:
+            self.reload()
+        # A collection can only be read inside an app context, so it loads on first use.
+        self._next_check = 0.0
+
+    def _swap(self, phrases, source):
+        matcher = PhraseMatcher(phrases)
+        # A single attribute assignment, so readers see either the old or the new lexicon.
+        self._state = (matcher, lexicon_version(matcher.phrases), source)
+
+    def _read_source(self):
+        if self.collection_name:
+            from app import mongo
+            docs = mongo.db[self.collection_name].find({}, {'phrase': 1})
+            return {doc['phrase'] for doc in docs if doc.get('phrase')}, f'mongo:{self.collection_name}'
+        if self.path:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._file_mtime:
+                return None, None
+            self._file_mtime = mtime
+            return read_word_list(self.path), self.path
+        return None, None
+
+    def reload(self):
+        """Re-read the lexicon source and swap in a new automaton if the contents changed."""
+        phrases, source = self._read_source()
+        if phrases is None:
+            return False
+        return self.load(phrases, source)
+
+    def load(self, phrases, source):
+        """Swap in ``phrases`` as the lexicon unless it already has exactly these entries."""
+        phrases = {' '.join(lexicon_tokens(p)) for p in phrases} - {''}
+        if lexicon_version(phrases) == self._state[1]:
+            return False
+        self._swap(phrases, source)
+        self._reloads += 1
+        logger.info('Abuse lexicon reloaded from %s: %d entries', source, len(phrases))
+        return True
+
+    @property
+    def phrases(self):
+        """The current (normalized) lexicon entries."""
+        return set(self._state[0].phrases)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check or not (self.path or self.collection_name):
+            return
+        # Only one request pays for the check; the others keep the current automaton.
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = now + self.reload_interval
+            self.reload()
+        except Exception:
+            logger.exception('Abuse lexicon reload failed; keeping the current lexicon')
+        finally:
+            self._reload_lock.release()
+
+    @property
+    def version(self):
+        self._maybe_reload()
+        return self._state[1]
+
+    def find(self, text):
+        """Return the abusive words and phrases found in ``text``."""
+        self._maybe_reload()
+        return self._state[0].find(text)
+
+    def find_tokens(self, tokens):
+        """Like :meth:`find`, for text that has already been split with :func:`lexicon_tokens`."""
+        self._maybe_reload()
+        return self._state[0].find_tokens(tokens)
+
+    @property
+    def source(self):
+        return self._state[2]
+
+    def stats(self):
+        """Lexicon details for the moderation status endpoint."""
+        matcher, version, source = self._state
+        return {
+            'source': source,
+            'version': version,
+            'entries': len(matcher.phrases),
+            'nodes': matcher.node_count,
+            'reloads': self._reloads,
+        }
+
+
+# The process-wide abuse lexicon, bound to the app by app.moderation.init_app.
+abuse_lexicon = AbuseLexicon()
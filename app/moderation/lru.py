@@ -0,0 +1,51 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by TTLCache.get when a key is absent or expired.
+MISSING = object()
+
+
+class TTLCache:
+    """
+    A thread-safe, size-bounded LRU mapping whose entries expire after a TTL.
+
+    Args:
+        max_size (int): Maximum number of entries; the least recently used is evicted first.
+        ttl (float): Default lifetime of an entry in seconds.
+    """
+
+    def __init__(self, max_size=10000, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Return the cached value, or ``MISSING`` if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store ``value`` for ``ttl`` seconds (defaults to the cache TTL)."""
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
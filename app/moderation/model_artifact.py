@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+
+from app.moderation.backends import ToxicityBackend, logits_to_results, register_backend, uses_sigmoid
+from app.moderation.governor import inference_governor
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+MODEL_FILE = 'model.ts'
+
+# Inputs a BERT-style classifier takes, in the order the traced graph expects them.
+_INPUT_NAMES = ('input_ids', 'attention_mask', 'token_type_ids')
+
+
+def build_artifact(model_name, output):
+    """
+    Build a ready-to-load toxicity model artifact in ``output``.
+
+    The directory holds the model traced and frozen with TorchScript, the fast
+    tokenizer serialized as a single ``tokenizer.json`` (no vocabulary conversion
+    at load time) and a manifest with the labels and post-processing rule. Like the
+    NLTK bundle it is assembled next to ``output`` and then moved into place.
+
+    Returns:
+        dict: The manifest.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    staging = f'{output}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, torchscript=True)
+    model.eval()
+    # Two texts of different lengths, so the trace sees a padded batch.
+    sample = tokenizer(['trace sample', 'a longer trace sample with padding'], padding=True, return_tensors='pt')
+    input_names = [name for name in _INPUT_NAMES if name in sample]
+    with torch.inference_mode():
+        traced = torch.jit.trace(model, tuple(sample[name] for name in input_names), strict=False)
+        traced = torch.jit.freeze(traced)
+    traced.save(os.path.join(staging, MODEL_FILE))
+    tokenizer.save_pretrained(staging)
+
+    config = model.config
+    manifest = {
+        'model': model_name,
+        'labels': [config.id2label[i] for i in range(config.num_labels)],
+        'useSigmoid': uses_sigmoid(config),
+        'inputNames': input_names,
+        'maxLength': tokenizer.model_max_length,
+        'torchVersion': torch.__version__,
+        'createdAt': datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(staging, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(output, ignore_errors=True)
+    os.replace(staging, output)
+    return manifest
+
+
+def read_manifest(path):
+    """The manifest of the artifact in ``path``, or None if none has been built there."""
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@register_backend('torchscript')
+class TorchScriptBackend(ToxicityBackend):
+    """
+    The prebuilt TorchScript artifact from ``flask moderation build-model-artifact``.
+
+    Loading reads the frozen graph and the serialized fast tokenizer from
+    ``artifact_path``; nothing is downloaded, converted or traced in the worker.
+    """
+
+    def __init__(self, model_name, artifact_path='build/toxicity-model', **options):
+        super().__init__(model_name, **options)
+        self.artifact_path = artifact_path
+
+    def load(self):
+        manifest = read_manifest(self.artifact_path)
+        if manifest is None:
+            raise RuntimeError(
+                f'No model artifact in {self.artifact_path}; run `flask moderation build-model-artifact`'
+            )
+        if manifest['model'] != self.model_name:
+            raise RuntimeError(
+                f"The artifact in {self.artifact_path} was built for '{manifest['model']}', not '{self.model_name}'"
+            )
+        import torch
+        from transformers import AutoTokenizer
+
+        inference_governor.apply_torch_threads()
+        self.labels = manifest['labels']
+        self.use_sigmoid = manifest['useSigmoid']
+        self.input_names = manifest['inputNames']
+        self.tokenizer = AutoTokenizer.from_pretrained(self.artifact_path, local_files_only=True)
+        self.model = torch.jit.load(os.path.join(self.artifact_path, MODEL_FILE), map_location='cpu')
+
+    def __call__(self, texts):
+        import torch
+
+        encoded = self.tokenizer(list(texts), padding=True, truncation=True, return_tensors='pt')
+        with torch.inference_mode():
+            logits = self.model(*(encoded[name] for name in self.input_names))[0]
+        return logits_to_results(logits.tolist(), self.labels, self.use_sigmoid)
@@ -0,0 +1,275 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from app.moderation.backends import create_backend, label_scores
+from app.moderation.batching import MicroBatcher
+from app.moderation.chunking import split_windows
+from app.moderation.governor import inference_governor
+from app.moderation import inference_server  # noqa: F401  (registers the 'remote' backend)
+from app.moderation import model_artifact  # noqa: F401  (registers the 'torchscript' backend)
+from app.moderation import standins  # noqa: F401  (registers the 'standin' backend)
+
+logger = logging.getLogger(__name__)
+
+
+def backend_options(config):
+    """Constructor options for toxicity backends, taken from the app config."""
+    return {
+        'cache_dir': config['TOXICITY_MODEL_CACHE_DIR'],
+        'artifact_path': config['TOXICITY_ARTIFACT_PATH'],
+        'socket_path': config['TOXICITY_INFERENCE_SOCKET'],
+        'authkey': config['TOXICITY_INFERENCE_AUTHKEY'].encode('utf-8') or None,
+        'authkey_path': config['TOXICITY_INFERENCE_AUTHKEY_PATH'],
+        'connect_timeout': config['TOXICITY_MODEL_WAIT_TIMEOUT'],
+    }
+
+
+class ModelNotReady(Exception):
+    """Raised when the toxicity model is not warm within the allowed wait."""
+
+
+class ToxicityModelManager:
+    """
+    Owns the toxicity classification model and loads it off the request path. 🔥
+
+    The manager follows the same ``init_app`` pattern as the Flask extensions in
+    ``app/__init__.py``: a module-level instance is created once and bound to the
+    application from ``create_app``. Loading happens in a daemon thread so a
+    worker can answer ``GET /schools`` while the model is still warming up.
+
+    States:
+        cold    - nothing has been loaded yet.
+        loading - the background loader thread is running.
+        warm    - the model is loaded and ready for inference.
+        failed  - the last load attempt raised; the next ``get`` retries it.
+
+    A worker forked while the model is loading does not inherit the loader
+    thread, so the load is restarted in the child (see ``_after_fork``).
+    """
+
+    COLD = 'cold'
+    LOADING = 'loading'
+    WARM = 'warm'
+    FAILED = 'failed'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._model = None
+        self._error = None
+        self.state = self.COLD
+        self.model_name = None
+        self.backend_name = None
+        self.backend_options = {}
+        self.wait_timeout = None
+        self.load_seconds = None
+        self.warm_up = True
+        self.warm_up_seconds = None
+        self.max_tokens = 512
+        self.chunk_stride = 64
+        self.max_chunks = 8
+        self.thresholds = {'toxic': 0.5}
+        # Concurrent predict() calls are merged into batched forward passes.
+        self.batcher = MicroBatcher(self._infer_batch, name='toxicity-batcher', governor=inference_governor)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Only the forking thread survives a fork: the lock may be held by a thread
+        # that no longer exists, and a 'loading' state would never become warm.
+        self._lock = threading.Lock()
+        self._thread = None
+        if self.state == self.LOADING:
+            self._ready = threading.Event()
+            self.state = self.COLD
+            self.start()
+
+    def init_app(self, app):
+        """
+        Read the model settings from the app config and, if enabled, start warming up.
+
+        :param app: The Flask application instance.
+        """
+        self.model_name = app.config['TOXICITY_MODEL_NAME']
+        self.backend_name = app.config['TOXICITY_BACKEND']
+        self.backend_options = backend_options(app.config)
+        self.wait_timeout = app.config['TOXICITY_MODEL_WAIT_TIMEOUT']
+        self.max_tokens = app.config['TOXICITY_MAX_TOKENS']
+        self.chunk_stride = app.config['TOXICITY_CHUNK_STRIDE']
+        self.max_chunks = app.config['TOXICITY_MAX_CHUNKS']
+        self.warm_up = app.config['TOXICITY_WARMUP']
+        self.thresholds = dict(app.config['TOXICITY_THRESHOLDS'])
+        self.batcher.configure(
+            app.config['TOXICITY_BATCH_WINDOW_MS'],
+            app.config['TOXICITY_BATCH_MAX_SIZE'],
+        )
+        if app.config['TOXICITY_MODEL_PRELOAD']:
+            self.start()
+
+    def use_backend(self, backend_name, options=None):
+        """
+        Switch to another backend, e.g. a stand-in for offline benchmarks.
+
+        Waits for a load in progress to finish; the new backend loads on next use.
+
+        Args:
+            backend_name (str): A registered backend name.
+            options (dict): Constructor options; defaults to the current ones.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            self.backend_name = backend_name
+            if options is not None:
+                self.backend_options = options
+            self._model = None
+            self._error = None
+            self._ready.clear()
+            self.state = self.COLD
+
+    @property
+    def is_warm(self):
+        return self.state == self.WARM
+
+    def start(self):
+        """Start the background loader unless the model is already loading or loaded."""
+        with self._lock:
+            if self.state in (self.LOADING, self.WARM):
+                return
+            self.state = self.LOADING
+            self._error = None
+            self._ready.clear()
+            self._thread = threading.Thread(
+                target=self._load, name='toxicity-model-loader', daemon=True
+            )
+            self._thread.start()
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            # Backends import their heavy dependencies in load(), so importing the
+            # routes never pulls in torch or onnxruntime.
+            model = create_backend(self.backend_name, self.model_name, **self.backend_options)
+            model.load()
+            if self.warm_up:
+                warm_up_started = time.perf_counter()
+                model.warm_up(self.max_tokens)
+                self.warm_up_seconds = time.perf_counter() - warm_up_started
+        except Exception as e:
+            logger.exception(
+                "Failed to load toxicity model '%s' (%s backend)", self.model_name, self.backend_name
+            )
+            self._error = e
+            self.state = self.FAILED
+        else:
+            self._model = model
+            self.load_seconds = time.perf_counter() - started
+            self.state = self.WARM
+            logger.info(
+                "Toxicity model '%s' (%s backend) warm after %.1fs",
+                self.model_name, self.backend_name, self.load_seconds,
+            )
+        finally:
+            self._ready.set()
+
+    def get(self, timeout=None):
+        """
+        Return the loaded model, waiting at most ``timeout`` seconds for it.
+
+        Args:
+            timeout (float): Seconds to wait; defaults to TOXICITY_MODEL_WAIT_TIMEOUT.
+
+        Returns:
+            The loaded ToxicityBackend, callable with a list of texts.
+
+        Raises:
+            ModelNotReady: If the model is still loading after the timeout or failed to load.
+        """
+        if self.state in (self.COLD, self.FAILED):
+            self.start()
+        if timeout is None:
+            timeout = self.wait_timeout
+        if not self._ready.wait(timeout):
+            raise ModelNotReady('Toxicity model is still loading, please retry shortly')
+        if self._model is None:
+            raise ModelNotReady(f'Toxicity model could not be loaded: {self._error}')
+        return self._model
+
+    def _infer_batch(self, texts):
+        # Runs on the batcher thread; the model is already warm at this point.
+        return self.get()(texts)
+
+    def predict(self, text, timeout=None):
+        """
+        Classify one text through the micro-batching scheduler.
+
+        Texts longer than TOXICITY_MAX_TOKENS are split into overlapping windows
+        (at most TOXICITY_MAX_CHUNKS of them), which are queued together so they
+        share a batch. Each label takes its highest score over the windows.
+
+        Args:
+            text (str): The text to classify.
+            timeout (float): Seconds to wait for warm-up and for the batch result;
+                defaults to TOXICITY_MODEL_WAIT_TIMEOUT.
+
+        Returns:
+            dict: The top label and its score, the score of every label, the number
+            of windows and the fraction of tokens they covered, e.g.
+            ``{'label': 'toxic', 'score': 0.97, 'scores': {'toxic': 0.97, 'threat': 0.01, ...},
+            'chunks': 1, 'coverage': 1.0}``.
+
+        Raises:
+            ModelNotReady: If the model is not warm in time or the batch did not finish in time.
+        """
+        if timeout is None:
+            timeout = self.wait_timeout
+        deadline = time.monotonic() + timeout
+        model = self.get(timeout)
+        chunks, coverage = split_windows(
+            text, model.token_spans(text), self.max_tokens - model.special_tokens,
+            self.chunk_stride, self.max_chunks,
+        )
+        futures = self.batcher.submit_many(chunks)
+        try:
+            results = [f.result(max(0.0, deadline - time.monotonic())) for f in futures]
+        except FutureTimeout:
+            raise ModelNotReady('Toxicity model is busy, please retry shortly')
+        # Max-aggregation per label: the worst window decides every label.
+        scores = {}
+        for result in results:
+            for label, score in (result.get('scores') or {result['label']: result['score']}).items():
+                scores[label] = max(score, scores.get(label, 0.0))
+        return {**label_scores(scores), 'chunks': len(chunks), 'coverage': round(coverage, 3)}
+
+    def violations(self, scores):
+        """
+        The labels whose score reaches their TOXICITY_THRESHOLDS entry.
+
+        Returns:
+            dict: label -> score, highest score first; empty if the text is acceptable.
+        """
+        hits = [(label, scores[label]) for label, threshold in self.thresholds.items()
+                if scores.get(label, 0.0) >= threshold]
+        return dict(sorted(hits, key=lambda hit: -hit[1]))
+
+    def status(self):
+        """Summarize the warm/cold state and batching statistics for the status endpoint."""
+        return {
+            'model': self.model_name,
+            'backend': self.backend_name,
+            'state': self.state,
+            'loadSeconds': self.load_seconds,
+            'warmUpSeconds': self.warm_up_seconds,
+            'error': str(self._error) if self._error else None,
+            'batching': self.batcher.stats(),
+            'governor': inference_governor.stats(),
+        }
+
+
+# The process-wide model manager, bound to the app by app.moderation.init_app.
+toxicity_model = ToxicityModelManager()
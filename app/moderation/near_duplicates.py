@@ -0,0 +1,282 @@
+import random
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict, defaultdict
+
+from app.moderation.lexicon import lexicon_tokens
+
+# A Mersenne prime larger than any 32-bit shingle hash, for the universal hash family.
+_PRIME = (1 << 61) - 1
+
+
+def shingles(text, size=2):
+    """32-bit hashes of the word ``size``-grams of ``text`` (after lexicon tokenization)."""
+    tokens = lexicon_tokens(text)
+    if len(tokens) < size:
+        tokens = tokens + [''] * (size - len(tokens))
+    return {
+        zlib.crc32(' '.join(tokens[i:i + size]).encode('utf-8'))
+        for i in range(len(tokens) - size + 1)
+    }
+
+
+def lsh_bands(num_perm, threshold):
+    """
+    Choose ``(bands, rows)`` with ``bands * rows == num_perm`` for a Jaccard threshold.
+
+    The LSH threshold ``(1 / bands) ** (1 / rows)`` is kept at least 0.15 below the
+    wanted similarity so that texts right at the threshold are almost always
+    candidates; false candidates are weeded out by the full signature comparison.
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    eligible = [br for br in options if (1 / br[0]) ** (1 / br[1]) <= threshold - 0.15] or options[-1:]
+    return max(eligible, key=lambda br: (1 / br[0]) ** (1 / br[1]))
+
+
+class MinHashIndex:
+    """
+    Recent review texts, indexed for near-duplicate search with MinHash and LSH. 🧬
+
+    Each text is reduced to a MinHash signature of ``num_perm`` values; two
+    signatures agree in a position with probability equal to the Jaccard similarity
+    of the texts' word-bigram sets. Signatures are split into bands, and texts that
+    share any band are candidates, which are then confirmed by comparing the full
+    signatures. Lookups therefore cost the same no matter how many texts are stored.
+
+    Entries older than ``window`` seconds are evicted, and at most ``max_entries``
+    are kept (oldest first out), so memory stays bounded during a flood.
+    """
+
+    def __init__(self, threshold=0.7, window=3600, max_entries=20000, num_perm=64, seed=7):
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self.threshold = threshold
+        self.window = window
+        self.max_entries = max_entries
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self._entries = OrderedDict()  # id -> (signature, band keys, scope, timestamp); oldest first
+        self._buckets = defaultdict(set)  # band key -> ids
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def signature(self, text):
+        hashes = shingles(text)
+        return array('Q', (min((a * x + b) % _PRIME for x in hashes) for a, b in self._perms))
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hash((band, signature[band * rows:(band + 1) * rows].tobytes())) for band in range(self.bands)]
+
+    def _evict(self, now):
+        while self._entries:
+            entry_id, (_, keys, _, timestamp) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - timestamp < self.window:
+                break
+            self._remove(entry_id, keys)
+
+    def _remove(self, entry_id, keys):
+        del self._entries[entry_id]
+        for key in keys:
+            bucket = self._buckets[key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def _matches(self, signature, keys):
+        # Caller holds the lock.
+        self._evict(time.monotonic())
+        candidates = set()
+        for key in keys:
+            candidates |= self._buckets.get(key, set())
+        found = []
+        for entry_id in candidates:
+            stored, _, scope, _ = self._entries[entry_id]
+            if sum(x == y for x, y in zip(stored, signature)) / len(signature) >= self.threshold:
+                found.append(scope)
+        return found
+
+    def _add(self, signature, keys, scope):
+        # Caller holds the lock.
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (signature, keys, scope, time.monotonic())
+        for key in keys:
+            self._buckets[key].add(entry_id)
+        self._evict(time.monotonic())
+
+    def matches(self, signature):
+        """
+        Scopes of the stored texts at least ``threshold`` similar to ``signature``.
+
+        Returns:
+            list: One scope (e.g. a staff id) per matching stored text.
+        """
+        keys = self._band_keys(signature)
+        with self._lock:
+            return self._matches(signature, keys)
+
+    def add(self, signature, scope):
+        """Remember a text (by signature) under ``scope``."""
+        keys = self._band_keys(signature)
+        with self._lock:
+            self._add(signature, keys, scope)
+
+    def matches_and_add(self, signature, scope, add_if=None):
+        """
+        Like :meth:`matches` followed by :meth:`add`, as one step.
+
+        Concurrent copies of a text are therefore seen by each other: of two
+        identical texts arriving at once, the second always matches the first.
+
+        Args:
+            add_if (callable): Called with the matching scopes; the text is only
+                added if it returns true. Defaults to always adding.
+        """
+        keys = self._band_keys(signature)
+        with self._lock:
+            found = self._matches(signature, keys)
+            if add_if is None or add_if(found):
+                self._add(signature, keys, scope)
+            return found
+
+    def _latest(self, signature, scope):
+        # Caller holds the lock.
+        for entry_id in reversed(self._entries):
+            stored, _, stored_scope, _ = self._entries[entry_id]
+            if stored_scope == scope and stored == signature:
+                return entry_id
+        return None
+
+    def remove_latest(self, signature, scope):
+        """Forget the most recently stored copy of exactly this signature under ``scope``."""
+        with self._lock:
+            entry_id = self._latest(signature, scope)
+            if entry_id is None:
+                return False
+            self._remove(entry_id, self._entries[entry_id][1])
+            return True
+
+    def rescope_latest(self, signature, scope, new_scope):
+        """Move the most recently stored copy of this signature from ``scope`` to ``new_scope``."""
+        with self._lock:
+            entry_id = self._latest(signature, scope)
+            if entry_id is None:
+                return False
+            stored, keys, _, timestamp = self._entries[entry_id]
+            self._entries[entry_id] = (stored, keys, new_scope, timestamp)
+            return True
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class NearDuplicateDetector:
+    """
+    Rejects lightly edited copies of recently submitted reviews before moderation.
+
+    A review is a near-duplicate if, within NEAR_DUPLICATE_WINDOW seconds, a review
+    at least NEAR_DUPLICATE_THRESHOLD similar was submitted for the same staff member,
+    or NEAR_DUPLICATE_GLOBAL_LIMIT of them were submitted across all staff.
+
+    Reviews are remembered when they are submitted. A review that moderation then
+    rejects still counts towards the global limit, so a flood of copies that would
+    be rejected (toxic spam) is turned away without being moderated again and again,
+    but no longer for its staff member, so a corrected resubmission goes through.
+    Reviews shorter than NEAR_DUPLICATE_MIN_TOKENS words are never flagged, since
+    short texts like "Great teacher" are legitimately repeated. The index lives in
+    the memory of each worker process.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.min_tokens = 8
+        self.global_limit = 5
+        self.index = MinHashIndex()
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._rejected = 0
+
+    def init_app(self, app):
+        """
+        Read the near-duplicate settings from the app config.
+
+        :param app: The Flask application instance.
+        """
+        self.enabled = app.config['NEAR_DUPLICATE_ENABLED']
+        self.min_tokens = app.config['NEAR_DUPLICATE_MIN_TOKENS']
+        self.global_limit = app.config['NEAR_DUPLICATE_GLOBAL_LIMIT']
+        self.index = MinHashIndex(
+            app.config['NEAR_DUPLICATE_THRESHOLD'],
+            app.config['NEAR_DUPLICATE_WINDOW'],
+            app.config['NEAR_DUPLICATE_MAX_ENTRIES'],
+        )
+
+    def _applies(self, text):
+        return self.enabled and len(lexicon_tokens(text)) >= self.min_tokens
+
+    def check_and_record(self, text, staff_id):
+        """
+        Look for recent near-duplicates of a submitted review and remember it.
+
+        The lookup and the insertion are one atomic step, so concurrent copies
+        cannot all slip through.
+
+        Returns:
+            str: The rejection message, or None if the review is not a near-duplicate.
+        """
+        if not self._applies(text):
+            return None
+        # Rejected copies are not stored: the copies already in the index keep the
+        # flood blocked, and the index is not filled up with them.
+        scopes = self.index.matches_and_add(
+            self.index.signature(text), staff_id, lambda found: self._rejection(found, staff_id) is None,
+        )
+        rejection = self._rejection(scopes, staff_id)
+        with self._lock:
+            self._checked += 1
+            if rejection:
+                self._rejected += 1
+        return rejection
+
+    def _rejection(self, scopes, staff_id):
+        if staff_id in scopes:
+            return 'A nearly identical review was recently submitted for this staff member'
+        if len(scopes) >= self.global_limit:
+            return 'Too many nearly identical reviews were recently submitted'
+        return None
+
+    def forget(self, text, staff_id):
+        """
+        Undo :meth:`check_and_record` for a submission that was not processed at all
+        (e.g. the model was not ready, or an error), so resubmitting it is not a duplicate.
+        """
+        if self._applies(text):
+            self.index.remove_latest(self.index.signature(text), staff_id)
+
+    def mark_rejected(self, text, staff_id):
+        """
+        Keep a review that moderation rejected for the global flood count only, so a
+        corrected resubmission for the same staff member is not taken for a copy.
+        """
+        if self._applies(text):
+            self.index.rescope_latest(self.index.signature(text), staff_id, None)
+
+    def stats(self):
+        """Index size and counters for the moderation status endpoint."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'entries': len(self.index),
+                'threshold': self.index.threshold,
+                'windowSeconds': self.index.window,
+                'bands': self.index.bands,
+                'rows': self.index.rows,
+                'checked': self._checked,
+                'rejected': self._rejected,
+            }
+
+
+# The process-wide near-duplicate detector, bound to the app by app.moderation.init_app.
+near_duplicates = NearDuplicateDetector()
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+COMPACT_STOPWORDS = 'stopwords-english.txt'
+
+# NLTK packages the moderation checks read at runtime. punkt_tab replaces punkt's
+# pickles in newer NLTK releases; older releases do not know it, so it is optional.
+REQUIRED_PACKAGES = ('punkt', 'wordnet', 'stopwords')
+OPTIONAL_PACKAGES = ('punkt_tab',)
+
+
+def _file_digests(root):
+    digests = {}
+    for directory, _, files in os.walk(root):
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root)
+            if relative == MANIFEST:
+                continue
+            sha = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(block)
+            digests[relative] = {'sha256': sha.hexdigest(), 'bytes': os.path.getsize(path)}
+    return digests
+
+
+def build_bundle(output):
+    """
+    Download the NLTK resources into a self-contained directory.
+
+    Besides the NLTK packages the bundle holds a compact plain-text stopword list
+    and a manifest with the NLTK version, the file hashes and a content version.
+    The bundle is assembled next to ``output`` and then moved into place, so a
+    running app never sees a half-written bundle.
+
+    Returns:
+        dict: The manifest.
+    """
+    import nltk
+
+    staging = f'{output}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    packages = []
+    for package in REQUIRED_PACKAGES + OPTIONAL_PACKAGES:
+        if nltk.download(package, download_dir=staging, quiet=True):
+            packages.append(package)
+        elif package in REQUIRED_PACKAGES:
+            raise RuntimeError(f"Could not download NLTK package '{package}'")
+
+    from nltk.corpus.reader import WordListCorpusReader
+    reader = WordListCorpusReader(os.path.join(staging, 'corpora', 'stopwords'), ['english'])
+    with open(os.path.join(staging, COMPACT_STOPWORDS), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(sorted(set(reader.words('english')))) + '\n')
+
+    files = _file_digests(staging)
+    version = hashlib.sha256(json.dumps(files, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    manifest = {
+        'version': version,
+        'nltkVersion': nltk.__version__,
+        'packages': packages,
+        'createdAt': datetime.now(timezone.utc).isoformat(),
+        'files': files,
+    }
+    with open(os.path.join(staging, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(output, ignore_errors=True)
+    os.replace(staging, output)
+    return manifest
+
+
+class NltkData:
+    """
+    Points NLTK at the bundled resources built by ``flask moderation build-nltk-data``.
+
+    Nothing is downloaded and nothing is read at startup: the bundle directory is
+    put first on NLTK's search path and the corpora load on first use. Without a
+    bundle NLTK falls back to its usual search path (e.g. ~/nltk_data).
+    """
+
+    def __init__(self):
+        self.path = None
+        self.manifest = None
+
+    def init_app(self, app):
+        """
+        Register the bundle configured by NLTK_DATA_PATH, if it has been built.
+
+        :param app: The Flask application instance.
+        """
+        self.configure(app.config['NLTK_DATA_PATH'])
+
+    def configure(self, path):
+        """Register the bundle at ``path``, if it has been built (also used by worker processes)."""
+        self.path = path
+        self.manifest = None
+        manifest_path = os.path.join(self.path, MANIFEST) if self.path else None
+        if not manifest_path or not os.path.exists(manifest_path):
+            logger.warning('No NLTK bundle at %s; using the default NLTK data path', self.path)
+            return
+        with open(manifest_path, encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+        import nltk
+        path = os.path.abspath(self.path)
+        if path not in nltk.data.path:
+            nltk.data.path.insert(0, path)
+        logger.info('Using NLTK bundle %s from %s', self.manifest['version'], path)
+
+    def compact_stopwords_path(self):
+        """Path of the bundled plain-text stopword list, or None without a bundle."""
+        if self.manifest is None:
+            return None
+        return os.path.join(self.path, COMPACT_STOPWORDS)
+
+    def stats(self):
+        """Bundle details for the moderation status endpoint."""
+        if self.manifest is None:
+            return {'bundle': None}
+        return {
+            'bundle': self.path,
+            'version': self.manifest['version'],
+            'nltkVersion': self.manifest['nltkVersion'],
+            'packages': self.manifest['packages'],
+        }
+
+
+# The process-wide NLTK data registration, bound to the app by app.moderation.init_app.
+nltk_data = NltkData()
@@ -0,0 +1,445 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from app.moderation.analysis import TextAnalysis, tokenizer_name
+from app.moderation.cascade import TOXIC, toxicity_cascade
+from app.moderation.language import language_identifier
+from app.moderation.lexicon import abuse_lexicon
+from app.moderation.model_manager import toxicity_model
+from app.moderation.urban_dictionary import urban_dictionary
+from app.moderation.verdict_cache import verdict_cache
+from app.moderation.vocabulary import vocabulary
+
+logger = logging.getLogger(__name__)
+
+
+# Registry of moderation stages, keyed by the name used in MODERATION_STAGES.
+STAGES = {}
+
+
+def register_stage(cls):
+    """Class decorator that makes a stage selectable through MODERATION_STAGES."""
+    STAGES[cls.name] = cls
+    return cls
+
+
+class StageResult:
+    """
+    The outcome of one stage for one review.
+
+    Attributes:
+        stage (str): Name of the stage.
+        rejection (str): Rejection message, or None if the review passed this stage.
+        details (dict): Stage-specific findings (matched words, scores, ...).
+        cacheable (bool): False if the outcome depended on something transient,
+            such as a dictionary lookup that timed out.
+        seconds (float): Time the stage took.
+    """
+
+    __slots__ = ('stage', 'rejection', 'details', 'cacheable', 'seconds')
+
+    def __init__(self, stage, rejection=None, details=None, cacheable=True):
+        self.stage = stage
+        self.rejection = rejection
+        self.details = details or {}
+        self.cacheable = cacheable
+        self.seconds = 0.0
+
+
+class ModerationResult:
+    """The combined outcome of a pipeline run."""
+
+    def __init__(self, stage_results):
+        self.stages = stage_results
+        rejected = [r for r in stage_results if r.rejection]
+        self.rejected_by = rejected[0].stage if rejected else None
+        self.rejection = rejected[0].rejection if rejected else None
+        self.cacheable = all(r.cacheable for r in stage_results)
+
+    def record(self, version):
+        """
+        The full moderation record, as stored on the review document.
+
+        Returns:
+            dict: The verdict, every stage's outcome and details, the toxicity score
+            and the versions of the model, lexicon and whole moderation setup.
+        """
+        toxicity = next((r for r in self.stages if r.stage == ToxicityStage.name), None)
+        return {
+            'rejection': self.rejection,
+            'rejectedBy': self.rejected_by,
+            'stages': [
+                {
+                    'stage': r.stage,
+                    'rejected': bool(r.rejection),
+                    'reason': r.rejection,
+                    'details': r.details,
+                    'ms': round(r.seconds * 1000, 3),
+                }
+                for r in self.stages
+            ],
+            'toxicityScore': toxicity.details.get('score') if toxicity else None,
+            'toxicityScores': toxicity.details.get('scores') if toxicity else None,
+            'modelVersion': model_version(),
+            'lexiconVersion': abuse_lexicon.version,
+            'version': version,
+            'cached': False,
+        }
+
+
+class Stage:
+    """
+    Base class for a moderation stage.
+
+    Subclasses set ``name`` and ``cost`` (a relative estimate used to run cheap
+    stages first) and implement :meth:`run`, which takes the review's TextAnalysis
+    and returns a StageResult. Stages must not depend on each other's results,
+    so the pipeline may run them in parallel. Stages that only compute on the
+    analysis (no network, no model) set ``cpu_bound`` so bulk jobs can run them
+    in worker processes.
+    """
+
+    name = None
+    cost = 0
+    cpu_bound = False
+
+    def run(self, analysis):
+        raise NotImplementedError
+
+
+@register_stage
+class AbuseStage(Stage):
+    """Rejects reviews containing words or phrases from the abuse lexicon."""
+
+    name = 'abuse'
+    cost = 1
+    cpu_bound = True
+
+    def run(self, analysis):
+        # One linear pass over the tokens finds both words and multi-word phrases,
+        # ignoring case and punctuation ("Idiot!" matches "idiot")
+        found = abuse_lexicon.find_tokens(analysis.lexicon_tokens)
+        if found:
+            return StageResult(self.name, f"Feedback contains abusive words: {', '.join(found)}",
+                               {'words': found})
+        return StageResult(self.name)
+
+
+@register_stage
+class LanguageStage(Stage):
+    """Rejects reviews the language identifier is confident are not in English."""
+
+    name = 'language'
+    cost = 2
+    cpu_bound = True
+
+    def run(self, analysis):
+        language, confidence = analysis.language
+        details = {'language': language, 'confidence': confidence}
+        if language_identifier.is_clearly_foreign(language, confidence):
+            return StageResult(self.name, f"Feedback is not in English (detected language: {language})", details)
+        return StageResult(self.name, details=details)
+
+
+@register_stage
+class DictionaryStage(Stage):
+    """
+    Rejects reviews with words that are neither in the vocabulary (WordNet + slang)
+    nor on Urban Dictionary.
+
+    Words whose Urban Dictionary lookup failed or missed the per-review deadline are
+    "unresolved"; they count as invalid only if URBAN_DICTIONARY_UNRESOLVED_POLICY is
+    "reject", and their presence makes the verdict uncacheable.
+
+    Reviews the language identifier is confident are English skip the Urban
+    Dictionary lookups; their unknown words are taken to be names, typos or slang.
+    """
+
+    name = 'dictionary'
+    cost = 50
+
+    def run(self, analysis):
+        candidates = [w for w in analysis.content_tokens if not vocabulary.is_word(w)]
+        if candidates and language_identifier.is_clearly_english(*analysis.language):
+            return StageResult(self.name, details={
+                'invalidWords': [], 'unresolvedWords': [], 'skippedLookups': len(candidates),
+            })
+        # All remaining words of the review are looked up concurrently, bounded by one deadline
+        verdicts = urban_dictionary.check_words(candidates)
+        invalid = [w for w in candidates if not urban_dictionary.is_valid(verdicts[w])]
+        unresolved = [w for w in candidates if not urban_dictionary.is_resolved(verdicts[w])]
+        details = {'invalidWords': invalid, 'unresolvedWords': unresolved}
+        if invalid:
+            return StageResult(
+                self.name,
+                f"Feedback contains non english words or not a proper sentence. Invalid word(s): {', '.join(invalid)}",
+                details, cacheable=not unresolved,
+            )
+        return StageResult(self.name, details=details, cacheable=not unresolved)
+
+
+@register_stage
+class ToxicityStage(Stage):
+    """
+    Rejects reviews for which any label in TOXICITY_THRESHOLDS scores at or above
+    its threshold. All label scores come from one model pass and are kept in the
+    details.
+
+    If a cascade model is loaded, it settles clearly clean and clearly toxic reviews
+    first and only the uncertain ones reach the transformer model.
+    """
+
+    name = 'toxicity'
+    cost = 100
+
+    def run(self, analysis):
+        decision, probability = toxicity_cascade.classify(analysis.raw)
+        if decision is not None:
+            details = {'label': decision, 'score': probability, 'settledBy': 'cascade'}
+            if decision == TOXIC:
+                return StageResult(self.name, f"Feedback rejected (toxic detected, score={probability:.2f})", details)
+            return StageResult(self.name, details=details)
+
+        # Batched with concurrent submissions; waits (bounded by TOXICITY_MODEL_WAIT_TIMEOUT)
+        # if the model is still warming up
+        result = toxicity_model.predict(analysis.raw)
+        details = {
+            'label': result['label'], 'score': result['score'], 'scores': result['scores'],
+            'chunks': result['chunks'], 'coverage': result['coverage'],
+        }
+        violations = toxicity_model.violations(result['scores'])
+        if violations:
+            found = ', '.join(f'{label} detected, score={score:.2f}' for label, score in violations.items())
+            return StageResult(self.name, f"Feedback rejected ({found})", dict(details, violations=list(violations)))
+        return StageResult(self.name, details=details)
+
+
+class StageStats:
+    """Per-stage latency samples and rejection counts."""
+
+    def __init__(self, sample_size=1024):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=sample_size)
+        self.runs = 0
+        self.rejections = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+
+    def record(self, seconds, rejected=False, error=False):
+        with self._lock:
+            self._samples.append(seconds)
+            self.runs += 1
+            self.total_seconds += seconds
+            self.rejections += rejected
+            self.errors += error
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            runs, rejections, errors, total = self.runs, self.rejections, self.errors, self.total_seconds
+
+        def percentile(p):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+        return {
+            'runs': runs,
+            'rejections': rejections,
+            'errors': errors,
+            'meanMs': round(total / runs * 1000, 3) if runs else None,
+            'p50Ms': percentile(0.50),
+            'p95Ms': percentile(0.95),
+            'p99Ms': percentile(0.99),
+        }
+
+
+class ModerationPipeline:
+    """
+    Runs the configured moderation stages over a review. 🚦
+
+    Stages run cheapest first and the pipeline stops at the first rejection. With
+    ``parallel`` enabled, all stages start at once on a thread pool and the first
+    rejection to arrive wins; stages that have not started yet are cancelled.
+    Every stage run is timed and counted so the status endpoint shows which stage
+    dominates review latency.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self.parallel = False
+        self.stats = {}
+        self.configure(['language', 'abuse', 'dictionary', 'toxicity'])
+
+    def init_app(self, app):
+        """
+        Build the stage list from the app config.
+
+        :param app: The Flask application instance.
+        """
+        self.configure(app.config['MODERATION_STAGES'], app.config['MODERATION_PARALLEL'])
+
+    def configure(self, stage_names, parallel=False):
+        """
+        Select the stages to run and whether to run them in parallel.
+
+        Raises:
+            ValueError: If a stage name is not registered.
+        """
+        unknown = [n for n in stage_names if n not in STAGES]
+        if unknown:
+            raise ValueError(
+                f"Unknown moderation stage(s) {', '.join(unknown)}. Available: {', '.join(sorted(STAGES))}"
+            )
+        stages = [STAGES[name]() for name in stage_names]
+        self.stages = sorted(stages, key=lambda stage: stage.cost)
+        self.stats = {stage.name: self.stats.get(stage.name) or StageStats() for stage in self.stages}
+        self.parallel = parallel
+        if parallel and self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=4 * len(self.stages), thread_name_prefix='moderation-stage'
+            )
+
+    def _run_stage(self, stage, analysis):
+        started = time.perf_counter()
+        try:
+            result = stage.run(analysis)
+        except Exception:
+            self.stats[stage.name].record(time.perf_counter() - started, error=True)
+            raise
+        result.seconds = time.perf_counter() - started
+        self.stats[stage.name].record(result.seconds, rejected=bool(result.rejection))
+        return result
+
+    def run(self, analysis, completed=()):
+        """
+        Moderate one analyzed review.
+
+        Args:
+            analysis (TextAnalysis): The review to moderate.
+            completed (iterable): StageResults already computed elsewhere (e.g. in a
+                worker process); those stages are not run again.
+
+        Returns:
+            ModerationResult: The results of the stages that ran.
+        """
+        results = list(completed)
+        if any(r.rejection for r in results):
+            return ModerationResult(results)
+        done = {r.stage for r in results}
+        stages = [stage for stage in self.stages if stage.name not in done]
+        if self.parallel and len(stages) > 1:
+            return self._run_parallel(analysis, stages, results)
+        for stage in stages:
+            result = self._run_stage(stage, analysis)
+            results.append(result)
+            if result.rejection:
+                break
+        return ModerationResult(results)
+
+    def _run_parallel(self, analysis, stages, results):
+        pending = {self._executor.submit(self._run_stage, stage, analysis) for stage in stages}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    results.append(result)
+                    if result.rejection:
+                        return ModerationResult(results)
+        finally:
+            for future in pending:
+                future.cancel()
+        order = {stage.name: i for i, stage in enumerate(self.stages)}
+        return ModerationResult(sorted(results, key=lambda r: order[r.stage]))
+
+    def status(self):
+        """Stage order, declared costs and per-stage statistics for the status endpoint."""
+        return {
+            'parallel': self.parallel,
+            'tokenizer': tokenizer_name(),
+            'stages': [
+                {'name': stage.name, 'cost': stage.cost, **self.stats[stage.name].snapshot()}
+                for stage in self.stages
+            ],
+        }
+
+
+# The process-wide moderation pipeline, bound to the app by app.moderation.init_app.
+moderation_pipeline = ModerationPipeline()
+
+
+def model_version():
+    """Identify the toxicity model that scores reviews: model name and backend."""
+    return f'{toxicity_model.model_name}|{toxicity_model.backend_name}'
+
+
+def moderation_version():
+    """
+    Identify everything a cached verdict depends on: model, backend, token budget,
+    lexicon, thresholds, cascade, language model, vocabulary index, tokenizer and stages.
+    """
+    return (
+        f"{model_version()}|"
+        f"tokens={toxicity_model.max_tokens}/{toxicity_model.chunk_stride}/{toxicity_model.max_chunks}|"
+        f"lexicon={abuse_lexicon.version}|"
+        f"thresholds={','.join(f'{label}={t}' for label, t in sorted(toxicity_model.thresholds.items()))}|"
+        f"cascade={toxicity_cascade.version}|language={language_identifier.version}|"
+        f"vocabulary={vocabulary.version}|"
+        f"tokenizer={tokenizer_name()}|"
+        f"stages={','.join(stage.name for stage in moderation_pipeline.stages)}"
+    )
+
+
+def moderate(analysis, completed=()):
+    """
+    Moderate an analyzed review, consulting the verdict cache first.
+
+    Args:
+        analysis (TextAnalysis): The review to moderate.
+        completed (iterable): StageResults already computed for this review.
+
+    Returns:
+        dict: The moderation record (see :meth:`ModerationResult.record`); its
+        ``rejection`` is the rejection message, or None if the review is acceptable.
+
+    Raises:
+        ModelNotReady: If the toxicity model could not be used in time.
+    """
+    # Identical (after normalization) texts reuse the previous record
+    version = moderation_version()
+    hit, record = verdict_cache.get(analysis, version)
+    if hit:
+        return dict(record, cached=True)
+    result = moderation_pipeline.run(analysis, completed)
+    record = result.record(version)
+    if result.cacheable:
+        verdict_cache.put(analysis, version, record)
+    return record
+
+
+def moderate_text(feedback):
+    """
+    Moderate a review text and return the full moderation record.
+
+    Raises:
+        ModelNotReady: If the toxicity model could not be used in time.
+    """
+    # The text is normalized, tokenized and hashed once; every stage reuses the result
+    return moderate(TextAnalysis(feedback))
+
+
+def filter_feedback(feedback):
+    """
+    Moderate a review text.
+
+    Returns:
+        str: The rejection message, or None if the review is acceptable.
+
+    Raises:
+        ModelNotReady: If the toxicity model could not be used in time.
+    """
+    return moderate_text(feedback)['rejection']
@@ -0,0 +1,88 @@
+import logging
+import threading
+from datetime import datetime, timezone
+
+from app.models import REVIEW_APPROVED, REVIEW_PENDING, REVIEW_REJECTED
+
+logger = logging.getLogger(__name__)
+
+_index_lock = threading.Lock()
+_index_ready = False
+
+
+def ensure_indexes():
+    """
+    Index the stored moderation records by model and moderation version, once per process.
+
+    Best effort: a database problem is logged and retried on the next write.
+    """
+    global _index_ready
+    if _index_ready:
+        return
+    from app import mongo
+    with _index_lock:
+        if _index_ready:
+            return
+        try:
+            mongo.db.reviews.create_index('moderation.modelVersion')
+            mongo.db.reviews.create_index('moderation.version')
+            _index_ready = True
+        except Exception:
+            logger.exception('Could not create the moderation record indexes')
+
+
+def review_fields(record, now=None):
+    """
+    The review document fields describing a moderation outcome.
+
+    ``status``, ``rejectionReason`` and ``moderatedAt`` stay top-level for the
+    existing queries; the full record (per-stage verdicts and details, toxicity
+    score, model, lexicon and moderation versions) is stored under ``moderation``,
+    so reviews scored by an older model can be found and re-moderated later.
+
+    Args:
+        record (dict): The record returned by ``app.moderation.pipeline.moderate``.
+        now (datetime): The moderation time; defaults to the current UTC time.
+
+    Returns:
+        dict: Fields for an insert or a ``$set`` update.
+    """
+    ensure_indexes()
+    now = now or datetime.now(timezone.utc)
+    rejection = record['rejection']
+    return {
+        'status': REVIEW_REJECTED if rejection else REVIEW_APPROVED,
+        'rejectionReason': rejection,
+        'moderatedAt': now,
+        'moderation': dict(record, moderatedAt=now),
+    }
+
+
+def version_breakdown():
+    """
+    Count the moderated reviews per toxicity model and lexicon version.
+
+    Reviews moderated before records were stored are grouped under ``None``.
+
+    Returns:
+        list: ``{'modelVersion', 'lexiconVersion', 'reviews', 'rejected'}`` dicts, largest group first.
+    """
+    from app import mongo
+    rows = mongo.db.reviews.aggregate([
+        {'$match': {'status': {'$ne': REVIEW_PENDING}}},
+        {'$group': {
+            '_id': {'model': '$moderation.modelVersion', 'lexicon': '$moderation.lexiconVersion'},
+            'reviews': {'$sum': 1},
+            'rejected': {'$sum': {'$cond': [{'$eq': ['$status', REVIEW_REJECTED]}, 1, 0]}},
+        }},
+        {'$sort': {'reviews': -1}},
+    ])
+    return [
+        {
+            'modelVersion': row['_id'].get('model'),
+            'lexiconVersion': row['_id'].get('lexicon'),
+            'reviews': row['reviews'],
+            'rejected': row['rejected'],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,192 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+from app.models import REVIEW_APPROVED, REVIEW_PENDING
+from app.moderation.analysis import TextAnalysis, set_tokenizer, tokenizer_name
+from app.moderation.language import language_identifier
+from app.moderation.lexicon import abuse_lexicon
+from app.moderation.nltk_data import nltk_data
+from app.moderation.pipeline import STAGES, model_version, moderate, moderation_pipeline, moderation_version
+from app.moderation.records import review_fields
+
+logger = logging.getLogger(__name__)
+
+
+def _init_cpu_worker(stage_names, phrases, language_settings, tokenizer, nltk_data_path):
+    # Runs once in every worker process: mirror the parent's NLTK bundle, tokenizer,
+    # lexicon, language model and CPU-bound stages. The bundle comes first, since
+    # tokenizing a review loads the stopwords from it.
+    nltk_data.configure(nltk_data_path)
+    set_tokenizer(tokenizer)
+    abuse_lexicon.load(phrases, 'parent process')
+    language_identifier.configure(*language_settings)
+    moderation_pipeline.configure([name for name in stage_names if STAGES[name].cpu_bound])
+
+
+def _run_cpu_stages(text):
+    # Runs in a worker process; both the analysis and the stage results are pickled back.
+    analysis = TextAnalysis(text)
+    return analysis, moderation_pipeline.run(analysis).stages
+
+
+class RemoderationJob:
+    """
+    Re-runs the moderation pipeline over the reviews already stored. 🔁
+
+    Reviews are read in ``_id`` order, ``chunk_size`` at a time, so memory use does
+    not depend on the collection size. For each chunk the CPU-bound stages
+    (tokenizing, language identification and lexicon matching) run in a process
+    pool; the remaining stages run on a thread pool, where concurrent toxicity
+    calls are merged into batched forward passes by the model's MicroBatcher. Verdicts are written back with one
+    bulk update per chunk.
+
+    After every chunk the last ``_id`` and the counters are saved in the
+    ``moderation_jobs`` collection, so an interrupted job resumes where it stopped.
+    A job started with a different moderation version (model, lexicon, threshold
+    or stages) starts over. Pending reviews are left to the async moderator.
+
+    Every review carries the moderation record of its last run, so only reviews
+    moderated under a different moderation version (or, with ``stale_model``, by a
+    different toxicity model) are selected.
+
+    Args:
+        name (str): Identifies the checkpoint document.
+        chunk_size (int): Reviews read and written per round trip.
+        processes (int): Worker processes for the CPU-bound stages; 0 runs them inline.
+        threads (int): Concurrent reviews in the remaining stages.
+        dry_run (bool): Count what would change without writing verdicts or checkpoints.
+        stale_model (bool): Only select reviews scored by another toxicity model,
+            ignoring lexicon, threshold and stage changes.
+    """
+
+    def __init__(self, name='remoderate', chunk_size=500, processes=None, threads=32, dry_run=False,
+                 stale_model=False):
+        self.name = name
+        self.chunk_size = chunk_size
+        self.processes = multiprocessing.cpu_count() if processes is None else processes
+        self.threads = threads
+        self.dry_run = dry_run
+        self.stale_model = stale_model
+
+    def _checkpoint(self, version, restart):
+        from app import mongo
+        saved = None if restart else mongo.db.moderation_jobs.find_one({'_id': self.name})
+        if saved and saved.get('version') == version:
+            return saved
+        if saved:
+            logger.info('Moderation changed since job %s was checkpointed; starting over', self.name)
+        return {
+            '_id': self.name,
+            'version': version,
+            'lastId': None,
+            'processed': 0,
+            'approved': 0,
+            'rejected': 0,
+            'changed': 0,
+            'seconds': 0.0,
+            'finished': False,
+            'startedAt': datetime.now(timezone.utc),
+        }
+
+    def _save(self, checkpoint):
+        from app import mongo
+        if self.dry_run:
+            return
+        checkpoint['updatedAt'] = datetime.now(timezone.utc)
+        mongo.db.moderation_jobs.replace_one({'_id': self.name}, checkpoint, upsert=True)
+
+    def _chunks(self, checkpoint, version):
+        from app import mongo
+        if self.stale_model:
+            query = {'status': {'$ne': REVIEW_PENDING}, 'moderation.modelVersion': {'$ne': model_version()}}
+        else:
+            query = {'status': {'$ne': REVIEW_PENDING}, 'moderation.version': {'$ne': version}}
+        while True:
+            if checkpoint['lastId'] is not None:
+                query['_id'] = {'$gt': checkpoint['lastId']}
+            chunk = list(
+                mongo.db.reviews.find(query, {'text': 1, 'status': 1})
+                .sort('_id', 1)
+                .limit(self.chunk_size)
+            )
+            if not chunk:
+                return
+            yield chunk
+
+    def _moderate_chunk(self, chunk, cpu_pool, io_pool):
+        texts = [review.get('text', '') for review in chunk]
+        if cpu_pool is not None:
+            prepared = cpu_pool.map(_run_cpu_stages, texts, chunksize=max(1, len(texts) // (4 * self.processes)))
+        else:
+            prepared = ((TextAnalysis(text), ()) for text in texts)
+        return list(io_pool.map(lambda item: moderate(*item), prepared))
+
+    def run(self, restart=False, progress=None):
+        """
+        Run (or resume) the job until every stored review has been re-moderated.
+
+        Args:
+            restart (bool): Ignore an existing checkpoint.
+            progress (callable): Called with the checkpoint dict after every chunk.
+
+        Returns:
+            dict: The final checkpoint: counters, elapsed seconds and reviews per second.
+        """
+        from app import mongo
+        from app.moderation.model_manager import toxicity_model
+
+        version = moderation_version()
+        checkpoint = self._checkpoint(version, restart)
+        if 'toxicity' in (stage.name for stage in moderation_pipeline.stages):
+            toxicity_model.get(timeout=600)  # a bulk job may wait for warm-up
+
+        cpu_pool = None
+        if self.processes:
+            stage_names = [stage.name for stage in moderation_pipeline.stages]
+            cpu_pool = ProcessPoolExecutor(
+                self.processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_cpu_worker,
+                initargs=(
+                    stage_names, abuse_lexicon.phrases, language_identifier.settings, tokenizer_name(),
+                    nltk_data.path,
+                ),
+            )
+        io_pool = ThreadPoolExecutor(self.threads, thread_name_prefix='remoderation')
+        try:
+            for chunk in self._chunks(checkpoint, version):
+                started = time.perf_counter()
+                records = self._moderate_chunk(chunk, cpu_pool, io_pool)
+                now = datetime.now(timezone.utc)
+                updates = []
+                for review, record in zip(chunk, records):
+                    fields = review_fields(record, now)
+                    checkpoint['rejected' if record['rejection'] else 'approved'] += 1
+                    # Reviews stored before moderation statuses existed count as approved.
+                    if fields['status'] != review.get('status', REVIEW_APPROVED):
+                        checkpoint['changed'] += 1
+                    updates.append(UpdateOne(
+                        {'_id': review['_id'], 'status': {'$ne': REVIEW_PENDING}},
+                        {'$set': fields},
+                    ))
+                if not self.dry_run:
+                    mongo.db.reviews.bulk_write(updates, ordered=False)
+                checkpoint['lastId'] = chunk[-1]['_id']
+                checkpoint['processed'] += len(chunk)
+                checkpoint['seconds'] += time.perf_counter() - started
+                checkpoint['reviewsPerSecond'] = round(checkpoint['processed'] / checkpoint['seconds'], 1)
+                self._save(checkpoint)
+                if progress:
+                    progress(checkpoint)
+        finally:
+            io_pool.shutdown()
+            if cpu_pool is not None:
+                cpu_pool.shutdown()
+        checkpoint['finished'] = True
+        self._save(checkpoint)
+        return checkpoint
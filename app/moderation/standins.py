@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app.moderation.backends import ToxicityBackend, label_scores, register_backend
+from app.moderation.lexicon import lexicon_tokens
+
+# Words the stand-in toxicity model scores as toxic. They are deliberately not in the
+# default abuse lexicon, so benchmarks can tell the two stages apart.
+STANDIN_TOXIC_WORDS = frozenset({
+    'worthless', 'disgusting', 'pathetic', 'shut', 'regret', 'loser',
+    'ugly', 'pig', 'hates', 'disgrace', 'clown', 'incompetent',
+})
+
+# The toxic-bert labels and the stand-in words that raise each of them besides 'toxic'.
+STANDIN_LABEL_WORDS = {
+    'severe_toxic': frozenset({'disgusting'}),
+    'obscene': frozenset({'disgusting', 'pig'}),
+    'threat': frozenset({'regret'}),
+    'insult': frozenset({'worthless', 'pathetic', 'loser', 'ugly', 'pig', 'clown', 'incompetent'}),
+    'identity_hate': frozenset(),
+}
+
+
+class StandInUrbanDictionary:
+    """
+    A local HTTP server that answers like the Urban Dictionary define endpoint. 🧪
+
+    Point URBAN_DICTIONARY_URL at :attr:`url` to exercise the dictionary check
+    without network access. Words in ``known_words`` get one definition, every
+    other word gets an empty list, and each response is delayed by ``latency``
+    seconds (or by ``slow_words[word]`` for individual words). Set ``status`` to
+    e.g. 503 to simulate an outage.
+
+    Usage::
+
+        with StandInUrbanDictionary({'yeet'}, latency=0.05) as server:
+            app.config['URBAN_DICTIONARY_URL'] = server.url
+    """
+
+    def __init__(self, known_words=(), latency=0.0, slow_words=None, status=200, host='127.0.0.1', port=0):
+        self.known_words = set(known_words)
+        self.latency = latency
+        self.slow_words = dict(slow_words or {})
+        self.status = status
+        self.requests = 0
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                term = parse_qs(urlparse(self.path).query).get('term', [''])[0]
+                standin.requests += 1
+                time.sleep(standin.slow_words.get(term, standin.latency))
+                body = json.dumps({
+                    'list': [{'word': term, 'definition': 'stand-in'}] if term in standin.known_words else []
+                }).encode('utf-8')
+                try:
+                    self.send_response(standin.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up waiting (timeout)
+
+            def log_message(self, format, *args):
+                pass
+
+        Handler.protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v0/define'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _standin_score(tokens, words):
+    hits = sum(token in words for token in tokens)
+    return round(1 - 0.4 ** hits, 4) if hits else 0.02
+
+
+@register_backend('standin')
+class StandInToxicityBackend(ToxicityBackend):
+    """
+    A deterministic toxicity "model" for offline benchmarks and tests. 🧪
+
+    Each word from STANDIN_TOXIC_WORDS raises the 'toxic' score: none gives 0.02,
+    one 0.6, two 0.84, and so on; the other toxic-bert labels are scored the same
+    way from their STANDIN_LABEL_WORDS. Every call sleeps ``latency`` seconds plus
+    ``per_text`` seconds per text, roughly like a batched forward pass, so the
+    batching and concurrency around the model can be measured without it.
+    """
+
+    def __init__(self, model_name, latency=0.0, per_text=0.0, **options):
+        super().__init__(model_name, **options)
+        self.latency = latency
+        self.per_text = per_text
+
+    def load(self):
+        pass
+
+    def __call__(self, texts):
+        time.sleep(self.latency + self.per_text * len(texts))
+        results = []
+        for text in texts:
+            tokens = lexicon_tokens(text)
+            scores = {'toxic': _standin_score(tokens, STANDIN_TOXIC_WORDS)}
+            scores.update((label, _standin_score(tokens, words)) for label, words in STANDIN_LABEL_WORDS.items())
+            results.append(label_scores(scores))
+        return results
@@ -0,0 +1,315 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.moderation.circuit_breaker import CircuitBreaker
+from app.moderation.lru import MISSING, TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class WordValidityCache:
+    """
+    Remembers Urban Dictionary verdicts per word. 📖
+
+    Both positive ("the word exists") and negative verdicts are stored: first in an
+    in-process LRU, then in a MongoDB collection with a TTL index that is shared by
+    every worker, so an unknown word costs at most one API call across the fleet
+    until its entry expires. Negative verdicts expire sooner because new slang
+    appears on Urban Dictionary over time. Failed lookups are never cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._memory = TTLCache()
+        self._index_ready = False
+        self.collection_name = None
+        self.ttl = 30 * 86400
+        self.negative_ttl = 86400
+        self._hits = 0
+        self._mongo_hits = 0
+        self._misses = 0
+
+    def init_app(self, app):
+        """
+        Read the cache settings from the app config.
+
+        :param app: The Flask application instance.
+        """
+        self.ttl = app.config['WORD_CACHE_TTL']
+        self.negative_ttl = app.config['WORD_CACHE_NEGATIVE_TTL']
+        self._memory = TTLCache(app.config['WORD_CACHE_SIZE'], self.ttl)
+        self.collection_name = app.config['WORD_CACHE_COLLECTION'] or None
+
+    def _collection(self):
+        if not self.collection_name:
+            return None
+        from app import mongo
+        collection = mongo.db[self.collection_name]
+        if not self._index_ready:
+            collection.create_index('expiresAt', expireAfterSeconds=0)
+            self._index_ready = True
+        return collection
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, word):
+        """
+        Return the cached verdict for ``word``: True, False, or None if unknown.
+        """
+        valid = self._memory.get(word)
+        if valid is not MISSING:
+            self._count('_hits')
+            return valid
+        try:
+            collection = self._collection()
+            doc = collection.find_one({'_id': word}) if collection is not None else None
+        except Exception:
+            logger.exception('Word cache lookup failed')
+            doc = None
+        if doc is not None and doc['expiresAt'].replace(tzinfo=timezone.utc) > datetime.now(timezone.utc):
+            self._count('_mongo_hits')
+            self._memory.set(word, doc['valid'], self._ttl_for(doc['valid']))
+            return doc['valid']
+        self._count('_misses')
+        return None
+
+    def set(self, word, valid):
+        """Store the verdict for ``word`` in memory and in MongoDB."""
+        ttl = self._ttl_for(valid)
+        self._memory.set(word, valid, ttl)
+        try:
+            collection = self._collection()
+            if collection is not None:
+                collection.replace_one(
+                    {'_id': word},
+                    {'valid': valid, 'expiresAt': datetime.now(timezone.utc) + timedelta(seconds=ttl)},
+                    upsert=True,
+                )
+        except Exception:
+            logger.exception('Word cache write failed')
+
+    def clear(self):
+        """Forget the in-process verdicts (the MongoDB level is left alone)."""
+        self._memory.clear()
+
+    def _ttl_for(self, valid):
+        return self.ttl if valid else self.negative_ttl
+
+    def stats(self):
+        """Hit/miss counters for the moderation status endpoint."""
+        with self._lock:
+            return {
+                'size': len(self._memory),
+                'hits': self._hits,
+                'mongoHits': self._mongo_hits,
+                'misses': self._misses,
+            }
+
+
+# The process-wide word cache, bound to the app by app.moderation.init_app.
+word_cache = WordValidityCache()
+
+
+class UrbanDictionaryClient:
+    """
+    Looks up words on Urban Dictionary concurrently over a pooled keep-alive session. 🌐
+
+    All lookups of one review are issued at once on a shared thread pool, which also
+    caps the number of requests in flight per process. The review waits at most
+    ``deadline`` seconds in total; words whose lookup has not finished by then are
+    reported as unresolved and the caller applies ``unresolved_policy`` to them.
+    A lookup that finishes after the deadline still fills the word cache.
+
+    Lookups go through a circuit breaker: after URBAN_DICTIONARY_BREAKER_FAILURES
+    failed or slow lookups in a row the API is not called for
+    URBAN_DICTIONARY_BREAKER_OPEN_SECONDS, and words are given the
+    URBAN_DICTIONARY_FALLBACK verdict right away instead of waiting on timeouts.
+    Then a probe lookup is let through to see whether the API has recovered.
+    """
+
+    ACCEPT = 'accept'
+    REJECT = 'reject'
+    # Verdict of words not looked up because the circuit breaker is open.
+    UNAVAILABLE = 'unavailable'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._executor = None
+        self.base_url = 'https://api.urbandictionary.com/v0/define'
+        self.timeout = 2.0
+        self.deadline = 3.0
+        self.max_in_flight = 8
+        self.unresolved_policy = self.ACCEPT
+        self.fallback = self.ACCEPT
+        self.breaker = CircuitBreaker()
+        self._requests = 0
+        self._errors = 0
+        self._unresolved = 0
+
+    def init_app(self, app):
+        """
+        Read the client settings from the app config.
+
+        :param app: The Flask application instance.
+        """
+        self.base_url = app.config['URBAN_DICTIONARY_URL']
+        self.timeout = app.config['URBAN_DICTIONARY_TIMEOUT']
+        self.deadline = app.config['URBAN_DICTIONARY_DEADLINE']
+        self.max_in_flight = app.config['URBAN_DICTIONARY_MAX_IN_FLIGHT']
+        policy = app.config['URBAN_DICTIONARY_UNRESOLVED_POLICY']
+        if policy not in (self.ACCEPT, self.REJECT):
+            raise ValueError(f"URBAN_DICTIONARY_UNRESOLVED_POLICY must be 'accept' or 'reject', not '{policy}'")
+        self.unresolved_policy = policy
+        fallback = app.config['URBAN_DICTIONARY_FALLBACK']
+        if fallback not in (self.ACCEPT, self.REJECT):
+            raise ValueError(f"URBAN_DICTIONARY_FALLBACK must be 'accept' or 'reject', not '{fallback}'")
+        self.fallback = fallback
+        self.breaker = CircuitBreaker(
+            app.config['URBAN_DICTIONARY_BREAKER_FAILURES'],
+            app.config['URBAN_DICTIONARY_BREAKER_SLOW_SECONDS'],
+            app.config['URBAN_DICTIONARY_BREAKER_OPEN_SECONDS'],
+        )
+        self.close()
+
+    def _pool(self):
+        # The session and executor are created lazily so a forked worker gets its own.
+        with self._lock:
+            if self._executor is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_in_flight, thread_name_prefix='urban-dictionary'
+                )
+            return self._session, self._executor
+
+    def close(self):
+        """Shut down the connection pool; the next lookup creates a new one."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._session.close()
+            self._session = None
+            self._executor = None
+
+    def lookup(self, word):
+        """
+        Ask the Urban Dictionary API whether ``word`` has any definitions.
+
+        Returns:
+            bool: True if definitions exist, False if not.
+
+        Raises:
+            requests.RequestException: If the API could not be reached or answered with an error.
+        """
+        session, _ = self._pool()
+        with self._lock:
+            self._requests += 1
+        response = session.get(self.base_url, params={'term': word}, timeout=self.timeout)
+        response.raise_for_status()  # Raise exception for bad status
+        data = response.json()
+        return len(data.get("list", [])) > 0  # Word exists if list is not empty
+
+    def _lookup_and_cache(self, word):
+        started = time.perf_counter()
+        try:
+            valid = self.lookup(word)
+        except Exception as e:
+            self.breaker.record_failure()
+            with self._lock:
+                self._errors += 1
+            logger.warning("Urban Dictionary API error for '%s': %s", word, e)
+            return None
+        self.breaker.record_success(time.perf_counter() - started)
+        word_cache.set(word, valid)
+        return valid
+
+    def check_words(self, words, deadline=None):
+        """
+        Resolve several words at once, bounded by an overall deadline.
+
+        Args:
+            words (iterable): Words to check; duplicates are looked up once.
+            deadline (float): Total seconds to wait; defaults to URBAN_DICTIONARY_DEADLINE.
+
+        Returns:
+            dict: word -> True (exists), False (not found), None (unresolved: the
+            lookup failed or did not finish before the deadline) or UNAVAILABLE
+            (not looked up because the circuit breaker is open).
+        """
+        results = {}
+        pending = {}
+        for word in dict.fromkeys(words):
+            cached = word_cache.get(word)
+            if cached is not None:
+                results[word] = cached
+            elif not self.breaker.allow():
+                results[word] = self.UNAVAILABLE
+            else:
+                pending[word] = None
+        if not pending:
+            return results
+
+        _, executor = self._pool()
+        futures = {executor.submit(self._lookup_and_cache, word): word for word in pending}
+        done, not_done = wait(futures, timeout=self.deadline if deadline is None else deadline)
+        for future in done:
+            results[futures[future]] = future.result()
+        for future in not_done:
+            results[futures[future]] = None
+        unresolved = sum(1 for valid in results.values() if valid is None)
+        if unresolved:
+            with self._lock:
+                self._unresolved += unresolved
+        return results
+
+    def is_valid(self, verdict):
+        """Turn a check_words verdict into a yes/no, applying the unresolved-word and fallback policies."""
+        if verdict is None:
+            return self.unresolved_policy == self.ACCEPT
+        if verdict == self.UNAVAILABLE:
+            return self.fallback == self.ACCEPT
+        return verdict
+
+    @staticmethod
+    def is_resolved(verdict):
+        """Whether a check_words verdict came from the API or the cache (and may be cached)."""
+        return isinstance(verdict, bool)
+
+    def stats(self):
+        """Request counters for the moderation status endpoint."""
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'errors': self._errors,
+                'unresolved': self._unresolved,
+                'maxInFlight': self.max_in_flight,
+                'deadline': self.deadline,
+                'unresolvedPolicy': self.unresolved_policy,
+                'fallback': self.fallback,
+                'breaker': self.breaker.stats(),
+            }
+
+
+# The process-wide Urban Dictionary client, bound to the app by app.moderation.init_app.
+urban_dictionary = UrbanDictionaryClient()
+
+
+def check_urban_dictionary(word):
+    """
+    Return whether ``word`` exists on Urban Dictionary, consulting the word cache first.
+
+    Failed or timed-out lookups follow URBAN_DICTIONARY_UNRESOLVED_POLICY and are not cached.
+    """
+    return urban_dictionary.is_valid(urban_dictionary.check_words([word])[word])
@@ -0,0 +1,171 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app.moderation.analysis import text_hash
+from app.moderation.lru import MISSING, TTLCache
+
+logger = logging.getLogger(__name__)
+
+class VerdictCache:
+    """
+    Two-level cache of moderation verdicts keyed by a hash of the normalized text. 🗃️
+
+    The content hash comes from the review's TextAnalysis, so texts that differ only
+    in case, punctuation or spacing share an entry.
+
+    Level one is a bounded in-process LRU with a TTL. Level two, when enabled, is a
+    MongoDB collection with a TTL index, so repeat texts skip moderation across
+    workers too. Every lookup passes the current moderation version (model, backend,
+    lexicon, thresholds); the version is part of the key, and a version change also
+    empties the in-process level, so stale verdicts are never served.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = TTLCache()
+        self._version = None
+        self._index_ready = False
+        self.enabled = True
+        self.collection_name = None
+        self._hits = 0
+        self._l2_hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def init_app(self, app):
+        """
+        Read the cache settings from the app config.
+
+        :param app: The Flask application instance.
+        """
+        self.enabled = app.config['VERDICT_CACHE_ENABLED']
+        self._entries = TTLCache(app.config['VERDICT_CACHE_SIZE'], app.config['VERDICT_CACHE_TTL'])
+        self.collection_name = (
+            app.config['VERDICT_CACHE_COLLECTION'] if app.config['VERDICT_CACHE_MONGO'] else None
+        )
+
+    def _key(self, analysis, version):
+        return text_hash(f'{version}\x00{analysis.hash}')
+
+    @property
+    def ttl(self):
+        return self._entries.ttl
+
+    def _check_version(self, version):
+        # Called with the lock held.
+        if version != self._version:
+            if self._version is not None:
+                self._invalidations += 1
+                logger.info('Moderation version changed to %s; clearing verdict cache', version)
+            self._entries.clear()
+            self._version = version
+
+    def get(self, analysis, version):
+        """
+        Look up the cached verdict for a review under the given moderation version.
+
+        Args:
+            analysis (TextAnalysis): The analyzed review text.
+            version (str): The current moderation version.
+
+        Returns:
+            tuple: ``(hit, verdict)``; ``verdict`` is only meaningful when ``hit`` is True.
+            Verdicts are the moderation records built by the pipeline.
+        """
+        if not self.enabled:
+            return False, None
+        key = self._key(analysis, version)
+        with self._lock:
+            self._check_version(version)
+        verdict = self._entries.get(key)
+        if verdict is not MISSING:
+            with self._lock:
+                self._hits += 1
+            return True, verdict
+
+        hit, verdict = self._l2_get(key)
+        if hit:
+            self._entries.set(key, verdict)
+        with self._lock:
+            if hit:
+                self._l2_hits += 1
+            else:
+                self._misses += 1
+        return hit, verdict
+
+    def put(self, analysis, version, verdict):
+        """Remember the verdict for an analyzed review in both levels."""
+        if not self.enabled:
+            return
+        key = self._key(analysis, version)
+        with self._lock:
+            self._check_version(version)
+        self._entries.set(key, verdict)
+        self._l2_put(key, version, verdict)
+
+    def _collection(self):
+        if not self.collection_name:
+            return None
+        from app import mongo
+        collection = mongo.db[self.collection_name]
+        if not self._index_ready:
+            collection.create_index('expiresAt', expireAfterSeconds=0)
+            self._index_ready = True
+        return collection
+
+    def _l2_get(self, key):
+        # The second level is best effort: a database problem is treated as a miss.
+        try:
+            collection = self._collection()
+            if collection is None:
+                return False, None
+            doc = collection.find_one({'_id': key})
+        except Exception:
+            logger.exception('Verdict cache lookup failed')
+            return False, None
+        # Mongo's TTL monitor only runs once a minute, so check expiry ourselves too.
+        if doc is None or doc['expiresAt'].replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc):
+            return False, None
+        return True, doc['verdict']
+
+    def _l2_put(self, key, version, verdict):
+        try:
+            collection = self._collection()
+            if collection is None:
+                return
+            collection.replace_one(
+                {'_id': key},
+                {
+                    'version': version,
+                    'verdict': verdict,
+                    'expiresAt': datetime.now(timezone.utc) + timedelta(seconds=self.ttl),
+                },
+                upsert=True,
+            )
+        except Exception:
+            logger.exception('Verdict cache write failed')
+
+    def clear(self):
+        """Drop every in-process entry."""
+        self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters for the moderation status endpoint."""
+        with self._lock:
+            lookups = self._hits + self._l2_hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'version': self._version,
+                'size': len(self._entries),
+                'maxSize': self._entries.max_size,
+                'hits': self._hits,
+                'mongoHits': self._l2_hits,
+                'misses': self._misses,
+                'hitRate': round((self._hits + self._l2_hits) / lookups, 4) if lookups else 0.0,
+                'invalidations': self._invalidations,
+            }
+
+
+# The process-wide verdict cache, bound to the app by app.moderation.init_app.
+verdict_cache = VerdictCache()
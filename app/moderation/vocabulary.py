@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+logger = logging.getLogger(__name__)
+
+# File layout: header, then a power-of-two table of 64-bit word hashes (0 = empty slot).
+_MAGIC = b'SFVOCAB1'
+_HEADER = struct.Struct('<8s8sQQ')  # magic, byte order, slot count, word count
+
+
+def word_key(word):
+    """64-bit hash of a word as stored in the index; never 0, which marks an empty slot."""
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+
+class VocabularyIndex:
+    """
+    A read-only, memory-mapped open-addressing hash set of words. 📚
+
+    Membership is one hash plus (on average) a slot or two of linear probing, so a
+    lookup costs O(1) regardless of vocabulary size. The file is mapped read-only,
+    which lets the operating system share its pages between forked workers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, byteorder, slots, words = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            raise ValueError(f'{path} is not a vocabulary index')
+        if byteorder.rstrip(b'\0').decode() != sys.byteorder:
+            raise ValueError(f'{path} was built on a {byteorder.decode()}-endian machine')
+        self._table = memoryview(self._mmap)[_HEADER.size:].cast('Q')
+        self._mask = slots - 1
+        self.word_count = words
+        self.size_bytes = len(self._mmap)
+        # Content fingerprint, so verdicts made with another build of the index are told apart.
+        self.digest = f'{zlib.crc32(self._mmap):08x}'
+
+    def __contains__(self, word):
+        key = word_key(word)
+        table = self._table
+        slot = key & self._mask
+        while True:
+            value = table[slot]
+            if value == key:
+                return True
+            if value == 0:
+                return False
+            slot = (slot + 1) & self._mask
+
+    @staticmethod
+    def build(words, path):
+        """
+        Write an index containing ``words`` to ``path``.
+
+        Returns:
+            int: The number of distinct words written.
+        """
+        keys = {word_key(w) for w in words}
+        slots = 1
+        while slots < 2 * len(keys):  # keep the load factor at or below 0.5
+            slots *= 2
+        mask = slots - 1
+        table = array('Q', bytes(8 * slots))
+        for key in keys:
+            slot = key & mask
+            while table[slot]:
+                slot = (slot + 1) & mask
+            table[slot] = key
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, sys.byteorder.encode(), slots, len(keys)))
+            table.tofile(f)
+        os.replace(tmp_path, path)  # never leave a half-written index behind
+        return len(keys)
+
+
+def wordnet_vocabulary():
+    """
+    Every word form for which ``wordnet.synsets(form)`` is non-empty.
+
+    That is the WordNet lemmas plus the inflected forms WordNet's morphy accepts:
+    the regular suffix rules applied in reverse and the irregular exception lists.
+    Multi-word lemmas are skipped because tokens never contain spaces.
+    """
+    from nltk.corpus import wordnet
+
+    words = set()
+    for pos, substitutions in wordnet.MORPHOLOGICAL_SUBSTITUTIONS.items():
+        lemmas = {l for l in wordnet.all_lemma_names(pos=pos) if '_' not in l}
+        exceptions = wordnet._exception_map[pos]
+        words.update(lemmas)
+        # Regular inflections: morphy strips `old` and appends `new`, so go the other way.
+        for lemma in lemmas:
+            for old, new in substitutions:
+                if lemma.endswith(new):
+                    form = lemma[:len(lemma) - len(new)] + old
+                    if form not in exceptions:
+                        words.add(form)
+        # Irregular forms such as "geese" -> "goose".
+        for form, targets in exceptions.items():
+            if any(t in lemmas for t in targets):
+                words.add(form)
+    return words
+
+
+def read_word_list(path):
+    """Read a curated word list: one word per line, '#' starts a comment."""
+    with open(path, encoding='utf-8') as f:
+        return {line.split('#', 1)[0].strip().lower() for line in f} - {''}
+
+
+class Vocabulary:
+    """
+    Answers "is this an English word?" for the dictionary check.
+
+    Uses the prebuilt index from VOCABULARY_INDEX_PATH when it exists (built with
+    ``flask moderation build-vocabulary``) and falls back to ``wordnet.synsets``.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.load_seconds = None
+
+    def init_app(self, app):
+        """
+        Load the vocabulary index if one has been built.
+
+        :param app: The Flask application instance.
+        """
+        path = app.config['VOCABULARY_INDEX_PATH']
+        self.index = None
+        if path and os.path.exists(path):
+            started = time.perf_counter()
+            self.index = VocabularyIndex(path)
+            self.load_seconds = time.perf_counter() - started
+            logger.info('Loaded %d-word vocabulary index from %s', self.index.word_count, path)
+        else:
+            logger.warning('No vocabulary index at %s; falling back to wordnet.synsets', path)
+
+    @property
+    def version(self):
+        """Fingerprint of the index contents, or ``'wordnet'`` without an index."""
+        return self.index.digest if self.index is not None else 'wordnet'
+
+    def is_word(self, word):
+        if self.index is not None:
+            return word in self.index
+        from nltk.corpus import wordnet
+        return bool(wordnet.synsets(word))
+
+    def stats(self):
+        """Index details for the moderation status endpoint."""
+        if self.index is None:
+            return {'source': 'wordnet'}
+        return {
+            'source': self.index.path,
+            'words': self.index.word_count,
+            'version': self.index.digest,
+            'sizeBytes': self.index.size_bytes,
+            'loadSeconds': self.load_seconds,
+        }
+
+
+# The process-wide vocabulary, bound to the app by app.moderation.init_app.
+vocabulary = Vocabulary()
@@ -0,0 +1,51 @@
+from flask_restx import Resource
+from app.moderation.async_worker import async_moderator
+from app.moderation.cascade import toxicity_cascade
+from app.moderation.language import language_identifier
+from app.moderation.lexicon import abuse_lexicon
+from app.moderation.model_manager import toxicity_model
+from app.moderation.near_duplicates import near_duplicates
+from app.moderation.nltk_data import nltk_data
+from app.moderation.pipeline import moderation_pipeline
+from app.moderation.urban_dictionary import urban_dictionary, word_cache
+from app.moderation.verdict_cache import verdict_cache
+from app.moderation.vocabulary import vocabulary
+
+
+def register_routes(api):
+    # Register read-only endpoints that report on the moderation subsystem
+    @api.route('/moderation/status')
+    class ModerationStatus(Resource):
+        def get(self):
+            """
+            Report the state of the moderation components.
+
+            Returns:
+                One entry per component:
+
+                - pipeline: stages in order, per-stage latency and rejection counts
+                - asyncModeration: background moderation queue and lease settings
+                - toxicityModel: warm/cold state, load and warm-up time, batching, thread budget
+                - toxicityCascade: share of reviews settled without the model
+                - nearDuplicates: index size and rejections
+                - verdictCache, wordCache: hit/miss counters
+                - urbanDictionary: request counters and circuit breaker state
+                - vocabulary: the index in use and its version
+                - abuseLexicon: source, version and size of the lexicon
+                - languageIdentifier: the language model and its thresholds
+                - nltkData: the NLTK bundle in use
+            """
+            return {
+                'pipeline': moderation_pipeline.status(),
+                'asyncModeration': async_moderator.stats(),
+                'toxicityModel': toxicity_model.status(),
+                'toxicityCascade': toxicity_cascade.stats(),
+                'nearDuplicates': near_duplicates.stats(),
+                'verdictCache': verdict_cache.stats(),
+                'wordCache': word_cache.stats(),
+                'urbanDictionary': urban_dictionary.stats(),
+                'vocabulary': vocabulary.stats(),
+                'abuseLexicon': abuse_lexicon.stats(),
+                'languageIdentifier': language_identifier.stats(),
+                'nltkData': nltk_data.stats(),
+            }
@@ -2,77 +2,18 @@
 from flask_restx import Resource
 from app import mongo
 from bson.objectid import ObjectId
-from app.models import review_model
+from flask import current_app
+from app.models import review_model, review_status_model, APPROVED_REVIEWS_QUERY, REVIEW_APPROVED, REVIEW_PENDING
+from app.moderation.async_worker import async_moderator
+from app.moderation.model_manager import ModelNotReady
+from app.moderation.near_duplicates import near_duplicates
+from app.moderation.pipeline import moderate_text
+from app.moderation.records import review_fields
 from datetime import datetime
 
 # --- Feedback Filtering Imports ---
-from transformers import pipeline
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-import string
+# NLTK resources come from the bundle at NLTK_DATA_PATH (see app/moderation/nltk_data.py)
 from urbandict import define
-from nltk.corpus import wordnet
-
-# Download required NLTK data (safe to call multiple times)
-nltk.download('punkt', quiet=True)
-nltk.download('wordnet',quiet=True)
-
-nltk.download('stopwords', quiet=True)
-
-abuse_words = {
-    "idiot", "stupid", "useless", "fool", "dumb", "nonsense",
-    "lazy", "moron", "hate", "trash", "worst"
-}
-
-def check_abuse_word(text):
-    words = text.lower().split()
-    found = [w for w in words if w in abuse_words]
-    return found
-
-model = pipeline("text-classification", model="unitary/toxic-bert")
-
-def check_toxicity(text):
-    threshold = 0.5
-    result = model(text)[0]
-    label = result['label']
-    score = result['score']
-    if label == 'toxic' and score >= threshold:
-        return True, score
-    return False, score
-
-stop_words = set(stopwords.words('english'))
-
-import requests
-def check_urban_dictionary(word):
-    try:
-        url = f"https://api.urbandictionary.com/v0/define?term={word}"
-        response = requests.get(url)
-        response.raise_for_status()  # Raise exception for bad status
-        data = response.json()
-        return len(data.get("list", [])) > 0  # Word exists if list is not empty
-    except Exception as e:
-        print(f"Urban Dictionary API error for '{word}': {e}")
-        return False
-
-def check_dictionary(text):
-    words = word_tokenize(text.lower())
-    stop_words = set(stopwords.words('english'))
-    words = [w for w in words if w not in stop_words and w not in string.punctuation]
-    invalid_words = [w for w in words if not (wordnet.synsets(w) or check_urban_dictionary(w))]
-    return invalid_words
-
-def filter_feedback(feedback):
-    abusive_words = check_abuse_word(feedback)
-    if abusive_words:
-        return f"Feedback contains abusive words: {', '.join(abusive_words)}"
-    invalid_words = check_dictionary(feedback)
-    if invalid_words:
-        return f"Feedback contains non english words or not a proper sentence. Invalid word(s): {', '.join(invalid_words)}"
-    toxic, score = check_toxicity(feedback)
-    if toxic:
-        return f"Feedback rejected (toxic detected, score={score:.2f})"
-    return None  # No issues
 
 def register_routes(api):
     # Register REST endpoints for managing review resources
@@ -81,12 +22,13 @@ def register_routes(api):
         @api.marshal_list_with(review_model)
         def get(self):
             """
-            Retrieve a list of all reviews from the database.
+            Retrieve a list of all approved reviews from the database.
 
             Returns:
                 List of reviews conforming to the review_model schema.
             """
-            return list(mongo.db.reviews.find())
+            # Pending and rejected reviews are never listed
+            return list(mongo.db.reviews.find(APPROVED_REVIEWS_QUERY))
 
         @api.expect(review_model)
         def post(self):
@@ -95,20 +37,23 @@ def register_routes(api):
 
             - Expects payload conforming to review_model.
             - Resolves staffId based on employeeId provided by the user.
+            - Rejects near-duplicates of recently submitted reviews.
+            - Moderates the text, or with MODERATION_ASYNC stores it as pending
+              and moderates it in the background.
             - Converts 'date' field to Python datetime if given as a string.
-            - Inserts the review into the database.
+            - Inserts the review into the database, with the full moderation
+              record (stage verdicts, scores, model and lexicon versions).
 
             Returns:
-                Success message and ID of the newly added review.
+                Success message and ID of the newly added review (201), or
+                202 with status 'pending' in asynchronous mode.
                 Error message if employeeId does not match any staff.
+                400 if the text is rejected or nearly duplicates recent reviews.
+                503 if the toxicity model is not ready within the configured wait.
             """
             data = api.payload
-
-            # --- Feedback Filtering ---
             feedback_text = data.get('text', '')
-            filter_result = filter_feedback(feedback_text)
-            if filter_result:
-                return {'error': filter_result}, 400
+            moderate_async = current_app.config['MODERATION_ASYNC']
 
             # Lookup staff in database using employeeId instead of MongoDB _id
             employee_id = data.get('staffId')
@@ -119,11 +64,51 @@ def register_routes(api):
             # Replace staffId in review with MongoDB's string _id
             data['staffId'] = str(staff['_id'])
 
+            # --- Spam Floods ---
+            # Copies of recently submitted reviews are rejected before the expensive checks
+            duplicate = near_duplicates.check_and_record(feedback_text, data['staffId'])
+            if duplicate:
+                return {'error': duplicate}, 400
+
+            try:
+                return self._moderate_and_store(data, feedback_text, moderate_async)
+            except BaseException:
+                # Nothing was stored, so retrying the same review must not count as a copy
+                near_duplicates.forget(feedback_text, data['staffId'])
+                raise
+
+        def _moderate_and_store(self, data, feedback_text, moderate_async):
+            # --- Feedback Filtering ---
+            # In asynchronous mode this happens after the insert, in the background
+            if not moderate_async:
+                try:
+                    record = moderate_text(feedback_text)
+                except ModelNotReady as e:
+                    near_duplicates.forget(feedback_text, data['staffId'])
+                    return {'error': str(e)}, 503
+                if record['rejection']:
+                    # A corrected resubmission must not be turned away as a copy of this one
+                    near_duplicates.mark_rejected(feedback_text, data['staffId'])
+                    return {'error': record['rejection']}, 400
+
             # Convert provided date string (ISO format) to datetime object
             if 'date' in data and isinstance(data['date'], str):
                 data['date'] = datetime.fromisoformat(data['date'].replace("Z", "+00:00"))
 
+            if moderate_async:
+                # Store right away, leased to this process, and let the background workers decide
+                data['status'] = REVIEW_PENDING
+                data['moderationLease'] = async_moderator.lease()
+                result = mongo.db.reviews.insert_one(data)
+                async_moderator.submit(result.inserted_id, feedback_text, data['staffId'])
+                return {
+                    'message': 'Review submitted for moderation',
+                    'review_id': str(result.inserted_id),
+                    'status': REVIEW_PENDING,
+                }, 202
+
             # Insert the new review into the reviews collection
+            data.update(review_fields(record))
             result = mongo.db.reviews.insert_one(data)
             return {'message': 'Review added', 'review_id': str(result.inserted_id)}, 201
 
@@ -133,15 +118,42 @@ def register_routes(api):
         @api.marshal_with(review_model)
         def get(self, review_id):
             """
-            Retrieve a single review by its unique review_id.
+            Retrieve a single approved review by its unique review_id.
 
             Args:
                 review_id (str): The ObjectId string of the review.
 
             Returns:
                 The review document if found, or error message if not found.
+                Pending and rejected reviews are not found, as in the listings;
+                their moderation status is available from /reviews/<id>/status.
             """
-            review = mongo.db.reviews.find_one({'_id': ObjectId(review_id)})
+            review = mongo.db.reviews.find_one({'_id': ObjectId(review_id), **APPROVED_REVIEWS_QUERY})
             if review:
                 return review
             return {'error': 'Review not found'}, 404
+
+    @api.route('/reviews/<string:review_id>/status')
+    class ReviewStatus(Resource):
+        @api.marshal_with(review_status_model)
+        def get(self, review_id):
+            """
+            Poll the moderation status of a submitted review.
+
+            Args:
+                review_id (str): The ObjectId string of the review.
+
+            Returns:
+                The review's status ('pending', 'approved' or 'rejected') and, for
+                rejected reviews, the reason. Error message if not found.
+            """
+            review = mongo.db.reviews.find_one(
+                {'_id': ObjectId(review_id)}, {'status': 1, 'rejectionReason': 1}
+            )
+            if not review:
+                return {'error': 'Review not found'}, 404
+            return {
+                'review_id': str(review['_id']),
+                'status': review.get('status', REVIEW_APPROVED),
+                'reason': review.get('rejectionReason'),
+            }
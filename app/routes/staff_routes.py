@@ -3,6 +3,7 @@ from flask_restx import Resource
 from app import mongo
 from bson.objectid import ObjectId  # Used to convert string IDs to MongoDB's ObjectId format.
 from app.models import staff_model, review_model # Import the data models for request/response marshaling.
+from app.models import APPROVED_REVIEWS_QUERY # Filter that hides pending and rejected reviews.
 
 def register_routes(api):
     """
@@ -90,7 +91,8 @@ def register_routes(api):
 
             # Use the MongoDB '_id' from the found staff member to fetch all related reviews.
             # The 'staffId' in the 'reviews' collection stores the MongoDB _id of the staff.
-            reviews = list(mongo.db.reviews.find({'staffId': str(staff['_id'])}))
+            # Only approved reviews are listed; pending and rejected ones stay hidden.
+            reviews = list(mongo.db.reviews.find({'staffId': str(staff['_id']), **APPROVED_REVIEWS_QUERY}))
             
             # This line is likely for debugging purposes to check the staff's _id.
             print(staff['_id'])
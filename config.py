@@ -11,6 +11,12 @@ from dotenv import load_dotenv
 # in the project's root directory. This makes them accessible via os.getenv().
 load_dotenv()
 
+# Small helper used by the Config class to parse on/off style environment variables.
+def _env_bool(name, default):
+    """Read a boolean flag from the environment ("1", "true", "yes" and "on" are truthy)."""
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
 class Config:
     """
     A configuration class to store application settings. ⚙️
@@ -25,4 +31,216 @@ class Config:
     # "MONGO_URI_CONNECTION" and assigns its value to this class attribute.
     # This practice is crucial for security as it avoids hardcoding sensitive
     # credentials like database URIs directly in the source code.
-    MONGO_URI = os.getenv("MONGO_URI_CONNECTION")
\ No newline at end of file
+    MONGO_URI = os.getenv("MONGO_URI_CONNECTION")
+
+    # --- Review Moderation: Toxicity Model ---
+    # Hugging Face model used by the toxicity check on POST /reviews.
+    TOXICITY_MODEL_NAME = os.getenv("TOXICITY_MODEL_NAME", "unitary/toxic-bert")
+
+    # When enabled, create_app starts loading the model in a background thread so
+    # workers can serve requests immediately. When disabled, the model is loaded
+    # on the first review that needs it.
+    TOXICITY_MODEL_PRELOAD = _env_bool("TOXICITY_MODEL_PRELOAD", True)
+
+    # Maximum number of seconds a review submission waits for a cold model
+    # before the API answers with 503 Service Unavailable.
+    TOXICITY_MODEL_WAIT_TIMEOUT = float(os.getenv("TOXICITY_MODEL_WAIT_TIMEOUT", "30"))
+
+    # Score threshold per model label, as "label=threshold" pairs. The model scores
+    # every label in one pass (toxic-bert: toxic, severe_toxic, obscene, threat,
+    # insult, identity_hate) and a review is rejected if any listed label reaches
+    # its threshold, e.g. "toxic=0.5,threat=0.3" to reject threats more readily.
+    TOXICITY_THRESHOLDS = {
+        label.strip(): float(threshold)
+        for label, threshold in (
+            pair.split("=") for pair in os.getenv("TOXICITY_THRESHOLDS", "toxic=0.5").split(",") if pair.strip()
+        )
+    }
+
+    # Micro-batching for the toxicity model: concurrent review submissions are
+    # collected for up to TOXICITY_BATCH_WINDOW_MS milliseconds (or until
+    # TOXICITY_BATCH_MAX_SIZE texts are waiting) and classified in one forward pass.
+    TOXICITY_BATCH_WINDOW_MS = float(os.getenv("TOXICITY_BATCH_WINDOW_MS", "5"))
+    TOXICITY_BATCH_MAX_SIZE = int(os.getenv("TOXICITY_BATCH_MAX_SIZE", "16"))
+
+    # Inference governor: each forward pass uses TOXICITY_TORCH_THREADS threads
+    # (0 = available cores / TOXICITY_WORKER_PROCESSES, so the web workers on one
+    # machine do not oversubscribe the CPU), and at most
+    # TOXICITY_MAX_CONCURRENT_INFERENCES passes run at once per process; further
+    # batches queue. TOXICITY_WORKER_PROCESSES defaults to WEB_CONCURRENCY, the
+    # worker count gunicorn reads.
+    TOXICITY_WORKER_PROCESSES = int(os.getenv("TOXICITY_WORKER_PROCESSES", os.getenv("WEB_CONCURRENCY", "1")))
+    TOXICITY_TORCH_THREADS = int(os.getenv("TOXICITY_TORCH_THREADS", "0"))
+    TOXICITY_MAX_CONCURRENT_INFERENCES = int(os.getenv("TOXICITY_MAX_CONCURRENT_INFERENCES", "1"))
+
+    # Inference backend for the toxicity model (see app/moderation/backends.py):
+    #   "pipeline"  - full-precision transformers pipeline (reference behaviour)
+    #   "onnx-int8" - ONNX Runtime on CPU with int8 dynamic quantization
+    #   "remote"    - send texts to the shared inference server (see below)
+    #   "torchscript" - prebuilt TorchScript artifact (see TOXICITY_ARTIFACT_PATH)
+    #   "standin"   - deterministic keyword scorer for offline benchmarks (no model)
+    TOXICITY_BACKEND = os.getenv("TOXICITY_BACKEND", "pipeline")
+
+    # Directory where exported/optimized model artifacts are cached between runs.
+    TOXICITY_MODEL_CACHE_DIR = os.getenv("TOXICITY_MODEL_CACHE_DIR", "model_cache")
+
+    # Prebuilt TorchScript model and serialized fast tokenizer for the "torchscript"
+    # backend, written by `flask moderation build-model-artifact`.
+    TOXICITY_ARTIFACT_PATH = os.getenv("TOXICITY_ARTIFACT_PATH", "build/toxicity-model")
+
+    # Run the freshly loaded model on a few synthetic reviews before marking it warm,
+    # so the first real review does not pay for lazy initialization.
+    TOXICITY_WARMUP = _env_bool("TOXICITY_WARMUP", True)
+
+    # --- Review Moderation: Long Reviews ---
+    # Reviews longer than TOXICITY_MAX_TOKENS model tokens are classified in
+    # overlapping windows sharing TOXICITY_CHUNK_STRIDE tokens; the most toxic
+    # window decides. At most TOXICITY_MAX_CHUNKS windows run per review (spread
+    # evenly over the text), which caps the inference cost of very long reviews.
+    TOXICITY_MAX_TOKENS = int(os.getenv("TOXICITY_MAX_TOKENS", "512"))
+    TOXICITY_CHUNK_STRIDE = int(os.getenv("TOXICITY_CHUNK_STRIDE", "64"))
+    TOXICITY_MAX_CHUNKS = int(os.getenv("TOXICITY_MAX_CHUNKS", "8"))
+
+    # --- Review Moderation: Toxicity Cascade ---
+    # A hashed n-gram linear model, trained with `flask moderation train-cascade`,
+    # that settles clearly clean or clearly toxic reviews before the transformer
+    # model runs. Disabled while the file does not exist.
+    TOXICITY_CASCADE_PATH = os.getenv("TOXICITY_CASCADE_PATH", "build/cascade.bin")
+
+    # --- Review Moderation: NLTK Resources ---
+    # Directory built by `flask moderation build-nltk-data` holding the NLTK
+    # tokenizer, WordNet and stopwords. The app never downloads NLTK data; without
+    # the bundle NLTK looks in its default locations (e.g. ~/nltk_data).
+    NLTK_DATA_PATH = os.getenv("NLTK_DATA_PATH", "build/nltk_data")
+
+    # --- Review Moderation: Language Identification ---
+    # A character n-gram model, trained with `flask moderation train-language`.
+    # Reviews at least LANGUAGE_REJECT_CONFIDENCE likely to be in another language
+    # are rejected by the "language" stage; reviews at least LANGUAGE_TRUST_CONFIDENCE
+    # likely to be English skip the per-word Urban Dictionary lookups. Texts with
+    # fewer than LANGUAGE_MIN_CHARS letters are not judged. Disabled while the file
+    # does not exist.
+    LANGUAGE_MODEL_PATH = os.getenv("LANGUAGE_MODEL_PATH", "build/language.json")
+    LANGUAGE_REJECT_CONFIDENCE = float(os.getenv("LANGUAGE_REJECT_CONFIDENCE", "0.95"))
+    LANGUAGE_TRUST_CONFIDENCE = float(os.getenv("LANGUAGE_TRUST_CONFIDENCE", "0.99"))
+    LANGUAGE_MIN_CHARS = int(os.getenv("LANGUAGE_MIN_CHARS", "20"))
+
+    # --- Review Moderation: Near-Duplicate Detection ---
+    # POST /reviews rejects lightly edited copies of reviews submitted in the last
+    # NEAR_DUPLICATE_WINDOW seconds: one copy of a review that was not rejected for
+    # the same staff member, or NEAR_DUPLICATE_GLOBAL_LIMIT copies across all staff
+    # (rejected ones included, so floods of rejected spam are cut short). Similarity is the Jaccard
+    # similarity of the word bigrams, estimated with MinHash. Reviews shorter than
+    # NEAR_DUPLICATE_MIN_TOKENS words are never flagged.
+    NEAR_DUPLICATE_ENABLED = _env_bool("NEAR_DUPLICATE_ENABLED", True)
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.7"))
+    NEAR_DUPLICATE_WINDOW = int(os.getenv("NEAR_DUPLICATE_WINDOW", "3600"))
+    NEAR_DUPLICATE_GLOBAL_LIMIT = int(os.getenv("NEAR_DUPLICATE_GLOBAL_LIMIT", "5"))
+    NEAR_DUPLICATE_MIN_TOKENS = int(os.getenv("NEAR_DUPLICATE_MIN_TOKENS", "8"))
+    NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", "20000"))
+
+    # --- Review Moderation: Verdict Cache ---
+    # Verdicts are cached by a hash of the normalized review text, so repeated
+    # texts skip moderation entirely. The in-process LRU holds VERDICT_CACHE_SIZE
+    # entries for VERDICT_CACHE_TTL seconds; VERDICT_CACHE_MONGO adds a shared
+    # second level stored in the VERDICT_CACHE_COLLECTION collection.
+    VERDICT_CACHE_ENABLED = _env_bool("VERDICT_CACHE_ENABLED", True)
+    VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "10000"))
+    VERDICT_CACHE_TTL = int(os.getenv("VERDICT_CACHE_TTL", "86400"))
+    VERDICT_CACHE_MONGO = _env_bool("VERDICT_CACHE_MONGO", False)
+    VERDICT_CACHE_COLLECTION = os.getenv("VERDICT_CACHE_COLLECTION", "moderation_verdicts")
+
+    # --- Review Moderation: Urban Dictionary Word Cache ---
+    # Urban Dictionary verdicts are cached per word in memory (WORD_CACHE_SIZE
+    # entries) and in the WORD_CACHE_COLLECTION collection shared by all workers.
+    # Set WORD_CACHE_COLLECTION to an empty value to keep the cache in memory only.
+    # Words that were not found expire after WORD_CACHE_NEGATIVE_TTL seconds.
+    WORD_CACHE_SIZE = int(os.getenv("WORD_CACHE_SIZE", "50000"))
+    WORD_CACHE_TTL = int(os.getenv("WORD_CACHE_TTL", str(30 * 86400)))
+    WORD_CACHE_NEGATIVE_TTL = int(os.getenv("WORD_CACHE_NEGATIVE_TTL", "86400"))
+    WORD_CACHE_COLLECTION = os.getenv("WORD_CACHE_COLLECTION", "urban_dictionary_words")
+
+    # --- Review Moderation: Urban Dictionary Lookups ---
+    # The words of one review are looked up concurrently over a pooled keep-alive
+    # session. Each HTTP request times out after URBAN_DICTIONARY_TIMEOUT seconds,
+    # the whole review waits at most URBAN_DICTIONARY_DEADLINE seconds, and no more
+    # than URBAN_DICTIONARY_MAX_IN_FLIGHT requests run at once per worker. Words
+    # that are still unresolved are treated according to
+    # URBAN_DICTIONARY_UNRESOLVED_POLICY: "accept" (valid) or "reject" (invalid).
+    URBAN_DICTIONARY_URL = os.getenv("URBAN_DICTIONARY_URL", "https://api.urbandictionary.com/v0/define")
+    URBAN_DICTIONARY_TIMEOUT = float(os.getenv("URBAN_DICTIONARY_TIMEOUT", "2"))
+    URBAN_DICTIONARY_DEADLINE = float(os.getenv("URBAN_DICTIONARY_DEADLINE", "3"))
+    URBAN_DICTIONARY_MAX_IN_FLIGHT = int(os.getenv("URBAN_DICTIONARY_MAX_IN_FLIGHT", "8"))
+    URBAN_DICTIONARY_UNRESOLVED_POLICY = os.getenv("URBAN_DICTIONARY_UNRESOLVED_POLICY", "accept")
+
+    # Circuit breaker around the Urban Dictionary API: after
+    # URBAN_DICTIONARY_BREAKER_FAILURES failed lookups in a row (lookups slower than
+    # URBAN_DICTIONARY_BREAKER_SLOW_SECONDS count as failures) the API is not called
+    # for URBAN_DICTIONARY_BREAKER_OPEN_SECONDS, then one probe lookup is tried.
+    # While open, unknown words get URBAN_DICTIONARY_FALLBACK: "accept" or "reject".
+    # Such verdicts are never cached.
+    URBAN_DICTIONARY_BREAKER_FAILURES = int(os.getenv("URBAN_DICTIONARY_BREAKER_FAILURES", "5"))
+    URBAN_DICTIONARY_BREAKER_SLOW_SECONDS = float(os.getenv("URBAN_DICTIONARY_BREAKER_SLOW_SECONDS", "1"))
+    URBAN_DICTIONARY_BREAKER_OPEN_SECONDS = float(os.getenv("URBAN_DICTIONARY_BREAKER_OPEN_SECONDS", "30"))
+    URBAN_DICTIONARY_FALLBACK = os.getenv("URBAN_DICTIONARY_FALLBACK", "accept")
+
+    # --- Review Moderation: Vocabulary Index ---
+    # Precomputed set of valid English word forms (WordNet lemmas, their inflected
+    # forms and the curated slang list), built by `flask moderation build-vocabulary`.
+    # When the file is missing, the dictionary check falls back to wordnet.synsets.
+    VOCABULARY_INDEX_PATH = os.getenv("VOCABULARY_INDEX_PATH", "build/vocabulary.idx")
+    VOCABULARY_SLANG_PATH = os.getenv(
+        "VOCABULARY_SLANG_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "moderation", "data", "slang.txt"),
+    )
+
+    # --- Review Moderation: Abuse Lexicon ---
+    # Abusive words and phrases, one per line in ABUSE_LEXICON_PATH or one document
+    # with a "phrase" field per entry in ABUSE_LEXICON_COLLECTION (the collection
+    # wins if both are set). Without either, the built-in list is used. The source
+    # is re-checked every ABUSE_LEXICON_RELOAD_INTERVAL seconds, no restart needed.
+    ABUSE_LEXICON_PATH = os.getenv("ABUSE_LEXICON_PATH", "")
+    ABUSE_LEXICON_COLLECTION = os.getenv("ABUSE_LEXICON_COLLECTION", "")
+    ABUSE_LEXICON_RELOAD_INTERVAL = float(os.getenv("ABUSE_LEXICON_RELOAD_INTERVAL", "30"))
+
+    # --- Review Moderation: Pipeline ---
+    # Comma-separated moderation stages to run on each review (see
+    # app/moderation/pipeline.py). Stages always run cheapest first and stop at
+    # the first rejection. With MODERATION_PARALLEL the stages start at once and
+    # the first rejection to arrive wins, trading CPU for latency.
+    MODERATION_STAGES = [
+        name.strip() for name in os.getenv("MODERATION_STAGES", "language,abuse,dictionary,toxicity").split(",")
+        if name.strip()
+    ]
+    # Tokenizer used to split reviews for the dictionary stage and the verdict cache
+    # key: "regex" (single precompiled pass) or "nltk" (nltk.word_tokenize). The abuse
+    # stage always splits text like its lexicon. Compare them with `flask moderation bench-tokenizer`.
+    MODERATION_TOKENIZER = os.getenv("MODERATION_TOKENIZER", "regex")
+
+    MODERATION_PARALLEL = _env_bool("MODERATION_PARALLEL", False)
+
+    # When MODERATION_ASYNC is enabled, POST /reviews stores the review with
+    # status "pending" and returns 202 right away; MODERATION_ASYNC_WORKERS
+    # background threads moderate it and set the status to "approved" or
+    # "rejected". Clients poll GET /reviews/<id>/status.
+    # A process leases each review it moderates for MODERATION_ASYNC_LEASE_SECONDS;
+    # every MODERATION_ASYNC_SWEEP_INTERVAL seconds each process claims pending
+    # reviews whose lease expired. A review is given up on (left pending, with its
+    # error) after MODERATION_ASYNC_MAX_ATTEMPTS failed attempts.
+    MODERATION_ASYNC = _env_bool("MODERATION_ASYNC", False)
+    MODERATION_ASYNC_WORKERS = int(os.getenv("MODERATION_ASYNC_WORKERS", "4"))
+    MODERATION_ASYNC_LEASE_SECONDS = int(os.getenv("MODERATION_ASYNC_LEASE_SECONDS", "300"))
+    MODERATION_ASYNC_SWEEP_INTERVAL = int(os.getenv("MODERATION_ASYNC_SWEEP_INTERVAL", "30"))
+    MODERATION_ASYNC_MAX_ATTEMPTS = int(os.getenv("MODERATION_ASYNC_MAX_ATTEMPTS", "5"))
+
+    # --- Review Moderation: Shared Inference Server ---
+    # `flask moderation serve-inference` loads the model once, using
+    # TOXICITY_INFERENCE_BACKEND, and serves every web worker on the Unix socket
+    # TOXICITY_INFERENCE_SOCKET. Workers use it when TOXICITY_BACKEND is "remote".
+    # Connections are authenticated with TOXICITY_INFERENCE_AUTHKEY; if it is not
+    # set, the server generates a random key into TOXICITY_INFERENCE_AUTHKEY_PATH
+    # (mode 0600) and workers running as the same user read it from there.
+    TOXICITY_INFERENCE_BACKEND = os.getenv("TOXICITY_INFERENCE_BACKEND", "pipeline")
+    TOXICITY_INFERENCE_SOCKET = os.getenv("TOXICITY_INFERENCE_SOCKET", "/tmp/staff-feedback-inference.sock")
+    TOXICITY_INFERENCE_AUTHKEY = os.getenv("TOXICITY_INFERENCE_AUTHKEY", "")
+    TOXICITY_INFERENCE_AUTHKEY_PATH = os.getenv("TOXICITY_INFERENCE_AUTHKEY_PATH", "build/inference.key")
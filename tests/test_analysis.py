@@ -0,0 +1,15 @@
+import pytest
+
+from app.moderation.analysis import regex_tokenize
+
+
+@pytest.mark.parametrize('text, tokens', [
+    ("don't stop", ['do', "n't", 'stop']),
+    ("she's well-organised, 3.5/5!", ['she', "'s", 'well-organised', '3.5/5']),
+    ("i'm sure we'll", ['i', "'m", 'sure', 'we', "'ll"]),
+    ("the teachers' room", ['the', 'teachers', 'room']),
+    ('rock_n_roll ... ok', ['rock', 'n', 'roll', 'ok']),
+    ('', []),
+])
+def test_regex_tokenize(text, tokens):
+    assert regex_tokenize(text) == tokens
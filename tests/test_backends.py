@@ -0,0 +1,61 @@
+import math
+
+import pytest
+
+from app.moderation.backends import compare_backends, logits_to_results
+
+
+class FakeBackend:
+    """Returns fixed label scores for every text, like a loaded ToxicityBackend."""
+
+    def __init__(self, scores):
+        self.scores = scores
+
+    def __call__(self, texts):
+        label = max(self.scores, key=self.scores.get)
+        return [{'label': label, 'score': self.scores[label], 'scores': dict(self.scores)} for _ in texts]
+
+
+def test_logits_to_results_softmax():
+    [result] = logits_to_results([[2.0, 0.0]], ['toxic', 'neutral'], use_sigmoid=False)
+    assert result['label'] == 'toxic'
+    assert sum(result['scores'].values()) == pytest.approx(1.0)
+    assert result['score'] == pytest.approx(1 / (1 + math.exp(-2.0)))
+
+
+def test_logits_to_results_sigmoid_scores_each_label():
+    [result] = logits_to_results([[0.0, 3.0, -3.0]], ['toxic', 'insult', 'threat'], use_sigmoid=True)
+    assert result['label'] == 'insult'
+    assert result['scores']['toxic'] == pytest.approx(0.5)
+    assert result['scores']['threat'] == pytest.approx(1 - result['scores']['insult'])
+
+
+def test_compare_backends_within_tolerance():
+    reference = FakeBackend({'toxic': 0.90, 'insult': 0.20})
+    candidate = FakeBackend({'toxic': 0.88, 'insult': 0.23})
+    report = compare_backends(reference, candidate, ['a', 'b'], tolerance=0.05)
+    assert report['texts'] == 2
+    assert report['maxScoreDelta'] == pytest.approx(0.03)
+    assert report['mismatches'] == []
+
+
+def test_compare_backends_reports_score_drift():
+    reference = FakeBackend({'toxic': 0.90, 'insult': 0.20})
+    candidate = FakeBackend({'toxic': 0.90, 'insult': 0.40})
+    report = compare_backends(reference, candidate, ['a'], tolerance=0.05)
+    assert report['maxScoreDelta'] == pytest.approx(0.20)
+    assert [m['text'] for m in report['mismatches']] == ['a']
+
+
+def test_compare_backends_reports_label_flip():
+    reference = FakeBackend({'toxic': 0.51, 'neutral': 0.49})
+    candidate = FakeBackend({'toxic': 0.49, 'neutral': 0.51})
+    report = compare_backends(reference, candidate, ['borderline'], tolerance=0.05)
+    assert len(report['mismatches']) == 1
+
+
+def test_compare_backends_missing_label_counts_as_zero():
+    reference = FakeBackend({'toxic': 0.9, 'threat': 0.3})
+    candidate = FakeBackend({'toxic': 0.9})
+    report = compare_backends(reference, candidate, ['a'], tolerance=0.05)
+    assert report['maxScoreDelta'] == pytest.approx(0.3)
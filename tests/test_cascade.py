@@ -0,0 +1,49 @@
+import zlib
+from array import array
+
+from app.moderation.cascade import CLEAN, TOXIC, LinearCascade
+
+N_FEATURES = 1024
+
+
+def cascade(weights_by_word):
+    weights = array('f', bytes(4 * N_FEATURES))
+    for word, weight in weights_by_word.items():
+        weights[zlib.crc32(word.encode('utf-8')) % N_FEATURES] = weight
+    return LinearCascade(weights)
+
+
+def test_calibrate_settles_only_where_the_labels_agree():
+    model = cascade({'idiot': 8.0, 'great': -8.0, 'meh': 0.5})
+    texts = ['great', 'great', 'meh', 'meh', 'idiot', 'idiot']
+    labels = [0, 0, 0, 1, 1, 1]
+    model.calibrate(texts, labels, target_agreement=0.99)
+    assert model.decide(model.probability('great')) == CLEAN
+    assert model.decide(model.probability('idiot')) == TOXIC
+    assert model.decide(model.probability('meh')) is None
+    assert model.evaluate(texts, labels) == {'texts': 6, 'settledFraction': 0.6667, 'agreement': 1.0}
+
+
+def test_calibrate_leaves_thresholds_open_when_nothing_agrees():
+    model = cascade({'great': -8.0, 'idiot': 8.0})
+    model.calibrate(['great', 'idiot'], [1, 0])
+    assert (model.low, model.high) == (-1.0, 2.0)
+    assert model.decide(model.probability('great')) is None
+    assert model.decide(model.probability('idiot')) is None
+
+
+def test_calibrate_never_crosses_one_half():
+    model = cascade({'meh': 0.5})
+    model.calibrate(['meh', 'meh'], [0, 0])
+    assert model.low == -1.0
+    assert model.high == 2.0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    model = cascade({'idiot': 8.0})
+    model.calibrate(['idiot', 'fine'], [1, 0])
+    path = str(tmp_path / 'cascade.bin')
+    model.save(path)
+    loaded = LinearCascade.load(path)
+    assert loaded.version == model.version
+    assert loaded.probability('idiot') == model.probability('idiot')
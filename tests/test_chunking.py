@@ -0,0 +1,26 @@
+from app.moderation.chunking import split_windows
+
+TEXT = 'a b c d e f g h i j'
+SPANS = [(i * 2, i * 2 + 1) for i in range(10)]
+
+
+def test_short_text_is_one_window():
+    assert split_windows(TEXT, SPANS, 10, 2, 8) == ([TEXT], 1.0)
+
+
+def test_windows_overlap_by_stride_and_end_on_the_last_token():
+    chunks, coverage = split_windows(TEXT, SPANS, 4, 1, 8)
+    assert chunks == ['a b c d', 'd e f g', 'g h i j']
+    assert coverage == 1.0
+
+
+def test_capped_windows_keep_first_and_last():
+    chunks, coverage = split_windows(TEXT, SPANS, 4, 1, 2)
+    assert chunks == ['a b c d', 'g h i j']
+    assert coverage == 0.8
+
+
+def test_single_chunk_cap_keeps_the_start():
+    chunks, coverage = split_windows(TEXT, SPANS, 4, 1, 1)
+    assert chunks == ['a b c d']
+    assert coverage == 0.4
@@ -0,0 +1,55 @@
+import pytest
+
+from app.moderation import circuit_breaker
+from app.moderation.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, open_seconds=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()['refused'] == 1
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=0.5)
+    breaker.record_success(0.2)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_success(0.8)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_probe_closes_on_success(clock):
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=10, probes=1)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # the only probe slot is taken
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_half_open_probe_reopens_on_failure(clock):
+    breaker = CircuitBreaker(failure_threshold=3, open_seconds=10)
+    for _ in range(3):
+        breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()['trips'] == 2
+    assert breaker.stats()['retryInSeconds'] == 10.0
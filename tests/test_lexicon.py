@@ -0,0 +1,32 @@
+from app.moderation.lexicon import PhraseMatcher, lexicon_tokens
+
+
+def test_lexicon_tokens_drop_punctuation_and_keep_apostrophes():
+    assert lexicon_tokens("Don't be SO lazy, ok?!") == ["don't", 'be', 'so', 'lazy', 'ok']
+
+
+def test_phrase_matcher_finds_words_and_phrases():
+    matcher = PhraseMatcher(['lazy', 'waste of time'])
+    assert matcher.find('A total WASTE of time, and lazy.') == ['waste of time', 'lazy']
+
+
+def test_phrase_matcher_reports_overlapping_matches():
+    matcher = PhraseMatcher(['waste of time', 'time', 'of time'])
+    assert matcher.find('waste of time') == ['waste of time', 'of time', 'time']
+
+
+def test_phrase_matcher_follows_failure_links():
+    # "waste of waste of time" only matches after falling back from the first "waste of".
+    matcher = PhraseMatcher(['waste of time'])
+    assert matcher.find('waste of waste of time') == ['waste of time']
+
+
+def test_phrase_matcher_needs_whole_words():
+    matcher = PhraseMatcher(['hate'])
+    assert matcher.find('whatever, I hated nothing') == []
+
+
+def test_phrase_matcher_normalizes_phrases():
+    matcher = PhraseMatcher(['  Waste, of TIME ', '', '...'])
+    assert matcher.phrases == {'waste of time'}
+    assert matcher.node_count == 4
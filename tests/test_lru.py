@@ -0,0 +1,44 @@
+import pytest
+
+from app.moderation import lru
+from app.moderation.lru import MISSING, TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lru.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_get_missing_key():
+    assert TTLCache().get('absent') is MISSING
+
+
+def test_cached_none_is_not_missing():
+    cache = TTLCache()
+    cache.set('word', None)
+    assert cache.get('word') is None
+
+
+def test_evicts_least_recently_used(clock):
+    cache = TTLCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is MISSING
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert len(cache) == 2
+
+
+def test_entries_expire(clock):
+    cache = TTLCache(ttl=60)
+    cache.set('default', 1)
+    cache.set('short', 2, ttl=5)
+    clock[0] += 5
+    assert cache.get('short') is MISSING
+    assert cache.get('default') == 1
+    clock[0] += 55
+    assert cache.get('default') is MISSING
+    assert len(cache) == 0
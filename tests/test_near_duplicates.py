@@ -0,0 +1,57 @@
+import pytest
+
+from app.moderation import near_duplicates
+from app.moderation.near_duplicates import MinHashIndex, lsh_bands
+
+REVIEW = 'The lectures were clear and the feedback on assignments was always quick and useful'
+
+
+@pytest.mark.parametrize('num_perm, threshold', [(64, 0.7), (64, 0.5), (128, 0.9), (16, 0.8)])
+def test_lsh_bands_keeps_the_lsh_threshold_below_the_wanted_similarity(num_perm, threshold):
+    bands, rows = lsh_bands(num_perm, threshold)
+    assert bands * rows == num_perm
+    assert (1 / bands) ** (1 / rows) <= threshold - 0.15
+
+
+def test_lsh_bands_falls_back_to_single_rows():
+    assert lsh_bands(4, 0.2) == (4, 1)
+
+
+def test_near_copies_match_and_unrelated_texts_do_not():
+    index = MinHashIndex(threshold=0.7)
+    index.add(index.signature(REVIEW), 'staff-1')
+    assert index.matches(index.signature(REVIEW + '!!')) == ['staff-1']
+    assert index.matches(index.signature('Never on time and the slides were a mess')) == []
+
+
+def test_matches_and_add_respects_add_if():
+    index = MinHashIndex()
+    signature = index.signature(REVIEW)
+    assert index.matches_and_add(signature, 'staff-1', add_if=lambda found: False) == []
+    assert len(index) == 0
+    assert index.matches_and_add(signature, 'staff-1') == []
+    assert index.matches_and_add(signature, 'staff-2') == ['staff-1']
+    assert len(index) == 2
+
+
+def test_rescope_and_remove_latest():
+    index = MinHashIndex()
+    signature = index.signature(REVIEW)
+    index.add(signature, 'staff-1')
+    assert index.rescope_latest(signature, 'staff-1', None)
+    assert index.matches(signature) == [None]
+    assert not index.remove_latest(signature, 'staff-1')
+    assert index.remove_latest(signature, None)
+    assert index.matches(signature) == []
+
+
+def test_evicts_oldest_and_expired_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(near_duplicates.time, 'monotonic', lambda: now[0])
+    index = MinHashIndex(window=60, max_entries=2)
+    for staff_id in ('a', 'b', 'c'):
+        index.add(index.signature(f'{REVIEW} {staff_id}'), staff_id)
+    assert len(index) == 2
+    now[0] += 60
+    assert index.matches(index.signature(REVIEW)) == []
+    assert len(index) == 0
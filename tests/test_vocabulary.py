@@ -0,0 +1,38 @@
+import pytest
+
+from app.moderation.vocabulary import VocabularyIndex
+
+
+def test_build_and_lookup(tmp_path):
+    path = str(tmp_path / 'vocab.idx')
+    assert VocabularyIndex.build(['teacher', 'lecture', 'geese', 'teacher'], path) == 3
+    index = VocabularyIndex(path)
+    assert index.word_count == 3
+    assert 'geese' in index
+    assert 'teacher' in index
+    assert 'helpfull' not in index
+    assert '' not in index
+
+
+def test_load_factor_stays_at_most_half(tmp_path):
+    path = str(tmp_path / 'vocab.idx')
+    VocabularyIndex.build([f'word{i}' for i in range(1000)], path)
+    index = VocabularyIndex(path)
+    assert all(f'word{i}' in index for i in range(1000))
+    assert index._mask + 1 >= 2 * 1000
+
+
+def test_digest_follows_contents(tmp_path):
+    first, same, other = (str(tmp_path / name) for name in ('a.idx', 'b.idx', 'c.idx'))
+    VocabularyIndex.build(['teacher', 'lecture'], first)
+    VocabularyIndex.build(['lecture', 'teacher'], same)
+    VocabularyIndex.build(['teacher', 'lectures'], other)
+    assert VocabularyIndex(first).digest == VocabularyIndex(same).digest
+    assert VocabularyIndex(first).digest != VocabularyIndex(other).digest
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'words.txt'
+    path.write_bytes(b'teacher\nlecture\n' * 4)
+    with pytest.raises(ValueError, match='not a vocabulary index'):
+        VocabularyIndex(str(path))